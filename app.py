@@ -5,16 +5,20 @@ import csv
 import json
 import time
 import uuid
+import hashlib
 import zipfile
 import random
 import shutil
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
-import gradio as gr
 from pydub import AudioSegment
-from pypdf import PdfReader
+from pypdf import PdfReader, PdfWriter
 from dotenv import load_dotenv
 
 # ---------- TTS ----------
@@ -22,6 +26,11 @@ from kokoro_onnx import Kokoro
 
 # ---------- Gemini ----------
 import google.generativeai as genai
+from ratelimit import GeminiLimiter, RateLimitExhausted, estimate_tokens
+from artifacts import ArtifactStore
+from profiling import ProfileSession, profiled
+from tracing import span, bind, current_span
+from spill import PCMSpill, SPILL_BLOCK_SEC, StemWriter, load_stems, mixed_blocks, encode_stream
 
 # =========================================================
 # Config / Paths
@@ -30,9 +39,17 @@ load_dotenv()
 
 GENERATED_FOLDER = "generated_podcasts"
 PROJECTS_DIR = "projects"
+CACHE_DIR = ".cache"  # reusable derived data (safe to delete)
+PROFILES_DIR = os.path.join(CACHE_DIR, "profiles")  # opt-in CPU/allocation profiles
 os.makedirs(GENERATED_FOLDER, exist_ok=True)
 os.makedirs(PROJECTS_DIR, exist_ok=True)
 
+# generated_podcasts/ holds episodes, ZIPs and CSV exports; unreferenced files are
+# evicted least-recently-used first once the folder exceeds this budget
+ARTIFACT_BUDGET_MB = int(os.environ.get("ARTIFACT_BUDGET_MB", "2048"))
+STEMS_SUFFIX = ".stems"  # <episode>.stems/ next to <episode>.mp3, see remix_episode
+ARTIFACTS = ArtifactStore(GENERATED_FOLDER, ARTIFACT_BUDGET_MB * 1024 * 1024, sidecars=(STEMS_SUFFIX,))
+
 MODEL_OPTIONS = [
     "./models/kokoro-v1.0.onnx",
     "./models/model_fp16.onnx",
@@ -58,17 +75,67 @@ FEMALE_VOICES = [
 # Pick your default Gemini model here (you can change in code later if needed)
 GEMINI_MODEL = "models/gemini-1.5-flash"  # fast/cheap; set GOOGLE_API_KEY in .env
 
+# Quota shared by every Gemini call in this process (free tier flash: 15 RPM / 1M TPM)
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", "1000000"))
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "6"))
+GEMINI_FILE_TOKENS = 258 * 20  # rough cost of an uploaded PDF (~258 tokens/page, ~20 pages)
+
+# GEMINI_FAKE=1 swaps in fakes.FakeGeminiModel (no network); GEMINI_FAKE_429_RATE injects 429s
+GEMINI_FAKE = os.environ.get("GEMINI_FAKE", "") not in ("", "0")
+
+# Episode assembly: "memory" (pydub; every line and the summed episode in RAM), "spill"
+# (PCM appended to a memory-mapped temp file and streamed through the mixer into ffmpeg in
+# blocks, so memory doesn't grow with episode length) or "auto" (spill for long scripts)
+TTS_ASSEMBLY = os.environ.get("TTS_ASSEMBLY", "auto")
+SPILL_MIN_LINES = int(os.environ.get("TTS_SPILL_MIN_LINES", "60"))
+SPILL_DIR = os.environ.get("TTS_SPILL_DIR") or None  # default: the system temp dir
+
+# Finished episodes keyed by everything that decides their audio (see episode_key). Only
+# seeded runs are cached: unseeded pauses and gestures differ on every run
+EPISODE_CACHE_DIR = os.path.join(CACHE_DIR, "episodes")
+EPISODE_CACHE_MB = int(os.environ.get("EPISODE_CACHE_MB", "1024"))  # 0 turns the cache off
+
+# Keep each episode's per-line voice audio and timing (<episode>.stems/, ~2.9 MB per
+# minute) so a new background, volume, pause length or tail only needs a remix
+TTS_KEEP_STEMS = os.environ.get("TTS_KEEP_STEMS", "1") not in ("", "0")
+
+# Lines of one voice joined into a single Kokoro call (1 = one call per line, the default).
+# Kokoro's ONNX graph takes a single token sequence, so a "batch" is one longer sequence,
+# cut back into lines at the pauses Kokoro leaves between sentences (split_at_silences).
+# Compare settings on your own scripts with tts_bench.py
+TTS_BATCH_LINES = int(os.environ.get("TTS_BATCH_LINES", "1"))
+TTS_BATCH_MAX_CHARS = int(os.environ.get("TTS_BATCH_MAX_CHARS", "350"))  # Kokoro caps a pass at 510 phonemes
+
+# TTS_FAKE=1 swaps in fakes.FakeKokoro (no model files); TTS_FAKE_LATENCY is seconds per
+# line, TTS_FAKE_CHAR_LATENCY seconds per character on top of that
+TTS_FAKE = os.environ.get("TTS_FAKE", "") not in ("", "0")
+TTS_FAKE_LATENCY = float(os.environ.get("TTS_FAKE_LATENCY", "0"))
+TTS_FAKE_CHAR_LATENCY = float(os.environ.get("TTS_FAKE_CHAR_LATENCY", "0"))
+
+def make_kokoro(model_path: str, voices_path: str):
+    """Kokoro(model_path, voices_path), or a FakeKokoro when TTS_FAKE is set."""
+    if TTS_FAKE:
+        from fakes import FakeKokoro
+        return FakeKokoro(model_path, voices_path, latency=TTS_FAKE_LATENCY, char_latency=TTS_FAKE_CHAR_LATENCY)
+    return Kokoro(model_path, voices_path)
+
 # =========================================================
 # Utils
 # =========================================================
-def clear_generated_folder():
-    for fn in os.listdir(GENERATED_FOLDER):
-        fp = os.path.join(GENERATED_FOLDER, fn)
-        if os.path.isfile(fp):
-            try:
-                os.remove(fp)
-            except Exception:
-                pass
+class JobCancelled(RuntimeError):
+    """Raised at a checkpoint once nobody is waiting for the job's result."""
+
+def check_cancel(cancel) -> None:
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled("cancelled: no clients waiting")
+
+def profile_run(enabled: bool, label: str):
+    """ProfileSession under PROFILES_DIR when asked for, otherwise a no-op context (yields None)."""
+    return ProfileSession(PROFILES_DIR, label) if enabled else contextlib.nullcontext()
+
+def profile_note(prof) -> str:
+    return f"\n\n_Profile saved to `{prof.dir}` (cpu.folded, alloc.txt)_" if prof is not None else ""
 
 def safe_stem(name: str) -> str:
     base = os.path.splitext(os.path.basename(name))[0]
@@ -86,10 +153,10 @@ def numpy_to_audio_segment(audio_np: np.ndarray, sample_rate: int) -> AudioSegme
         channels=1
     )
 
-def overlay_appreciative_gesture(main_segment: AudioSegment, gesture_segment: AudioSegment) -> AudioSegment:
+def overlay_appreciative_gesture(main_segment: AudioSegment, gesture_segment: AudioSegment, rng=random) -> AudioSegment:
     if len(main_segment) == 0 or len(gesture_segment) == 0:
         return main_segment
-    offset = int(random.uniform(0.2, 0.8) * len(main_segment))
+    offset = int(rng.uniform(0.2, 0.8) * len(main_segment))
     return main_segment.overlay(gesture_segment, position=offset)
 
 def parse_script(script_text: str) -> List[Tuple[str, str]]:
@@ -112,6 +179,25 @@ def extend_music_to_length(music: AudioSegment, target_ms: int) -> AudioSegment:
     extended = music * reps
     return extended[:target_ms]
 
+def write_atomic(out_path: str, write) -> None:
+    """write(tmp_path) next to the target, then rename, so readers never see a half-written file."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp = f"{out_path}.{os.getpid()}.{uuid.uuid4().hex[:6]}.part"
+    try:
+        write(tmp)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def export_atomic(audio: AudioSegment, out_path: str, format: str = "mp3"):
+    write_atomic(out_path, lambda tmp: audio.export(tmp, format=format))
+
+def use_spill(script_text: str) -> bool:
+    if TTS_ASSEMBLY == "spill":
+        return True
+    return TTS_ASSEMBLY == "auto" and len(parse_script(script_text)) >= SPILL_MIN_LINES
+
 def list_project_ids() -> List[str]:
     out = []
     for pid in os.listdir(PROJECTS_DIR):
@@ -147,14 +233,289 @@ def default_output_name_for_pid(pid: str) -> str:
             title_stub = pid
     return f"{title_stub}.mp3"
 
+# =========================================================
+# Gesture clip bank
+# =========================================================
+DEFAULT_GESTURE_PHRASES = "yeah, uh-huh, right, ok"
+GESTURE_BANK_DIR = os.path.join(CACHE_DIR, "gestures")
+
+_gesture_clips: Dict[str, AudioSegment] = {}  # by bank path
+
+def _gesture_clip_path(model_path: str, phrase: str, voice: str) -> str:
+    # safe_stem alone collides ("ok. sure" / "ok", "right." / "right!"): the hash tells them apart
+    digest = hashlib.sha1(json.dumps([_file_identity(model_path or "default"), TTS_FAKE, voice, phrase])
+                          .encode("utf-8")).hexdigest()[:16]
+    return os.path.join(GESTURE_BANK_DIR, f"{voice}__{safe_stem(phrase)[:40]}__{digest}.npz")
+
+def gesture_clip(kokoro, model_path: str, phrase: str, voice: str) -> AudioSegment:
+    """Interjection audio for (phrase, voice, model): memory, then disk, then synthesize once."""
+    fp = _gesture_clip_path(model_path, phrase, voice)
+    seg = _gesture_clips.get(fp)
+    if seg is not None:
+        return seg
+    try:
+        with np.load(fp) as data:
+            samples, sr = data["samples"], int(data["sr"])
+    except Exception:
+        samples, sr = kokoro.create(phrase, voice=voice, speed=1.0, lang="en-us")
+        os.makedirs(GESTURE_BANK_DIR, exist_ok=True)
+        tmp = f"{fp}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, samples=np.asarray(samples, dtype=np.float32), sr=sr)
+        os.replace(tmp, fp)  # several workers may warm the same clip
+    seg = numpy_to_audio_segment(samples, sr)
+    _gesture_clips[fp] = seg
+    return seg
+
+def warm_gesture_bank(kokoro, model_path: str, phrases_csv: str, voices: List[str]) -> int:
+    phrases = [p.strip() for p in phrases_csv.split(",") if p.strip()]
+    for voice in voices:
+        for phrase in phrases:
+            gesture_clip(kokoro, model_path, phrase, voice)
+    return len(phrases) * len(voices)
+
+# =========================================================
+# Episode cache
+# =========================================================
+# <key>.mp3 plus its <key>.stems/, so an episode served from the cache can still be remixed
+EPISODE_CACHE = ArtifactStore(EPISODE_CACHE_DIR, EPISODE_CACHE_MB * 1024 * 1024,
+                              sidecars=(STEMS_SUFFIX,)) if EPISODE_CACHE_MB > 0 else None
+
+def _file_identity(path: str) -> str:
+    # a re-exported model or re-uploaded track under the same name is a different input
+    try:
+        st = os.stat(path)
+        return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+    except (OSError, TypeError):
+        return str(path)
+
+def episode_key(
+    script_text: str, model_path: str, voice_config_path: str, male_voice: str, female_voice: str,
+    random_pause_enabled: bool, pause_min_sec: float, pause_max_sec: float,
+    enable_gestures: bool, gesture_prob: float, gesture_phrases_csv: str,
+    enable_bg_music: bool, bg_choice_name: str, bg_map: dict, bg_reduction_db: int,
+    add_bg_end: bool, bg_end_duration_sec: int, seed: int, batch_lines: int = None,
+) -> str:
+    batch_lines = TTS_BATCH_LINES if batch_lines is None else batch_lines
+    bg_path = (bg_map or {}).get(bg_choice_name) if enable_bg_music and bg_choice_name else None
+    parts = {
+        "script": script_text,
+        "model": _file_identity(model_path),
+        "voices_file": _file_identity(voice_config_path),
+        "fake_tts": TTS_FAKE,
+        "voices": [male_voice, female_voice],
+        "pauses": [bool(random_pause_enabled), float(pause_min_sec), float(pause_max_sec)],
+        "gestures": [bool(enable_gestures), float(gesture_prob), gesture_phrases_csv] if enable_gestures else None,
+        "bg": [_file_identity(bg_path), int(bg_reduction_db), bool(add_bg_end), int(bg_end_duration_sec)] if bg_path else None,
+        "seed": int(seed),
+        # joined lines are spoken with slightly different prosody
+        "batch": [int(batch_lines), TTS_BATCH_MAX_CHARS] if batch_lines > 1 else None,
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)  # same filesystem: no copy, and replacing either name leaves the other intact
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def _stems_key(sd: str) -> Optional[str]:
+    try:
+        with open(os.path.join(sd, "index.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("key")
+    except (OSError, ValueError):
+        return None
+
+def _link_stems(src: str, dst: str):
+    """Replace the stems dir dst with src's (voice.pcm linked, index.json copied)."""
+    tmp = f"{dst}.{os.getpid()}.{uuid.uuid4().hex[:6]}.tmp"
+    os.makedirs(tmp)
+    try:
+        _link_or_copy(os.path.join(src, "voice.pcm"), os.path.join(tmp, "voice.pcm"))
+        shutil.copyfile(os.path.join(src, "index.json"), os.path.join(tmp, "index.json"))
+        shutil.rmtree(dst, ignore_errors=True)
+        os.replace(tmp, dst)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def cached_episode(key: str, out_path: str) -> bool:
+    """
+    Put the cached episode for `key` (and its stems) at out_path; False on a miss. With
+    TTS_KEEP_STEMS, an entry cached without stems is a miss, so the episode is
+    synthesized once more and can be remixed.
+    """
+    if EPISODE_CACHE is None:
+        return False
+    src = EPISODE_CACHE.path(f"{key}.mp3")
+    src_stems = EPISODE_CACHE.path(key + STEMS_SUFFIX)
+    if TTS_KEEP_STEMS and _stems_key(src_stems) != key:
+        return False
+    try:
+        write_atomic(out_path, lambda tmp: _link_or_copy(src, tmp))
+    except OSError:
+        return False
+    EPISODE_CACHE.touch(src)
+    if os.path.dirname(os.path.abspath(out_path)) == os.path.abspath(GENERATED_FOLDER):
+        ARTIFACTS.register(out_path)
+    sd = stems_path(out_path)
+    try:
+        if TTS_KEEP_STEMS:
+            _link_stems(src_stems, sd)
+        elif _stems_key(sd) != key:
+            # stems left by a different episode at this path would remix the wrong voice track
+            shutil.rmtree(sd, ignore_errors=True)
+    except OSError as e:
+        print("[Stems warning]", e)
+        shutil.rmtree(sd, ignore_errors=True)
+    return True
+
+def store_episode(key: str, out_path: str):
+    if EPISODE_CACHE is None or not out_path or not os.path.exists(out_path):
+        return
+    try:
+        dst = EPISODE_CACHE.path(f"{key}.mp3")
+        sd = stems_path(out_path)
+        if _stems_key(sd) == key:
+            _link_stems(sd, EPISODE_CACHE.path(key + STEMS_SUFFIX))
+        write_atomic(dst, lambda tmp: _link_or_copy(out_path, tmp))
+        EPISODE_CACHE.register(dst)
+    except OSError as e:
+        print("[Episode cache warning]", e)
+
+# =========================================================
+# Batched synthesis
+# =========================================================
+def _frame_rms(samples: np.ndarray, frame: int) -> np.ndarray:
+    nf = len(samples) // frame
+    x = np.asarray(samples[:nf * frame], dtype=np.float32).reshape(nf, frame)
+    return np.sqrt(np.mean(x * x, axis=1))
+
+def _trim_silence(samples: np.ndarray, rms: np.ndarray, threshold: float, frame: int) -> np.ndarray:
+    loud = np.flatnonzero(rms >= threshold)
+    if len(loud) == 0:
+        return samples
+    return samples[loud[0] * frame:(loud[-1] + 1) * frame]
+
+def split_at_silences(samples: np.ndarray, sr: int, weights: List[int], sentences: List[int] = None,
+                      min_gap_sec: float = 0.08, frame_sec: float = 0.01,
+                      rel_threshold: float = 0.02) -> Union[List[np.ndarray], None]:
+    """
+    Cut one joined utterance back into len(weights) lines. Each cut goes at the silent
+    stretch nearest to where the line would end if speech time were proportional to
+    `weights` (text length). With `sentences` (sentence count per line), there must be
+    exactly one pause per sentence boundary, and line i ends at the pause after its
+    last sentence; a pause inside a line can then never be taken for the end of one.
+    None when the pauses don't line up; the caller then synthesizes those lines one by one.
+    """
+    n = len(weights)
+    if n == 1:
+        return [samples]
+    frame = max(1, int(sr * frame_sec))
+    rms = _frame_rms(samples, frame)
+    nf = len(rms)
+    if nf == 0:
+        return None
+    threshold = max(rel_threshold * float(rms.max()), 1e-4)
+    silent = np.concatenate([[False], rms < threshold, [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(silent))
+    starts, ends = edges[0::2], edges[1::2]
+    interior = (ends - starts >= max(1, int(min_gap_sec / frame_sec))) & (starts > 0) & (ends < nf)
+    centers = ((starts + ends) // 2)[interior]
+    if len(centers) < n - 1:
+        return None
+    if sentences is not None:
+        if len(centers) != sum(sentences) - 1:
+            return None
+        centers = centers[np.cumsum(sentences)[:-1] - 1]
+
+    expected = np.cumsum(weights)[:-1] / float(sum(weights)) * nf
+    tolerance = 0.5 * nf / n  # half an average line
+    cuts: List[int] = []
+    for e in expected:
+        cand = centers[centers > (cuts[-1] if cuts else 0)]
+        if len(cand) == 0:
+            return None
+        c = int(cand[np.argmin(np.abs(cand - e))])
+        if abs(c - e) > tolerance:
+            return None
+        cuts.append(c)
+    bounds = [0] + [c * frame for c in cuts] + [len(samples)]
+    pieces = []
+    for a, b in zip(bounds, bounds[1:]):
+        piece = samples[a:b]
+        pieces.append(_trim_silence(piece, _frame_rms(piece, frame), threshold, frame))
+    return pieces
+
+_SENTENCE_END_RE = re.compile(r"[.!?]+(?=\s|$)")
+
+def _joined(text: str) -> str:
+    # a sentence end makes Kokoro pause, which is where the lines get cut apart again
+    text = text.strip()
+    return text if text[-1:] in ".!?" else text + "."
+
+def _sentence_count(text: str) -> int:
+    return max(1, len(_SENTENCE_END_RE.findall(_joined(text))))
+
+def synthesize_lines(kokoro, items: List[Tuple[str, str]], batch_lines: int = TTS_BATCH_LINES,
+                     max_chars: int = TTS_BATCH_MAX_CHARS, stats: Dict[str, int] = None) -> List[Tuple[np.ndarray, int]]:
+    """
+    (samples, sr) for each (text, voice) in items, in order. Lines of the same voice are
+    joined, up to batch_lines lines / max_chars characters per Kokoro call. They need not
+    be adjacent in the dialogue, so a batch is only cut apart when Kokoro paused at every
+    sentence end (see split_at_silences); otherwise its lines are voiced one by one.
+    """
+    out: List[Any] = [None] * len(items)
+    stats = stats if stats is not None else {}
+
+    def one(i: int):
+        text, voice = items[i]
+        out[i] = kokoro.create(text, voice=voice, speed=1.0, lang="en-us")
+        stats["calls"] = stats.get("calls", 0) + 1
+
+    def flush(group: List[int]):
+        if len(group) == 1:
+            one(group[0])
+            return
+        voice = items[group[0]][1]
+        texts = [items[i][0] for i in group]
+        joined = " ".join(_joined(t) for t in texts)
+        with span("tts.batch", voice=voice, lines=len(group), text_chars=len(joined)) as sp:
+            samples, sr = kokoro.create(joined, voice=voice, speed=1.0, lang="en-us")
+            stats["calls"] = stats.get("calls", 0) + 1
+            stats["batches"] = stats.get("batches", 0) + 1
+            pieces = split_at_silences(samples, sr, [len(t) for t in texts],
+                                       sentences=[_sentence_count(t) for t in texts])
+            sp.set(split="silence" if pieces is not None else "fallback")
+        if pieces is None:
+            stats["fallbacks"] = stats.get("fallbacks", 0) + 1
+            for i in group:
+                one(i)
+            return
+        for i, piece in zip(group, pieces):
+            out[i] = (piece, sr)
+
+    by_voice: Dict[str, List[int]] = {}
+    for i, (_, voice) in enumerate(items):
+        by_voice.setdefault(voice, []).append(i)
+    for idxs in by_voice.values():
+        group: List[int] = []
+        chars = 0
+        for i in idxs:
+            n = len(items[i][0])
+            if group and (len(group) >= batch_lines or chars + n > max_chars):
+                flush(group)
+                group, chars = [], 0
+            group.append(i)
+            chars += n
+        if group:
+            flush(group)
+    return out
+
 # =========================================================
 # TTS Core
 # =========================================================
-def process_script(
-    script_text: str,
-    output_file: str,
-    model_path: str,
-    voice_config_path: str,
+def synthesize_segments(
+    script_text: Union[str, Iterable[str]],
+    kokoro,
     male_voice: str,
     female_voice: str,
     random_pause_enabled: bool,
@@ -163,57 +524,173 @@ def process_script(
     enable_gestures: bool,
     gesture_prob: float,
     gesture_phrases_csv: str,
-    enable_bg_music: bool,
-    bg_choice_name: str,
-    bg_map: dict,
-    bg_reduction_db: int,
-    add_bg_end: bool,
-    bg_end_duration_sec: int,
-    kokoro=None,
     progress=None,
-):
-    t0 = time.time()
-    if kokoro is None:
-        if progress: progress(0.0, desc="Initializing TTS")
-        kokoro = Kokoro(model_path, voice_config_path)
-
+    model_path: str = "",
+    spill: bool = False,
+    rng=None,
+    batch_lines: int = None,
+    stems: StemWriter = None,
+) -> Tuple[Union[List[AudioSegment], PCMSpill], int]:
+    """
+    Synthesis stage: one segment per line plus pauses. Empty list if the script has no
+    valid lines. With spill=True the audio goes to a PCMSpill instead (closed by
+    mix_and_export), so only the current line is held in memory. Pauses and gestures
+    are drawn from `rng` (a seeded random.Random makes the episode reproducible).
+    batch_lines > 1 synthesizes lines in windows of 2 x batch_lines through
+    synthesize_lines, all at the window's first line. Progress, cancellation and pause
+    are only seen between lines, so with batching they take effect once per window
+    rather than after every line. Each line's voice audio and pause also go to `stems`
+    when given.
+    script_text may also be an iterable of lines still being written (a ScriptFeed): each
+    line is voiced as soon as it arrives, one Kokoro call per line.
+    """
+    rng = rng or random
+    streamed = not isinstance(script_text, str)
+    # a batch window would wait for lines that haven't been written yet
+    batch_lines = 1 if streamed else TTS_BATCH_LINES if batch_lines is None else batch_lines
+    window: Dict[int, Tuple[np.ndarray, int]] = {}
     voices = {"male": male_voice, "female": female_voice}
     default_voice = male_voice
     gesture_phrases = [p.strip() for p in gesture_phrases_csv.split(",") if p.strip()]
-    pairs = parse_script(script_text)
-
-    if not pairs:
-        return None, None, "**No valid 'Speaker: text' lines found in the script.**"
+    pairs = (pair for line in script_text for pair in parse_script(line)) if streamed else parse_script(script_text)
 
     audio_segments = []
     sample_rate_ref = None
-    total = len(pairs)
-
-    for idx, (speaker, text) in enumerate(pairs):
-        if progress: progress((idx + 1) / (total + 1), desc=f"TTS line {idx+1}/{total}")
-        voice = voices.get(speaker, default_voice)
-        samples, sr = kokoro.create(text, voice=voice, speed=1.0, lang="en-us")
-        if sample_rate_ref is None:
-            sample_rate_ref = sr
-        main_seg = numpy_to_audio_segment(samples, sr)
-
-        if enable_gestures and random.random() < float(gesture_prob) and gesture_phrases:
-            gesture_voice = voices["female"] if speaker == "male" else voices["male"]
-            g_text = random.choice(gesture_phrases)
-            g_samples, _ = kokoro.create(g_text, voice=gesture_voice, speed=1.0, lang="en-us")
-            g_seg = numpy_to_audio_segment(g_samples, sr)
-            main_seg = overlay_appreciative_gesture(main_seg, g_seg)
-
-        audio_segments.append(main_seg)
-        pause_sec = random.uniform(pause_min_sec, pause_max_sec) if random_pause_enabled else pause_max_sec
-        if pause_sec > 0:
-            audio_segments.append(AudioSegment.silent(duration=int(pause_sec * 1000)))
+    total = None if streamed else len(pairs)
+    out = None
 
     try:
-        final_audio = sum(audio_segments)
-    except TypeError:
-        return None, None, "**Failed to build final audio.**"
+        for idx, (speaker, text) in enumerate(pairs):
+            if progress:
+                if total is None:
+                    # length unknown until the feed closes; the prompt asks for at most 16 lines
+                    progress(min(0.95, (idx + 1) / 17), desc=f"TTS line {idx+1}")
+                else:
+                    progress((idx + 1) / (total + 1), desc=f"TTS line {idx+1}/{total}")
+            voice = voices.get(speaker, default_voice)
+            if batch_lines > 1 and idx not in window:
+                # two speakers alternate, so a window of 2x lines fills one batch per voice;
+                # the whole window is voiced here, before any cancel/pause check can run
+                end = min(total, idx + 2 * batch_lines)
+                items = [(t, voices.get(s, default_voice)) for s, t in pairs[idx:end]]
+                window = dict(zip(range(idx, end), synthesize_lines(kokoro, items, batch_lines)))
+            with span("tts.line", index=idx, speaker=speaker, voice=voice, text_chars=len(text),
+                      batched=batch_lines > 1) as sp:
+                if batch_lines > 1:
+                    samples, sr = window.pop(idx)
+                else:
+                    samples, sr = kokoro.create(text, voice=voice, speed=1.0, lang="en-us")
+                sp.set(audio_sec=round(len(samples) / sr, 3) if sr else 0.0)
+            if sample_rate_ref is None:
+                sample_rate_ref = sr
+            main_seg = numpy_to_audio_segment(samples, sr)
+
+            if enable_gestures and rng.random() < float(gesture_prob) and gesture_phrases:
+                gesture_voice = voices["female"] if speaker == "male" else voices["male"]
+                g_text = rng.choice(gesture_phrases)
+                g_seg = gesture_clip(kokoro, model_path, g_text, gesture_voice)
+                main_seg = overlay_appreciative_gesture(main_seg, g_seg, rng)
+
+            pause_sec = rng.uniform(pause_min_sec, pause_max_sec) if random_pause_enabled else pause_max_sec
+            pcm = None
+            if spill and out is None:
+                out = PCMSpill(dir=SPILL_DIR)
+            if out is not None or stems is not None:
+                pcm = main_seg.set_frame_rate(sample_rate_ref).set_sample_width(2).raw_data
+            if stems is not None:
+                stems.add(pcm, sample_rate_ref, speaker=speaker, voice=voice, pause_sec=round(pause_sec, 4))
+            if out is not None:
+                if out.sample_rate is None:
+                    out.sample_rate = sample_rate_ref
+                out.append_pcm(pcm)
+                if pause_sec > 0:
+                    out.append_silence(int(pause_sec * out.sample_rate))
+                continue
+            audio_segments.append(main_seg)
+            if pause_sec > 0:
+                audio_segments.append(AudioSegment.silent(duration=int(pause_sec * 1000)))
+    except BaseException:
+        if out is not None:
+            out.close()
+        raise
+
+    return (out if out is not None else audio_segments), sample_rate_ref
+
+def mix_and_export(
+    audio_segments: Union[List[AudioSegment], PCMSpill],
+    sample_rate_ref: int,
+    output_file: str,
+    enable_bg_music: bool,
+    bg_choice_name: str,
+    bg_map: dict,
+    bg_reduction_db: int,
+    add_bg_end: bool,
+    bg_end_duration_sec: int,
+    t0: float,
+    output_path: str = None,
+):
+    """
+    Assembly/encoding stage: join segments, mix background music, export MP3.
+    Writes to output_path if given, else GENERATED_FOLDER/output_file.
+    """
+    if isinstance(audio_segments, PCMSpill):
+        with audio_segments:
+            return export_spilled(
+                audio_segments, output_file, enable_bg_music, bg_choice_name, bg_map,
+                bg_reduction_db, add_bg_end, bg_end_duration_sec, t0, output_path=output_path,
+            )
+    with span("tts.mix", segments=len(audio_segments), bg_music=bool(enable_bg_music and bg_choice_name)):
+        try:
+            final_audio = mix_background(
+                sum(audio_segments), sample_rate_ref, enable_bg_music, bg_choice_name, bg_map,
+                bg_reduction_db, add_bg_end, bg_end_duration_sec,
+            )
+        except TypeError:
+            return None, None, "**Failed to build final audio.**"
+
+    out_path = output_path or os.path.join(GENERATED_FOLDER, output_file)
+    with span("tts.export", audio_sec=round(len(final_audio) / 1000.0, 3), format="mp3") as sp:
+        export_atomic(final_audio, out_path)
+        sp.set(bytes=os.path.getsize(out_path))
+    if os.path.dirname(os.path.abspath(out_path)) == os.path.abspath(GENERATED_FOLDER):
+        ARTIFACTS.register(out_path)
+    dur_sec = len(final_audio) / 1000.0
+    elapsed = time.time() - t0
+    md = f"**Created:** `{out_path}`  \n**Length:** {dur_sec:.2f}s  \n**Processing:** {elapsed:.2f}s"
+    return out_path, out_path, md
+
+def export_spilled(spill: PCMSpill, output_file: str, enable_bg_music: bool, bg_choice_name: str,
+                   bg_map: dict, bg_reduction_db: int, add_bg_end: bool, bg_end_duration_sec: int,
+                   t0: float, output_path: str = None):
+    """mix_and_export for a PCMSpill: one pass, block by block, through the mixer into ffmpeg."""
+    sr = spill.sample_rate
+    bg = None
+    if enable_bg_music and bg_choice_name and bg_map and bg_choice_name in bg_map:
+        try:
+            # decoded once at the episode's rate; looped by index rather than tiled
+            seg = AudioSegment.from_file(bg_map[bg_choice_name], format="mp3")
+            seg = seg.set_frame_rate(sr).set_channels(1).set_sample_width(2) - int(bg_reduction_db)
+            bg = np.frombuffer(seg.raw_data, dtype=np.int16)
+        except Exception as e:
+            print("[BG overlay warning]", e)
+    tail = int(bg_end_duration_sec * sr) if (bg is not None and add_bg_end) else 0
+
+    out_path = output_path or os.path.join(GENERATED_FOLDER, output_file)
+    with span("tts.export", audio_sec=round(spill.duration_sec(), 3), format="mp3", assembly="spill",
+              block_sec=SPILL_BLOCK_SEC) as sp:
+        write_atomic(out_path, lambda tmp: encode_stream(
+            mixed_blocks(spill, bg, tail), sr, tmp, converter=AudioSegment.converter))
+        sp.set(bytes=os.path.getsize(out_path))
+    if os.path.dirname(os.path.abspath(out_path)) == os.path.abspath(GENERATED_FOLDER):
+        ARTIFACTS.register(out_path)
+    dur_sec = (len(spill) + (min(tail, len(bg)) if tail else 0)) / sr
+    elapsed = time.time() - t0
+    md = f"**Created:** `{out_path}`  \n**Length:** {dur_sec:.2f}s  \n**Processing:** {elapsed:.2f}s"
+    return out_path, out_path, md
 
+def mix_background(final_audio: AudioSegment, sample_rate_ref: int, enable_bg_music: bool,
+                   bg_choice_name: str, bg_map: dict, bg_reduction_db: int,
+                   add_bg_end: bool, bg_end_duration_sec: int) -> AudioSegment:
     bg_file_path = None
     if enable_bg_music and bg_choice_name and bg_map and bg_choice_name in bg_map:
         bg_file_path = bg_map[bg_choice_name]
@@ -236,19 +713,244 @@ def process_script(
             final_audio += tail_bg[: int(bg_end_duration_sec * 1000)]
         except Exception as e:
             print("[BG tail warning]", e)
+    return final_audio
 
-    out_path = os.path.join(GENERATED_FOLDER, output_file)
-    final_audio.export(out_path, format="mp3")
-    dur_sec = len(final_audio) / 1000.0
-    elapsed = time.time() - t0
-    md = f"**Created:** `{out_path}`  \n**Length:** {dur_sec:.2f}s  \n**Processing:** {elapsed:.2f}s"
+def process_script(
+    script_text: Union[str, Iterable[str]],
+    output_file: str,
+    model_path: str,
+    voice_config_path: str,
+    male_voice: str,
+    female_voice: str,
+    random_pause_enabled: bool,
+    pause_min_sec: float,
+    pause_max_sec: float,
+    enable_gestures: bool,
+    gesture_prob: float,
+    gesture_phrases_csv: str,
+    enable_bg_music: bool,
+    bg_choice_name: str,
+    bg_map: dict,
+    bg_reduction_db: int,
+    add_bg_end: bool,
+    bg_end_duration_sec: int,
+    kokoro=None,
+    progress=None,
+    output_path: str = None,
+    seed: int = None,
+    batch_lines: int = None,
+):
+    """
+    output_path: final file location; defaults to GENERATED_FOLDER/output_file.
+    seed: makes pauses and gestures reproducible, and lets an identical earlier run
+    (same script, voices, model and settings) be served from the episode cache.
+    batch_lines: lines per Kokoro call (default TTS_BATCH_LINES; see synthesize_lines).
+    script_text may be an iterable of lines that are still arriving (see synthesize_segments);
+    the episode cache is then only written, keyed by the finished script.
+    """
+    t0 = time.time()
+    key = None
+    received: Optional[List[str]] = None
+    if not isinstance(script_text, str):
+        received = []
+        script_text = _recorded(script_text, received)
+    elif seed is not None:
+        key = episode_key(
+            script_text, model_path, voice_config_path, male_voice, female_voice,
+            random_pause_enabled, pause_min_sec, pause_max_sec,
+            enable_gestures, gesture_prob, gesture_phrases_csv,
+            enable_bg_music, bg_choice_name, bg_map, bg_reduction_db,
+            add_bg_end, bg_end_duration_sec, seed, batch_lines=batch_lines,
+        )
+        out_path = output_path or os.path.join(GENERATED_FOLDER, output_file)
+        with span("tts.cache", key=key) as sp:
+            hit = cached_episode(key, out_path)
+            sp.set(hit=hit)
+        if hit:
+            if progress: progress(1.0, desc="Done (cached)")
+            md = f"**Created:** `{out_path}`  \n**Cached:** same script, settings and seed  \n**Processing:** {time.time() - t0:.2f}s"
+            return out_path, out_path, md
+
+    if kokoro is None:
+        if progress: progress(0.0, desc="Initializing TTS")
+        with span("kokoro.load", model=model_path):
+            kokoro = make_kokoro(model_path, voice_config_path)
+
+    spill = use_spill(script_text) if received is None else TTS_ASSEMBLY == "spill"
+    stems = StemWriter(dir=SPILL_DIR) if TTS_KEEP_STEMS else None
+    try:
+        with span("tts.synthesize", script_chars=len(script_text) if received is None else None,
+                  streamed=received is not None, assembly="spill" if spill else "memory"):
+            audio_segments, sample_rate_ref = synthesize_segments(
+                script_text, kokoro, male_voice, female_voice,
+                random_pause_enabled, pause_min_sec, pause_max_sec,
+                enable_gestures, gesture_prob, gesture_phrases_csv,
+                progress=progress, model_path=model_path, spill=spill,
+                rng=random.Random(seed) if seed is not None else None, batch_lines=batch_lines,
+                stems=stems,
+            )
+        if not audio_segments:
+            return None, None, "**No valid 'Speaker: text' lines found in the script.**"
+        if received is not None and seed is not None:
+            key = episode_key(
+                "\n".join(received), model_path, voice_config_path, male_voice, female_voice,
+                random_pause_enabled, pause_min_sec, pause_max_sec,
+                enable_gestures, gesture_prob, gesture_phrases_csv,
+                enable_bg_music, bg_choice_name, bg_map, bg_reduction_db,
+                add_bg_end, bg_end_duration_sec, seed, batch_lines=1,
+            )
+
+        result = mix_and_export(
+            audio_segments, sample_rate_ref, output_file,
+            enable_bg_music, bg_choice_name, bg_map, bg_reduction_db,
+            add_bg_end, bg_end_duration_sec, t0, output_path=output_path,
+        )
+        if stems is not None and result[1]:
+            try:
+                stems.save(stems_path(result[1]), key=key, seed=seed, random_pause_enabled=bool(random_pause_enabled),
+                           pause_min_sec=float(pause_min_sec), pause_max_sec=float(pause_max_sec))
+            except OSError as e:
+                print("[Stems warning]", e)
+    finally:
+        if stems is not None:
+            stems.close()
+    if key is not None:
+        store_episode(key, result[1])
     if progress: progress(1.0, desc="Done")
-    return out_path, out_path, md
+    return result
+
+def _recorded(lines: Iterable[str], into: List[str]) -> Iterator[str]:
+    for line in lines:
+        into.append(line)
+        yield line
+
+def stems_path(episode_path: str) -> str:
+    return os.path.splitext(episode_path)[0] + STEMS_SUFFIX
+
+def remix_episode(
+    episode_path: str,
+    enable_bg_music: bool,
+    bg_choice_name: str,
+    bg_map: dict,
+    bg_reduction_db: int,
+    add_bg_end: bool,
+    bg_end_duration_sec: int,
+    random_pause_enabled: bool = None,
+    pause_min_sec: float = None,
+    pause_max_sec: float = None,
+    seed: int = None,
+    output_path: str = None,
+):
+    """
+    Rebuild an episode from its stems with new mixing settings: no Kokoro calls, just
+    one streaming pass through the mixer into ffmpeg. Pauses are kept unless
+    random_pause_enabled is given, in which case they are drawn again (from `seed`).
+    Writes output_path (default: replaces the episode). Same return shape as process_script.
+    """
+    t0 = time.time()
+    sd = stems_path(episode_path)
+    try:
+        index, voice = load_stems(sd)
+    except (OSError, ValueError):
+        return None, None, f"**No stems for `{episode_path}`; generate it again to enable remixing.**"
+    out_path = output_path or episode_path
+    sr = index["sample_rate"]
+    lines = index["lines"]
+    if random_pause_enabled is not None:
+        pmin = index["pause_min_sec"] if pause_min_sec is None else float(pause_min_sec)
+        pmax = index["pause_max_sec"] if pause_max_sec is None else float(pause_max_sec)
+        rng = random.Random(seed)
+        for line in lines:
+            line["pause_sec"] = round(rng.uniform(pmin, pmax) if random_pause_enabled else pmax, 4)
+        index.update(random_pause_enabled=bool(random_pause_enabled), pause_min_sec=pmin, pause_max_sec=pmax)
+
+    with span("tts.remix", lines=len(lines), bg_music=bool(enable_bg_music and bg_choice_name)):
+        with PCMSpill(sample_rate=sr, dir=SPILL_DIR) as spill:
+            for line in lines:
+                spill.append_pcm(voice[line["start"]:line["start"] + line["samples"]].tobytes())
+                if line["pause_sec"] > 0:
+                    spill.append_silence(int(line["pause_sec"] * sr))
+            del voice  # release the memmap before the stems may be rewritten below
+            result = export_spilled(
+                spill, os.path.basename(out_path), enable_bg_music, bg_choice_name, bg_map,
+                bg_reduction_db, add_bg_end, bg_end_duration_sec, t0, output_path=out_path,
+            )
+
+    # the voice track is unchanged; only the index (pauses) follows the new episode
+    out_sd = stems_path(out_path)
+    if out_sd != sd:
+        os.makedirs(out_sd, exist_ok=True)
+        write_atomic(os.path.join(out_sd, "voice.pcm"), lambda tmp: _link_or_copy(os.path.join(sd, "voice.pcm"), tmp))
+
+    # the remix isn't the cached episode for that key any more: a later cache hit here
+    # must replace these stems rather than pair them with the un-remixed MP3
+    index["key"] = None
+
+    def write_index(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    write_atomic(os.path.join(out_sd, "index.json"), write_index)
+    return result[0], result[1], result[2].replace("**Created:**", "**Remixed:**", 1)
 
 # =========================================================
 # Gemini PDF → JSON
 # =========================================================
+GEMINI_LIMITER = GeminiLimiter(GEMINI_RPM, GEMINI_TPM, max_retries=GEMINI_MAX_RETRIES)
+_fake_gemini = None
+
+def gemini_model():
+    global _fake_gemini
+    if GEMINI_FAKE:
+        if _fake_gemini is None:
+            from fakes import FakeGeminiModel
+            _fake_gemini = FakeGeminiModel(
+                latency=float(os.environ.get("GEMINI_FAKE_LATENCY", "0")),
+                fail_rate=float(os.environ.get("GEMINI_FAKE_429_RATE", "0")),
+            )
+        return _fake_gemini
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def _usage_tokens(resp) -> int:
+    return getattr(getattr(resp, "usage_metadata", None), "total_token_count", 0) or 0
+
+def gemini_generate(model, parts: List[Any]):
+    """generate_content through the process-wide limiter (queues, retries 429/5xx)."""
+    est = estimate_tokens(parts, file_tokens=GEMINI_FILE_TOKENS)
+    with span("gemini.generate", model=getattr(model, "model_name", GEMINI_MODEL), est_tokens=est) as sp:
+        retries0 = GEMINI_LIMITER.stats["retries"]
+        resp = GEMINI_LIMITER.call(lambda: model.generate_content(parts), est_tokens=est, usage=_usage_tokens)
+        # process-wide counter, so only approximate under concurrency
+        sp.set(tokens=_usage_tokens(resp), retries=GEMINI_LIMITER.stats["retries"] - retries0)
+        return resp
+
+def gemini_generate_stream(model, parts: List[Any]) -> Iterator[str]:
+    """
+    gemini_generate with stream=True: yields text as the model writes it. Only opening the
+    stream is retried; an error mid-stream propagates (the caller has already used the text).
+    """
+    est = estimate_tokens(parts, file_tokens=GEMINI_FILE_TOKENS)
+    with span("gemini.stream", model=getattr(model, "model_name", GEMINI_MODEL), est_tokens=est) as sp:
+        t0 = time.time()
+        resp = GEMINI_LIMITER.call(lambda: model.generate_content(parts, stream=True), est_tokens=est)
+        chunks = 0
+        for chunk in resp:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # a chunk without text parts (e.g. only safety ratings)
+            if chunks == 0:
+                sp.set(first_chunk_sec=round(time.time() - t0, 3))
+            chunks += 1
+            if text:
+                yield text
+        real = _usage_tokens(resp)
+        if real:
+            GEMINI_LIMITER.tokens.adjust(est - real)
+        sp.set(chunks=chunks, tokens=real)
+
 def ensure_gemini():
+    if GEMINI_FAKE:
+        return
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY not set in environment.")
@@ -270,21 +972,19 @@ def read_pdf_text(path: str, max_chars: int = 200_000) -> str:
             break
     return "\n\n".join(chunks)[:max_chars]
 
-def gemini_extract_metadata_and_script(pdf_path: str) -> Dict[str, Any]:
-    ensure_gemini()
-    model = genai.GenerativeModel(GEMINI_MODEL)
-
-    file_obj = None
-    try:
-        file_obj = genai.upload_file(pdf_path)
-    except Exception as e:
-        print("[Gemini upload warning]", e)
-
-    text_snippet = read_pdf_text(pdf_path, max_chars=120_000)
+def read_pdf_pages(path: str) -> List[str]:
+    """Extracted text per page ("" for pages pypdf can't read)."""
+    out = []
+    for page in PdfReader(path).pages:
+        try:
+            out.append(page.extract_text() or "")
+        except Exception:
+            out.append("")
+    return out
 
-    system = "You are an expert scientific editor. Extract structured metadata and produce a short summary and a two-speaker podcast script."
+GEMINI_SYSTEM = "You are an expert scientific editor. Extract structured metadata and produce a short summary and a two-speaker podcast script."
 
-    prompt_head = """
+GEMINI_PROMPT_HEAD = """
 Given this research paper, extract fields and generate a brief:
 Return valid JSON only with keys:
 conference, year, link, domain, title, summary, tags, script
@@ -316,21 +1016,22 @@ STRICT FORMAT EXAMPLE:
 }
 """.strip()
 
-    prompt_tail = (
-        "Paper text (snippet for grounding, may be partial):\n```\n"
-        + text_snippet[:6000]
-        + "\n```"
-    )
+# Appended when the response is streamed, so script lines arrive before everything else
+GEMINI_STREAM_HINT = 'Write the "script" key first, before the other keys.'
 
-    try:
-        if file_obj is not None:
-            resp = model.generate_content([system, prompt_head, prompt_tail, file_obj])
-        else:
-            resp = model.generate_content([system, prompt_head, prompt_tail])
-        txt = resp.text
-    except Exception as e:
-        raise RuntimeError(f"Gemini call failed: {e}")
+# Long-document (map-reduce) mode
+LONG_DOC_PAGES = int(os.environ.get("GEMINI_LONG_DOC_PAGES", "40"))
+LONG_DOC_CHARS = int(os.environ.get("GEMINI_LONG_DOC_CHARS", "150000"))
+GEMINI_CHUNK_CHARS = int(os.environ.get("GEMINI_CHUNK_CHARS", "24000"))
+GEMINI_MAP_CONCURRENCY = int(os.environ.get("GEMINI_MAP_CONCURRENCY", "4"))
 
+# Adaptive input: send extracted text only when it is trustworthy, upload pages only when it isn't
+TEXT_ONLY_MAX_CHARS = int(os.environ.get("GEMINI_TEXT_ONLY_MAX_CHARS", "100000"))
+MIN_PAGE_CHARS = 200       # below this a page is likely a scan or a full-page figure
+MIN_PAGE_QUALITY = 0.6     # fraction of "normal" characters on a page
+MAX_UPLOAD_PAGES = 8       # text+pages mode uploads at most this many pages
+
+def parse_metadata_response(txt: str) -> Dict[str, Any]:
     try:
         m = re.search(r"\{.*\}", txt, re.S)
         data = json.loads(m.group(0) if m else txt)
@@ -354,6 +1055,310 @@ STRICT FORMAT EXAMPLE:
     out["script"] = script
     return out
 
+def _generate_text(model, parts: List[Any], cancel=None) -> str:
+    check_cancel(cancel)
+    try:
+        return gemini_generate(model, parts).text
+    except RateLimitExhausted:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Gemini call failed: {e}")
+
+class ScriptLineParser:
+    """
+    Pulls the "script" array's strings out of a JSON response while it is still being
+    written: feed() takes the next chunk and returns the lines completed by it.
+    """
+    _START = re.compile(r'"script"\s*:\s*\[')
+
+    def __init__(self):
+        self.text = ""
+        self.lines: List[str] = []
+        self._pos: Optional[int] = None  # just past the last parsed line; None until the array opens
+        self._done = False
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        if self._done:
+            return []
+        if self._pos is None:
+            m = self._START.search(self.text)
+            if not m:
+                return []
+            self._pos = m.end()
+        new = []
+        while True:
+            i = self._pos
+            while i < len(self.text) and self.text[i] in " \t\r\n,":
+                i += 1
+            if i >= len(self.text):
+                break
+            if self.text[i] != '"':
+                self._done = True  # "]" or anything that isn't a string ends the array
+                break
+            end = i + 1
+            while end < len(self.text) and self.text[end] != '"':
+                end += 2 if self.text[end] == "\\" else 1
+            if end >= len(self.text):
+                break  # the string isn't finished yet
+            try:
+                line = json.loads(self.text[i:end + 1])
+            except ValueError:
+                self._done = True
+                break
+            self._pos = end + 1
+            new.append(line)
+        self.lines.extend(new)
+        return new
+
+def _generate_metadata(model, parts: List[Any], cancel=None, on_script_line=None) -> Dict[str, Any]:
+    """
+    The final metadata/script call. With on_script_line the response is streamed and each
+    script line is passed on as soon as its closing quote arrives.
+    """
+    if on_script_line is None:
+        return parse_metadata_response(_generate_text(model, parts, cancel))
+    check_cancel(cancel)
+    parser = ScriptLineParser()
+    try:
+        for chunk in gemini_generate_stream(model, parts + [GEMINI_STREAM_HINT]):
+            check_cancel(cancel)
+            for line in parser.feed(chunk):
+                on_script_line(line)
+    except (RateLimitExhausted, JobCancelled):
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Gemini call failed: {e}")
+    out = parse_metadata_response(parser.text)
+    # a script sent as one string, or lines the incremental parse missed
+    for line in out["script"][len(parser.lines):]:
+        on_script_line(line)
+    return out
+
+# "3 Method", "3.2 Results", "IV. EXPERIMENTS", "Abstract", "Conclusion"...
+_SECTION_RE = re.compile(
+    r"^\s*(?:(?:\d+(?:\.\d+)*|[IVX]+)\.?\s+[A-Z][^\n]{2,80}"
+    r"|(?:abstract|introduction|related work|background|method(?:s|ology)?|experiments?|results|discussion|conclusions?|appendix)\b[^\n]{0,60})$",
+    re.I | re.M,
+)
+_REFERENCES_RE = re.compile(r"^\s*(?:\d+\.?\s+)?(?:references|bibliography)\s*$", re.I | re.M)
+
+def split_sections(text: str, max_chars: int = GEMINI_CHUNK_CHARS) -> List[str]:
+    """
+    Split paper text on section headings (dropping the bibliography), then pack
+    consecutive sections into chunks of at most max_chars. Oversized sections
+    are cut on paragraph boundaries.
+    """
+    refs = _REFERENCES_RE.search(text)
+    if refs and refs.start() > len(text) // 2:
+        text = text[:refs.start()]
+
+    starts = [0] + [m.start() for m in _SECTION_RE.finditer(text) if m.start() > 0]
+    sections = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    pieces: List[str] = []
+    for sec in sections:
+        while len(sec) > max_chars:
+            cut = sec.rfind("\n\n", 0, max_chars)
+            if cut < max_chars // 2:
+                cut = max_chars
+            pieces.append(sec[:cut])
+            sec = sec[cut:]
+        pieces.append(sec)
+
+    chunks: List[str] = []
+    cur = ""
+    for piece in pieces:
+        if cur and len(cur) + len(piece) > max_chars:
+            chunks.append(cur)
+            cur = ""
+        cur += piece
+    if cur.strip():
+        chunks.append(cur)
+    return [c for c in chunks if c.strip()]
+
+def summarize_chunks(model, chunks: List[str], cancel=None, progress=None) -> List[str]:
+    """Map step: summarize each chunk concurrently (the limiter keeps this within quota)."""
+    done = [0]
+    lock = threading.Lock()
+
+    def one(i: int, chunk: str) -> str:
+        prompt = (
+            f"This is part {i+1} of {len(chunks)} of a research paper. "
+            "Summarize it in at most 200 words for a later editor: keep the problem, method, "
+            "datasets, key numbers and claims; keep any title, venue, year, arXiv/DOI link you see. "
+            "Plain text only.\n```\n" + chunk + "\n```"
+        )
+        with span("gemini.chunk", index=i, chars=len(chunk)):
+            out = _generate_text(model, [GEMINI_SYSTEM, prompt], cancel).strip()
+        if progress:
+            with lock:
+                done[0] += 1
+                progress(done[0] / len(chunks), desc=f"Summarized part {done[0]}/{len(chunks)}")
+        return out
+
+    with span("gemini.map", chunks=len(chunks)), \
+            ThreadPoolExecutor(max_workers=max(1, GEMINI_MAP_CONCURRENCY), thread_name_prefix="gemini-map") as ex:
+        return list(ex.map(bind(one), range(len(chunks)), chunks))
+
+def page_text_quality(text: str) -> float:
+    """Share of letters/digits/whitespace/common punctuation; mangled encodings score low."""
+    if not text:
+        return 0.0
+    bad = text.count("\ufffd") + 5 * text.count("(cid:")
+    good = sum(1 for ch in text if ch.isalnum() or ch.isspace() or ch in ".,;:()[]-'\"%/=+")
+    return max(0.0, (good - bad) / len(text))
+
+def assess_pdf_text(pages: List[str]) -> Dict[str, Any]:
+    poor = [i for i, t in enumerate(pages)
+            if len(t.strip()) < MIN_PAGE_CHARS or page_text_quality(t) < MIN_PAGE_QUALITY]
+    chars = sum(len(t) for t in pages)
+    quality = sum(page_text_quality(t) for t in pages) / len(pages) if pages else 0.0
+    return {"pages": len(pages), "chars": chars, "poor_pages": poor, "quality": round(quality, 3)}
+
+def choose_input_mode(assessment: Dict[str, Any]) -> str:
+    """ "text" (clean extraction), "pages" (text + the few bad pages), or "upload" (whole PDF). """
+    n = assessment["pages"]
+    poor = assessment["poor_pages"]
+    if n == 0 or assessment["chars"] < 2000 or len(poor) > n // 2:
+        return "upload"
+    if not poor:
+        return "text"
+    if len(poor) <= MAX_UPLOAD_PAGES:
+        return "pages"
+    return "upload"
+
+def write_pdf_subset(pdf_path: str, page_indices: List[int]) -> str:
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for i in page_indices:
+        writer.add_page(reader.pages[i])
+    fd, out = tempfile.mkstemp(suffix=".pdf", prefix="pages_")
+    with os.fdopen(fd, "wb") as fh:
+        writer.write(fh)
+    return out
+
+def gemini_extract_long(pdf_path: str, text: str = None, cancel=None, progress=None,
+                        on_script_line=None) -> Dict[str, Any]:
+    """Map-reduce extraction for long papers: chunk summaries feed one final metadata/script call."""
+    ensure_gemini()
+    model = gemini_model()
+    if text is None:
+        text = read_pdf_text(pdf_path, max_chars=2_000_000)
+    chunks = split_sections(text)
+    # the map step is most of the work: 10%..80% of this job's progress
+    map_progress = (lambda frac, desc="": progress(0.1 + 0.7 * frac, desc=desc)) if progress else None
+    summaries = summarize_chunks(model, chunks, cancel, progress=map_progress)
+
+    front_matter = text[:2000]
+    digest = "\n\n".join(f"[Part {i+1}/{len(summaries)}]\n{sm}" for i, sm in enumerate(summaries))
+    prompt_tail = (
+        "Paper front matter (verbatim):\n```\n" + front_matter + "\n```\n\n"
+        "Section-by-section summaries covering the whole paper:\n```\n" + digest + "\n```"
+    )
+    if progress: progress(0.8, desc="Writing metadata and script")
+    with span("gemini.reduce", digest_chars=len(digest)):
+        out = _generate_metadata(model, [GEMINI_SYSTEM, GEMINI_PROMPT_HEAD, prompt_tail], cancel, on_script_line)
+    out["extraction"] = {"mode": "long", "chunks": len(chunks)}
+    return out
+
+def _gemini_upload(path: str):
+    try:
+        if not GEMINI_FAKE:
+            with span("gemini.upload", bytes=os.path.getsize(path)):
+                return GEMINI_LIMITER.call(lambda: genai.upload_file(path), count_request=False)
+    except Exception as e:
+        print("[Gemini upload warning]", e)
+    return None
+
+def gemini_extract_metadata_and_script(pdf_path: str, mode: str = "auto", cancel=None, progress=None,
+                                       on_script_line=None) -> Dict[str, Any]:
+    """
+    mode:
+      "text"   - extracted text only, no upload (cheapest; clean born-digital PDFs)
+      "pages"  - extracted text plus only the pages whose text extraction is poor
+      "upload" - snippet + the whole PDF uploaded (scans, figure-heavy papers)
+      "long"   - map-reduce over the full text (see gemini_extract_long)
+      "auto"   - long for LONG_DOC_PAGES+ pages or text that doesn't fit one call
+                 (over TEXT_ONLY_MAX_CHARS, or LONG_DOC_CHARS+), else picked from text quality
+    The chosen path, its latency and the quality assessment are returned under "extraction";
+    "truncated" says whether the text sent was cut to TEXT_ONLY_MAX_CHARS ("text"/"pages").
+    `cancel` (a threading.Event) is checked before every Gemini request;
+    `progress(frac, desc=...)` is called at each stage, as in process_script.
+    `on_script_line(line)`, if given, streams the final call and gets each script line as
+    it arrives (see _generate_metadata), e.g. to start TTS before the response is done.
+    """
+    ensure_gemini()
+    t0 = time.time()
+
+    if progress: progress(0.0, desc="Reading PDF")
+    with span("pdf.read") as sp:
+        pages = read_pdf_pages(pdf_path)
+        text = "\n\n".join(t for t in pages if t)
+        assessment = assess_pdf_text(pages)
+        sp.set(pages=assessment["pages"], chars=assessment["chars"], poor_pages=len(assessment["poor_pages"]))
+    if mode == "auto":
+        if assessment["pages"] >= LONG_DOC_PAGES or len(text) >= LONG_DOC_CHARS \
+                or len(text) > TEXT_ONLY_MAX_CHARS:
+            mode = "long"
+        else:
+            mode = choose_input_mode(assessment)
+    cur = current_span()
+    if cur is not None:
+        cur.set(extraction_mode=mode)
+
+    truncated = False
+    if mode == "long":
+        out = gemini_extract_long(pdf_path, text=text, cancel=cancel, progress=progress, on_script_line=on_script_line)
+    else:
+        model = gemini_model()
+        upload_path = None
+        if mode == "upload":
+            upload_path = pdf_path
+        elif mode == "pages" and assessment["poor_pages"]:
+            upload_path = write_pdf_subset(pdf_path, assessment["poor_pages"][:MAX_UPLOAD_PAGES])
+
+        check_cancel(cancel)
+        if progress and upload_path: progress(0.1, desc="Uploading PDF pages")
+        try:
+            file_obj = _gemini_upload(upload_path) if upload_path else None
+        finally:
+            if upload_path and upload_path != pdf_path:
+                os.remove(upload_path)
+
+        if mode == "upload":
+            prompt_tail = (
+                "Paper text (snippet for grounding, may be partial):\n```\n"
+                + text[:6000]
+                + "\n```"
+            )
+        else:
+            truncated = len(text) > TEXT_ONLY_MAX_CHARS
+            if truncated:
+                print(f"[Gemini extract warning] {os.path.basename(pdf_path)}: text cut from {len(text)} "
+                      f"to {TEXT_ONLY_MAX_CHARS} chars; mode 'long' reads all of it")
+            prompt_tail = "Paper text (extracted):\n```\n" + text[:TEXT_ONLY_MAX_CHARS] + "\n```"
+            if file_obj is not None:
+                prompt_tail += "\nThe attached PDF holds the pages whose text could not be extracted (figures, tables, scans)."
+
+        parts = [GEMINI_SYSTEM, GEMINI_PROMPT_HEAD, prompt_tail]
+        if file_obj is not None:
+            parts.append(file_obj)
+        if progress: progress(0.2, desc="Writing metadata and script")
+        out = _generate_metadata(model, parts, cancel, on_script_line)
+        out["extraction"] = {"mode": mode, "uploaded": file_obj is not None}
+
+    out["extraction"].update({
+        "latency_sec": round(time.time() - t0, 2),
+        "pages": assessment["pages"],
+        "chars": assessment["chars"],
+        "poor_pages": len(assessment["poor_pages"]),
+        "text_quality": assessment["quality"],
+        "truncated": truncated,
+    })
+    print(f"[Gemini extract] {os.path.basename(pdf_path)}: {out['extraction']}")
+    return out
+
 def write_project_json(project_id: str, payload: Dict[str, Any]) -> str:
     folder = os.path.join(PROJECTS_DIR, project_id)
     os.makedirs(folder, exist_ok=True)
@@ -412,7 +1417,7 @@ def zip_all_podcasts() -> str:
     with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
         for fp in files:
             zf.write(fp, arcname=os.path.basename(fp))
-    return zip_path
+    return ARTIFACTS.register(zip_path)
 
 def read_all_project_rows() -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
@@ -439,429 +1444,564 @@ def write_projects_csv(rows: List[Dict[str, Any]]) -> str:
         return None
     fields = list(rows[0].keys())
     csv_name = f"projects_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    csv_path = os.path.join(PROJECTS_DIR, csv_name)
+    csv_path = os.path.join(GENERATED_FOLDER, csv_name)
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=fields)
         writer.writeheader()
         writer.writerows(rows)
-    return csv_path
+    return ARTIFACTS.register(csv_path)
 
 # =========================================================
-# Gradio UI
+# Pipelined batch generation
 # =========================================================
-with gr.Blocks(title="Sid's Research App", theme="soft") as demo:
-    gr.Markdown("# Sid’s Research App")
-    gr.Markdown(
-        "Tabs: **PDF → Gemini Metadata**, **TTS Generation**, **Generated Podcasts**, **Projects Table**. "
-        "Per-paper JSON is stored under `projects/{id}/meta.json`."
-    )
-
-    bg_map_state = gr.State({})  # TTS BG track name -> path mapping
-
-    with gr.Tabs() as tabs:
-        # -----------------------------------
-        # Tab 1: PDF → Gemini Metadata
-        # -----------------------------------
-        with gr.Tab("1) PDF → Gemini: Metadata + Summary + Script"):
-            gr.Markdown("### Drop PDFs. Get JSON with metadata, summary, tags, and a Male/Female script. Stored in `projects/{id}/meta.json`.")
-            with gr.Row():
-                with gr.Column(scale=1):
-                    pdf_files = gr.File(label="Upload PDFs", file_count="multiple", file_types=[".pdf"])
-                    gemini_btn = gr.Button("Extract with Gemini ✨", variant="primary")
-                    ready_toggle = gr.Checkbox(value=False, label="Mark ready_to_publish in JSON")
-                with gr.Column(scale=1):
-                    json_log = gr.Markdown()
-                    zip_json_btn = gr.Button("Download all JSON as ZIP")
-                    zip_json_out = gr.File(label="JSON ZIP")
-
-            def do_extract(pdf_files, ready_toggle):
-                if not pdf_files:
-                    return "**No PDFs provided.**"
-                ensure_gemini()
-                logs = []
-                for f in pdf_files:
-                    proj_id = str(uuid.uuid4())
-                    folder = os.path.join(PROJECTS_DIR, proj_id)
-                    os.makedirs(folder, exist_ok=True)
-                    dest_pdf = os.path.join(folder, os.path.basename(f.name))
-                    try:
-                        shutil.copyfile(f.name, dest_pdf)
-                    except Exception:
-                        with open(f.name, "rb") as src, open(dest_pdf, "wb") as dst:
-                            dst.write(src.read())
-
-                    try:
-                        data = gemini_extract_metadata_and_script(dest_pdf)
-                        data["ready_to_publish"] = bool(ready_toggle)
-                        meta_path = write_project_json(proj_id, data)
-                        logs.append(f"- ✅ `{os.path.basename(dest_pdf)}` → `{meta_path}`")
-                    except Exception as e:
-                        logs.append(f"- ❌ `{os.path.basename(dest_pdf)}` → Error: {e}")
-
-                return "### Results\n" + "\n".join(logs)
+def batch_settings(
+    model_path, male_voice, female_voice, random_pause, pause_min, pause_max,
+    enable_gestures, gesture_prob, gesture_phrases,
+    enable_bg, bg_select, bg_map, bg_reduce, add_bg_tail, bg_tail_sec,
+    voice_config="", seed=None,
+) -> Dict[str, Any]:
+    # Gradio widget values -> process_script-style keyword settings
+    return {
+        "model_path": model_path,
+        "voice_config_path": voice_config,
+        "male_voice": male_voice,
+        "female_voice": female_voice,
+        "random_pause_enabled": bool(random_pause),
+        "pause_min_sec": float(pause_min),
+        "pause_max_sec": float(pause_max),
+        "enable_gestures": bool(enable_gestures),
+        "gesture_prob": float(gesture_prob),
+        "gesture_phrases_csv": gesture_phrases,
+        "enable_bg_music": bool(enable_bg),
+        "bg_choice_name": bg_select,
+        "bg_map": bg_map or {},
+        "bg_reduction_db": int(bg_reduce),
+        "add_bg_end": bool(add_bg_tail),
+        "bg_end_duration_sec": int(bg_tail_sec),
+        "seed": None if seed is None else int(seed),
+    }
 
-            gemini_btn.click(
-                fn=do_extract,
-                inputs=[pdf_files, ready_toggle],
-                outputs=[json_log],
+def run_batch_pipelined(
+    jobs: List[Tuple[str, str, str]],
+    settings: Dict[str, Any],
+    kokoro,
+    zip_path: str,
+    progress=None,
+) -> List[str]:
+    """
+    jobs: (label, script_text, output_file). Synthesis of episode N+1 runs on this
+    thread while a single encoder thread mixes and exports episode N (ONNX and
+    ffmpeg both release the GIL). At most one episode waits for the encoder, so
+    memory stays at ~two episodes (long ones are spilled to disk, see use_spill).
+    Each finished MP3 is appended to zip_path as soon as it is written. Returns one
+    markdown result line per job, in order. With settings["seed"] set, episodes already
+    in the episode cache are copied instead of synthesized.
+    """
+    results: List[str] = [""] * len(jobs)
+    total = len(jobs)
+    done = [0]
+    seed = settings.get("seed")
+
+    def cache_key(script_text):
+        return episode_key(script_text, **{k: v for k, v in settings.items() if k != "seed"}, seed=seed)
+
+    def encode(i, label, out_file, audio_segments, sample_rate_ref, t0, zf, key):
+        try:
+            audio_path, _, md = mix_and_export(
+                audio_segments, sample_rate_ref, out_file,
+                settings["enable_bg_music"], settings["bg_choice_name"], settings["bg_map"],
+                settings["bg_reduction_db"], settings["add_bg_end"], settings["bg_end_duration_sec"], t0,
             )
+            if key is not None:
+                store_episode(key, audio_path)
+            if audio_path and os.path.exists(audio_path):
+                zf.write(audio_path, os.path.basename(audio_path))
+            results[i] = f"- **{out_file}**{label} → {md if md else 'ok'}"
+        except Exception as e:
+            results[i] = f"- ❌ **{out_file}**{label} → Error: {e}"
+        done[0] += 1
+
+    part_path = zip_path + ".part"  # not an artifact (nor evictable) until complete
+    with zipfile.ZipFile(part_path, "w", zipfile.ZIP_DEFLATED) as zf, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode") as encoder:
+        pending = None
+        for i, (label, script_text, out_file) in enumerate(jobs):
+            if progress: progress(i / total, desc=f"Episode {i+1}/{total}: synthesizing ({done[0]} encoded)")
+            t0 = time.time()
+            key = cache_key(script_text) if seed is not None else None
+            out_path = os.path.join(GENERATED_FOLDER, out_file)
+            if key is not None and cached_episode(key, out_path):
+                if pending is not None:
+                    pending.result()  # the encoder thread writes to zf too
+                    pending = None
+                zf.write(out_path, os.path.basename(out_path))
+                results[i] = f"- **{out_file}**{label} → cached ({time.time() - t0:.2f}s)"
+                done[0] += 1
+                continue
+            try:
+                audio_segments, sample_rate_ref = synthesize_segments(
+                    script_text, kokoro, settings["male_voice"], settings["female_voice"],
+                    settings["random_pause_enabled"], settings["pause_min_sec"], settings["pause_max_sec"],
+                    settings["enable_gestures"], settings["gesture_prob"], settings["gesture_phrases_csv"],
+                    model_path=settings["model_path"], spill=use_spill(script_text),
+                    rng=random.Random(seed) if seed is not None else None,
+                )
+            except Exception as e:
+                results[i] = f"- ❌ **{out_file}**{label} → Error: {e}"
+                continue
+            if not audio_segments:
+                results[i] = f"- **{out_file}**{label} → **No valid 'Speaker: text' lines found in the script.**"
+                continue
+            # double buffer: don't queue a second episode behind the encoder
+            if pending is not None:
+                pending.result()
+            pending = encoder.submit(profiled(encode), i, label, out_file, audio_segments, sample_rate_ref, t0, zf, key)
+        if pending is not None:
+            if progress: progress(1.0 - 0.5 / max(total, 1), desc=f"Encoding last episode ({done[0]}/{total} encoded)")
+            pending.result()
+    os.replace(part_path, zip_path)
 
-            def zip_all_json():
-                zip_name = f"project_json_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-                zip_path = os.path.join(PROJECTS_DIR, zip_name)
-                with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for pid in os.listdir(PROJECTS_DIR):
-                        pdir = os.path.join(PROJECTS_DIR, pid)
-                        if not os.path.isdir(pdir):
-                            continue
-                        meta = os.path.join(pdir, "meta.json")
-                        if os.path.exists(meta):
-                            zf.write(meta, arcname=os.path.join(pid, "meta.json"))
-                return zip_path
-
-            zip_json_btn.click(fn=zip_all_json, inputs=None, outputs=[zip_json_out])
-
-        # -----------------------------------
-        # Tab 2: TTS Generator
-        # -----------------------------------
-        with gr.Tab("2) TTS Generator"):
-            gr.Markdown("### Generate podcasts from scripts or from project JSONs")
-
-            with gr.Row():
-                with gr.Column(scale=1):
-                    model_path = gr.Dropdown(MODEL_OPTIONS, value=MODEL_OPTIONS[0], label="Model Path")
-                    voice_config = gr.Textbox(value="voices-v1.0.bin", label="Voice Config Path")
-
-                    male_voice_dd = gr.Dropdown(MALE_VOICES, value=MALE_VOICES[0], label="Male Voice")
-                    female_voice_dd = gr.Dropdown(FEMALE_VOICES, value=FEMALE_VOICES[0], label="Female Voice")
-
-                    random_pause = gr.Checkbox(value=True, label="Enable Random Pause")
-                    pause_min = gr.Slider(0.1, 1.0, value=0.2, step=0.1, label="Pause Min Duration (sec)")
-                    pause_max = gr.Slider(0.1, 2.0, value=0.4, step=0.1, label="Pause Max Duration (sec)")
-
-                    enable_gestures = gr.Checkbox(value=False, label="Enable Appreciative Gestures")
-                    gesture_prob = gr.Slider(0.0, 1.0, value=0.2, step=0.1, label="Gesture Probability")
-                    gesture_phrases = gr.Textbox(value="yeah, uh-huh, right, ok", label="Gesture Phrases (comma-separated)")
-
-                    enable_bg = gr.Checkbox(value=True, label="Enable Background Music")
-                    bg_files = gr.File(label="Upload Background Tracks (MP3)", file_count="multiple", file_types=[".mp3"])
-                    bg_select = gr.Dropdown(choices=[], label="Select Background Track")
-                    bg_reduce = gr.Slider(0, 40, value=20, step=1, label="Background Music Volume Reduction (dB)")
-                    add_bg_tail = gr.Checkbox(value=True, label="Append Extra Background Music at End")
-                    bg_tail_sec = gr.Slider(1, 10, value=3, step=1, label="Extra Background Music Duration (sec)")
-
-                with gr.Column(scale=1):
-                    with gr.Tab("Single Script"):
-                        final_name = gr.Textbox(value="podcast_episode.mp3", label="Final Podcast File Name")
-                        script_area = gr.TextArea(value="Male:\nFemale:\n", label="Script (Speaker: text per line)", lines=14)
-                        gen_btn = gr.Button("Generate ✨", variant="primary")
-                        audio_preview = gr.Audio(label="Preview", type="filepath")
-                        file_download = gr.File(label="Download Podcast")
-                        metrics_md = gr.Markdown()
-
-                    with gr.Tab("Batch: TXT files"):
-                        batch_txts = gr.File(label="Upload Script TXT Files", file_count="multiple", file_types=[".txt"])
-                        gen_batch_btn = gr.Button("Generate Batch ✨", variant="primary")
-                        zip_out = gr.File(label="Download All Podcasts (ZIP)")
-                        batch_md = gr.Markdown()
-
-                    with gr.Tab("Batch: From JSON projects"):
-                        refresh_btn = gr.Button("Refresh project list")
-                        project_list = gr.CheckboxGroup(choices=[], label="Select project IDs (meta.json required)")
-                        gen_from_json_btn = gr.Button("Generate from JSON ✨", variant="primary")
-                        zip_out_json = gr.File(label="Download All Podcasts (ZIP)")
-                        batch_json_md = gr.Markdown()
-
-            bg_map_state = gr.State({})
-
-            def on_bg_files_uploaded(files):
-                mapping = {}
-                names = []
-                if files:
-                    for f in files:
-                        names.append(os.path.basename(f.name))
-                        mapping[os.path.basename(f.name)] = f.name
-                value = names[0] if names else None
-                return gr.update(choices=names, value=value), mapping
-
-            bg_files.upload(
-                fn=on_bg_files_uploaded,
-                inputs=[bg_files],
-                outputs=[bg_select, bg_map_state],
-            )
+    if progress: progress(1.0, desc="Done")
+    return results
 
-            def do_single(
-                final_name,
-                script_area,
-                model_path, voice_config, male_voice_dd, female_voice_dd,
-                random_pause, pause_min, pause_max,
-                enable_gestures, gesture_prob, gesture_phrases,
-                enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-            ):
-                clear_generated_folder()
-                if not final_name.lower().endswith(".mp3"):
-                    final_name = final_name + ".mp3"
-
-                def _progress(frac, desc=""):
-                    return
-
-                audio_path, file_path, md = process_script(
-                    script_text=script_area,
-                    output_file=final_name,
-                    model_path=model_path,
-                    voice_config_path=voice_config,
-                    male_voice=male_voice_dd,
-                    female_voice=female_voice_dd,
-                    random_pause_enabled=bool(random_pause),
-                    pause_min_sec=float(pause_min),
-                    pause_max_sec=float(pause_max),
-                    enable_gestures=bool(enable_gestures),
-                    gesture_prob=float(gesture_prob),
-                    gesture_phrases_csv=gesture_phrases,
-                    enable_bg_music=bool(enable_bg),
-                    bg_choice_name=bg_select,
-                    bg_map=bg_map_state or {},
-                    bg_reduction_db=int(bg_reduce),
-                    add_bg_end=bool(add_bg_tail),
-                    bg_end_duration_sec=int(bg_tail_sec),
-                    kokoro=None,
-                    progress=_progress,
+# =========================================================
+# Gradio UI
+# =========================================================
+def build_demo():
+    """The Gradio app. Built on demand, so importing app (the API, TTS workers) doesn't pay for it."""
+    import gradio as gr
+
+    with gr.Blocks(title="Sid's Research App", theme="soft") as demo:
+        gr.Markdown("# Sid’s Research App")
+        gr.Markdown(
+            "Tabs: **PDF → Gemini Metadata**, **TTS Generation**, **Generated Podcasts**, **Projects Table**. "
+            "Per-paper JSON is stored under `projects/{id}/meta.json`."
+        )
+
+        bg_map_state = gr.State({})  # TTS BG track name -> path mapping
+
+        with gr.Tabs():
+            # -----------------------------------
+            # Tab 1: PDF → Gemini Metadata
+            # -----------------------------------
+            with gr.Tab("1) PDF → Gemini: Metadata + Summary + Script"):
+                gr.Markdown("### Drop PDFs. Get JSON with metadata, summary, tags, and a Male/Female script. Stored in `projects/{id}/meta.json`.")
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        pdf_files = gr.File(label="Upload PDFs", file_count="multiple", file_types=[".pdf"])
+                        gemini_btn = gr.Button("Extract with Gemini ✨", variant="primary")
+                        ready_toggle = gr.Checkbox(value=False, label="Mark ready_to_publish in JSON")
+                        profile_extract = gr.Checkbox(value=False, label="Profile this run (CPU + allocations)")
+                    with gr.Column(scale=1):
+                        json_log = gr.Markdown()
+                        zip_json_btn = gr.Button("Download all JSON as ZIP")
+                        zip_json_out = gr.File(label="JSON ZIP")
+
+                def do_extract(pdf_files, ready_toggle, profile_extract=False):
+                    if not pdf_files:
+                        return "**No PDFs provided.**"
+                    ensure_gemini()
+                    with profile_run(profile_extract, "gradio: extract") as prof:
+                        logs = extract_pdfs(pdf_files, ready_toggle)
+                    return "### Results\n" + "\n".join(logs) + profile_note(prof)
+
+                def extract_pdfs(pdf_files, ready_toggle):
+                    logs = []
+                    for f in pdf_files:
+                        proj_id = str(uuid.uuid4())
+                        folder = os.path.join(PROJECTS_DIR, proj_id)
+                        os.makedirs(folder, exist_ok=True)
+                        dest_pdf = os.path.join(folder, os.path.basename(f.name))
+                        try:
+                            shutil.copyfile(f.name, dest_pdf)
+                        except Exception:
+                            with open(f.name, "rb") as src, open(dest_pdf, "wb") as dst:
+                                dst.write(src.read())
+
+                        try:
+                            data = gemini_extract_metadata_and_script(dest_pdf)
+                            data["ready_to_publish"] = bool(ready_toggle)
+                            meta_path = write_project_json(proj_id, data)
+                            logs.append(f"- ✅ `{os.path.basename(dest_pdf)}` → `{meta_path}`")
+                        except Exception as e:
+                            logs.append(f"- ❌ `{os.path.basename(dest_pdf)}` → Error: {e}")
+                    return logs
+
+                gemini_btn.click(
+                    fn=do_extract,
+                    inputs=[pdf_files, ready_toggle, profile_extract],
+                    outputs=[json_log],
                 )
-                return audio_path, file_path, md
 
-            gen_btn.click(
-                fn=do_single,
-                inputs=[
-                    final_name, script_area,
+                def zip_all_json():
+                    zip_name = f"project_json_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                    zip_path = os.path.join(GENERATED_FOLDER, zip_name)
+                    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                        for pid in os.listdir(PROJECTS_DIR):
+                            pdir = os.path.join(PROJECTS_DIR, pid)
+                            if not os.path.isdir(pdir):
+                                continue
+                            meta = os.path.join(pdir, "meta.json")
+                            if os.path.exists(meta):
+                                zf.write(meta, arcname=os.path.join(pid, "meta.json"))
+                    return ARTIFACTS.register(zip_path)
+
+                zip_json_btn.click(fn=zip_all_json, inputs=None, outputs=[zip_json_out])
+
+            # -----------------------------------
+            # Tab 2: TTS Generator
+            # -----------------------------------
+            with gr.Tab("2) TTS Generator"):
+                gr.Markdown("### Generate podcasts from scripts or from project JSONs")
+
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        model_path = gr.Dropdown(MODEL_OPTIONS, value=MODEL_OPTIONS[0], label="Model Path")
+                        voice_config = gr.Textbox(value="voices-v1.0.bin", label="Voice Config Path")
+
+                        male_voice_dd = gr.Dropdown(MALE_VOICES, value=MALE_VOICES[0], label="Male Voice")
+                        female_voice_dd = gr.Dropdown(FEMALE_VOICES, value=FEMALE_VOICES[0], label="Female Voice")
+
+                        random_pause = gr.Checkbox(value=True, label="Enable Random Pause")
+                        pause_min = gr.Slider(0.1, 1.0, value=0.2, step=0.1, label="Pause Min Duration (sec)")
+                        pause_max = gr.Slider(0.1, 2.0, value=0.4, step=0.1, label="Pause Max Duration (sec)")
+
+                        enable_gestures = gr.Checkbox(value=False, label="Enable Appreciative Gestures")
+                        gesture_prob = gr.Slider(0.0, 1.0, value=0.2, step=0.1, label="Gesture Probability")
+                        gesture_phrases = gr.Textbox(value=DEFAULT_GESTURE_PHRASES, label="Gesture Phrases (comma-separated)")
+
+                        enable_bg = gr.Checkbox(value=True, label="Enable Background Music")
+                        bg_files = gr.File(label="Upload Background Tracks (MP3)", file_count="multiple", file_types=[".mp3"])
+                        bg_select = gr.Dropdown(choices=[], label="Select Background Track")
+                        bg_reduce = gr.Slider(0, 40, value=20, step=1, label="Background Music Volume Reduction (dB)")
+                        add_bg_tail = gr.Checkbox(value=True, label="Append Extra Background Music at End")
+                        bg_tail_sec = gr.Slider(1, 10, value=3, step=1, label="Extra Background Music Duration (sec)")
+                        tts_seed = gr.Number(value=0, precision=0, label="Seed (same seed, script and settings reuse the cached episode; clear it for a fresh take)")
+                        profile_tts = gr.Checkbox(value=False, label="Profile this run (CPU + allocations)")
+
+                    with gr.Column(scale=1):
+                        with gr.Tab("Single Script"):
+                            final_name = gr.Textbox(value="podcast_episode.mp3", label="Final Podcast File Name")
+                            script_area = gr.TextArea(value="Male:\nFemale:\n", label="Script (Speaker: text per line)", lines=14)
+                            gen_btn = gr.Button("Generate ✨", variant="primary")
+                            remix_btn = gr.Button("Remix: new background/pauses, no re-synthesis")
+                            audio_preview = gr.Audio(label="Preview", type="filepath")
+                            file_download = gr.File(label="Download Podcast")
+                            metrics_md = gr.Markdown()
+
+                        with gr.Tab("Batch: TXT files"):
+                            batch_txts = gr.File(label="Upload Script TXT Files", file_count="multiple", file_types=[".txt"])
+                            gen_batch_btn = gr.Button("Generate Batch ✨", variant="primary")
+                            zip_out = gr.File(label="Download All Podcasts (ZIP)")
+                            batch_md = gr.Markdown()
+
+                        with gr.Tab("Batch: From JSON projects"):
+                            refresh_btn = gr.Button("Refresh project list")
+                            project_list = gr.CheckboxGroup(choices=[], label="Select project IDs (meta.json required)")
+                            gen_from_json_btn = gr.Button("Generate from JSON ✨", variant="primary")
+                            zip_out_json = gr.File(label="Download All Podcasts (ZIP)")
+                            batch_json_md = gr.Markdown()
+
+                bg_map_state = gr.State({})
+
+                def on_bg_files_uploaded(files):
+                    mapping = {}
+                    names = []
+                    if files:
+                        for f in files:
+                            names.append(os.path.basename(f.name))
+                            mapping[os.path.basename(f.name)] = f.name
+                    value = names[0] if names else None
+                    return gr.update(choices=names, value=value), mapping
+
+                bg_files.upload(
+                    fn=on_bg_files_uploaded,
+                    inputs=[bg_files],
+                    outputs=[bg_select, bg_map_state],
+                )
+
+                def do_single(
+                    final_name,
+                    script_area,
                     model_path, voice_config, male_voice_dd, female_voice_dd,
                     random_pause, pause_min, pause_max,
                     enable_gestures, gesture_prob, gesture_phrases,
-                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-                ],
-                outputs=[audio_preview, file_download, metrics_md],
-            )
+                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                    seed=None,
+                    profile_tts=False,
+                ):
+                    if not final_name.lower().endswith(".mp3"):
+                        final_name = final_name + ".mp3"
+
+                    def _progress(frac, desc=""):
+                        return
+
+                    with profile_run(profile_tts, f"gradio: tts {final_name}") as prof:
+                        audio_path, file_path, md = process_script(
+                            script_text=script_area,
+                            output_file=final_name,
+                            model_path=model_path,
+                            voice_config_path=voice_config,
+                            male_voice=male_voice_dd,
+                            female_voice=female_voice_dd,
+                            random_pause_enabled=bool(random_pause),
+                            pause_min_sec=float(pause_min),
+                            pause_max_sec=float(pause_max),
+                            enable_gestures=bool(enable_gestures),
+                            gesture_prob=float(gesture_prob),
+                            gesture_phrases_csv=gesture_phrases,
+                            enable_bg_music=bool(enable_bg),
+                            bg_choice_name=bg_select,
+                            bg_map=bg_map_state or {},
+                            bg_reduction_db=int(bg_reduce),
+                            add_bg_end=bool(add_bg_tail),
+                            bg_end_duration_sec=int(bg_tail_sec),
+                            kokoro=None,
+                            progress=_progress,
+                            seed=None if seed is None else int(seed),
+                        )
+                    return audio_path, file_path, md + profile_note(prof)
+
+                gen_btn.click(
+                    fn=do_single,
+                    inputs=[
+                        final_name, script_area,
+                        model_path, voice_config, male_voice_dd, female_voice_dd,
+                        random_pause, pause_min, pause_max,
+                        enable_gestures, gesture_prob, gesture_phrases,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        tts_seed, profile_tts,
+                    ],
+                    outputs=[audio_preview, file_download, metrics_md],
+                )
 
-            def do_batch_txt(
-                batch_txts,
-                model_path, voice_config, male_voice_dd, female_voice_dd,
-                random_pause, pause_min, pause_max,
-                enable_gestures, gesture_prob, gesture_phrases,
-                enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-            ):
-                clear_generated_folder()
-                if not batch_txts:
-                    return None, "**No TXT files provided.**"
-                try:
-                    kokoro = Kokoro(model_path, voice_config)
-                except Exception as e:
-                    return None, f"**Failed to initialize TTS model:** {e}"
-
-                results = []
-                for f in batch_txts:
-                    try:
-                        with open(f.name, "r", encoding="utf-8") as fh:
-                            content = fh.read()
-                    except Exception:
-                        with open(f.name, "rb") as fh:
-                            content = fh.read().decode("utf-8", errors="ignore")
-
-                    base = safe_stem(f.name)
-                    out_file = f"{base}.mp3"
-
-                    audio_path, _, md = process_script(
-                        script_text=content,
-                        output_file=out_file,
-                        model_path=model_path,
-                        voice_config_path=voice_config,
-                        male_voice=male_voice_dd,
-                        female_voice=female_voice_dd,
-                        random_pause_enabled=bool(random_pause),
-                        pause_min_sec=float(pause_min),
-                        pause_max_sec=float(pause_max),
-                        enable_gestures=bool(enable_gestures),
-                        gesture_prob=float(gesture_prob),
-                        gesture_phrases_csv=gesture_phrases,
+                def do_remix(
+                    final_name,
+                    random_pause, pause_min, pause_max,
+                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                    seed=None,
+                ):
+                    if not final_name.lower().endswith(".mp3"):
+                        final_name = final_name + ".mp3"
+                    return remix_episode(
+                        os.path.join(GENERATED_FOLDER, final_name),
                         enable_bg_music=bool(enable_bg),
                         bg_choice_name=bg_select,
                         bg_map=bg_map_state or {},
                         bg_reduction_db=int(bg_reduce),
                         add_bg_end=bool(add_bg_tail),
                         bg_end_duration_sec=int(bg_tail_sec),
-                        kokoro=kokoro,
-                        progress=None,
+                        random_pause_enabled=bool(random_pause),
+                        pause_min_sec=float(pause_min),
+                        pause_max_sec=float(pause_max),
+                        seed=None if seed is None else int(seed),
                     )
-                    results.append(f"- **{out_file}** → {md if md else 'ok'}")
-
-                zip_name = f"podcasts_txt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-                zip_path = os.path.join(GENERATED_FOLDER, zip_name)
-                with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for mp3_file in os.listdir(GENERATED_FOLDER):
-                        if mp3_file.lower().endswith(".mp3"):
-                            zf.write(os.path.join(GENERATED_FOLDER, mp3_file), mp3_file)
-                md = "### Batch Results (TXT)\n" + "\n".join(results)
-                return zip_path, md
-
-            gen_batch_btn.click(
-                fn=do_batch_txt,
-                inputs=[
+
+                remix_btn.click(
+                    fn=do_remix,
+                    inputs=[
+                        final_name,
+                        random_pause, pause_min, pause_max,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        tts_seed,
+                    ],
+                    outputs=[audio_preview, file_download, metrics_md],
+                )
+
+                def do_batch_txt(
                     batch_txts,
                     model_path, voice_config, male_voice_dd, female_voice_dd,
                     random_pause, pause_min, pause_max,
                     enable_gestures, gesture_prob, gesture_phrases,
-                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-                ],
-                outputs=[zip_out, batch_md],
-            )
-
-            def refresh_projects():
-                return gr.update(choices=list_project_ids(), value=[])
-
-            refresh_btn.click(fn=refresh_projects, inputs=None, outputs=[project_list])
-
-            def do_batch_from_json(
-                selected_pids: List[str],
-                model_path, voice_config, male_voice_dd, female_voice_dd,
-                random_pause, pause_min, pause_max,
-                enable_gestures, gesture_prob, gesture_phrases,
-                enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-            ):
-                clear_generated_folder()
-                if not selected_pids:
-                    return None, "**No projects selected.**"
-                try:
-                    kokoro = Kokoro(model_path, voice_config)
-                except Exception as e:
-                    return None, f"**Failed to initialize TTS model:** {e}"
-
-                results = []
-                for pid in selected_pids:
-                    script_lines = load_script_from_meta(pid)
-                    if not script_lines:
-                        results.append(f"- ❌ `{pid}` → No script found in meta.json")
-                        continue
-                    script_text = "\n".join(script_lines)
-                    out_file = default_output_name_for_pid(pid)
-
-                    audio_path, _, md = process_script(
-                        script_text=script_text,
-                        output_file=out_file,
-                        model_path=model_path,
-                        voice_config_path=voice_config,
-                        male_voice=male_voice_dd,
-                        female_voice=female_voice_dd,
-                        random_pause_enabled=bool(random_pause),
-                        pause_min_sec=float(pause_min),
-                        pause_max_sec=float(pause_max),
-                        enable_gestures=bool(enable_gestures),
-                        gesture_prob=float(gesture_prob),
-                        gesture_phrases_csv=gesture_phrases,
-                        enable_bg_music=bool(enable_bg),
-                        bg_choice_name=bg_select,
-                        bg_map=bg_map_state or {},
-                        bg_reduction_db=int(bg_reduce),
-                        add_bg_end=bool(add_bg_tail),
-                        bg_end_duration_sec=int(bg_tail_sec),
-                        kokoro=kokoro,
-                        progress=None,
+                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                    seed=None,
+                    profile_tts=False,
+                    progress=gr.Progress(),
+                ):
+                    if not batch_txts:
+                        return None, "**No TXT files provided.**"
+                    try:
+                        kokoro = make_kokoro(model_path, voice_config)
+                    except Exception as e:
+                        return None, f"**Failed to initialize TTS model:** {e}"
+
+                    jobs = []
+                    for f in batch_txts:
+                        try:
+                            with open(f.name, "r", encoding="utf-8") as fh:
+                                content = fh.read()
+                        except Exception:
+                            with open(f.name, "rb") as fh:
+                                content = fh.read().decode("utf-8", errors="ignore")
+
+                        base = safe_stem(f.name)
+                        out_file = f"{base}.mp3"
+                        jobs.append(("", content, out_file))
+
+                    settings = batch_settings(
+                        model_path, male_voice_dd, female_voice_dd, random_pause, pause_min, pause_max,
+                        enable_gestures, gesture_prob, gesture_phrases,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        voice_config=voice_config, seed=seed,
                     )
-                    results.append(f"- **{out_file}** ← `{pid}` → {md if md else 'ok'}")
-
-                zip_name = f"podcasts_json_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-                zip_path = os.path.join(GENERATED_FOLDER, zip_name)
-                with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for mp3_file in os.listdir(GENERATED_FOLDER):
-                        if mp3_file.lower().endswith(".mp3"):
-                            zf.write(os.path.join(GENERATED_FOLDER, mp3_file), mp3_file)
-                md = "### Batch Results (JSON projects)\n" + "\n".join(results)
-                return zip_path, md
-
-            gen_from_json_btn.click(
-                fn=do_batch_from_json,
-                inputs=[
-                    project_list,
+                    zip_name = f"podcasts_txt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                    zip_path = os.path.join(GENERATED_FOLDER, zip_name)
+                    with profile_run(profile_tts, f"gradio: batch txt ({len(jobs)} scripts)") as prof:
+                        results = run_batch_pipelined(jobs, settings, kokoro, zip_path, progress=progress)
+                    ARTIFACTS.register(zip_path)
+                    md = "### Batch Results (TXT)\n" + "\n".join(results) + profile_note(prof)
+                    return zip_path, md
+
+                gen_batch_btn.click(
+                    fn=do_batch_txt,
+                    inputs=[
+                        batch_txts,
+                        model_path, voice_config, male_voice_dd, female_voice_dd,
+                        random_pause, pause_min, pause_max,
+                        enable_gestures, gesture_prob, gesture_phrases,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        tts_seed, profile_tts,
+                    ],
+                    outputs=[zip_out, batch_md],
+                )
+
+                def refresh_projects():
+                    return gr.update(choices=list_project_ids(), value=[])
+
+                refresh_btn.click(fn=refresh_projects, inputs=None, outputs=[project_list])
+
+                def do_batch_from_json(
+                    selected_pids: List[str],
                     model_path, voice_config, male_voice_dd, female_voice_dd,
                     random_pause, pause_min, pause_max,
                     enable_gestures, gesture_prob, gesture_phrases,
-                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec
-                ],
-                outputs=[zip_out_json, batch_json_md],
-            )
+                    enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                    seed=None,
+                    profile_tts=False,
+                    progress=gr.Progress(),
+                ):
+                    if not selected_pids:
+                        return None, "**No projects selected.**"
+                    try:
+                        kokoro = make_kokoro(model_path, voice_config)
+                    except Exception as e:
+                        return None, f"**Failed to initialize TTS model:** {e}"
+
+                    missing = []
+                    jobs = []
+                    for pid in selected_pids:
+                        script_lines = load_script_from_meta(pid)
+                        if not script_lines:
+                            missing.append(f"- ❌ `{pid}` → No script found in meta.json")
+                            continue
+                        script_text = "\n".join(script_lines)
+                        out_file = default_output_name_for_pid(pid)
+                        jobs.append((f" ← `{pid}`", script_text, out_file))
+
+                    settings = batch_settings(
+                        model_path, male_voice_dd, female_voice_dd, random_pause, pause_min, pause_max,
+                        enable_gestures, gesture_prob, gesture_phrases,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        voice_config=voice_config, seed=seed,
+                    )
+                    zip_name = f"podcasts_json_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                    zip_path = os.path.join(GENERATED_FOLDER, zip_name)
+                    with profile_run(profile_tts, f"gradio: batch json ({len(jobs)} projects)") as prof:
+                        results = run_batch_pipelined(jobs, settings, kokoro, zip_path, progress=progress)
+                    ARTIFACTS.register(zip_path)
+                    md = "### Batch Results (JSON projects)\n" + "\n".join(missing + results) + profile_note(prof)
+                    return zip_path, md
+
+                gen_from_json_btn.click(
+                    fn=do_batch_from_json,
+                    inputs=[
+                        project_list,
+                        model_path, voice_config, male_voice_dd, female_voice_dd,
+                        random_pause, pause_min, pause_max,
+                        enable_gestures, gesture_prob, gesture_phrases,
+                        enable_bg, bg_select, bg_map_state, bg_reduce, add_bg_tail, bg_tail_sec,
+                        tts_seed, profile_tts,
+                    ],
+                    outputs=[zip_out_json, batch_json_md],
+                )
 
-        # -----------------------------------
-        # Tab 3: Generated Podcasts (new)
-        # -----------------------------------
-        with gr.Tab("3) Generated Podcasts"):
-            gr.Markdown("### Browse and play all MP3s in `generated_podcasts/`")
-
-            refresh_pod_btn = gr.Button("Refresh list")
-            podcast_radio = gr.Radio(choices=[], label="Select a podcast")
-            audio_player = gr.Audio(label="Preview", type="filepath")
-            files_list = gr.Files(label="All podcast files")
-            zip_all_btn = gr.Button("Download ZIP of all podcasts")
-            zip_all_out = gr.File(label="Podcasts ZIP")
-
-            def refresh_podcasts():
-                choices = mp3_choices()
-                files = list_generated_mp3s()
-                selected = choices[0] if choices else None
-                audio_path = mp3_path_from_choice(selected) if selected else None
-                return gr.update(choices=choices, value=selected), audio_path, files
-
-            refresh_pod_btn.click(
-                fn=refresh_podcasts,
-                inputs=None,
-                outputs=[podcast_radio, audio_player, files_list],
-            )
+            # -----------------------------------
+            # Tab 3: Generated Podcasts (new)
+            # -----------------------------------
+            with gr.Tab("3) Generated Podcasts"):
+                gr.Markdown("### Browse and play all MP3s in `generated_podcasts/`")
+
+                refresh_pod_btn = gr.Button("Refresh list")
+                podcast_radio = gr.Radio(choices=[], label="Select a podcast")
+                audio_player = gr.Audio(label="Preview", type="filepath")
+                files_list = gr.Files(label="All podcast files")
+                zip_all_btn = gr.Button("Download ZIP of all podcasts")
+                zip_all_out = gr.File(label="Podcasts ZIP")
+
+                def refresh_podcasts():
+                    choices = mp3_choices()
+                    files = list_generated_mp3s()
+                    selected = choices[0] if choices else None
+                    audio_path = mp3_path_from_choice(selected) if selected else None
+                    return gr.update(choices=choices, value=selected), audio_path, files
+
+                refresh_pod_btn.click(
+                    fn=refresh_podcasts,
+                    inputs=None,
+                    outputs=[podcast_radio, audio_player, files_list],
+                )
 
-            def on_select(choice):
-                if not choice:
-                    return None
-                return mp3_path_from_choice(choice)
+                def on_select(choice):
+                    if not choice:
+                        return None
+                    return mp3_path_from_choice(choice)
 
-            podcast_radio.change(
-                fn=on_select,
-                inputs=[podcast_radio],
-                outputs=[audio_player],
-            )
+                podcast_radio.change(
+                    fn=on_select,
+                    inputs=[podcast_radio],
+                    outputs=[audio_player],
+                )
 
-            zip_all_btn.click(
-                fn=zip_all_podcasts,
-                inputs=None,
-                outputs=[zip_all_out],
-            )
+                zip_all_btn.click(
+                    fn=zip_all_podcasts,
+                    inputs=None,
+                    outputs=[zip_all_out],
+                )
+
+            # -----------------------------------
+            # Tab 4: Projects Table (new)
+            # -----------------------------------
+            with gr.Tab("4) Projects Table"):
+                gr.Markdown("### Table view of all `meta.json` files in `projects/`")
+                refresh_tbl_btn = gr.Button("Refresh table")
+                df = gr.Dataframe(headers=["id","conference","year","link","domain","title","summary","tags","date_added","ready_to_publish","script_lines"],
+                                  value=[],
+                                  wrap=True,
+                                  interactive=False,
+                                  row_count=(0, "dynamic"),
+                                  col_count=(11, "fixed"),
+                                  label="Projects")
+
+                csv_btn = gr.Button("Download CSV")
+                csv_out = gr.File(label="Projects CSV")
+
+                def refresh_table():
+                    rows = read_all_project_rows()
+                    # Convert to matrix for Gradio Dataframe
+                    headers = ["id","conference","year","link","domain","title","summary","tags","date_added","ready_to_publish","script_lines"]
+                    matrix = [[r.get(h, "") for h in headers] for r in rows]
+                    return gr.update(value=matrix)
+
+                refresh_tbl_btn.click(fn=refresh_table, inputs=None, outputs=[df])
+
+                def export_csv():
+                    rows = read_all_project_rows()
+                    return write_projects_csv(rows)
+
+                csv_btn.click(fn=export_csv, inputs=None, outputs=[csv_out])
+    return demo
 
-        # -----------------------------------
-        # Tab 4: Projects Table (new)
-        # -----------------------------------
-        with gr.Tab("4) Projects Table"):
-            gr.Markdown("### Table view of all `meta.json` files in `projects/`")
-            refresh_tbl_btn = gr.Button("Refresh table")
-            df = gr.Dataframe(headers=["id","conference","year","link","domain","title","summary","tags","date_added","ready_to_publish","script_lines"],
-                              value=[],
-                              wrap=True,
-                              interactive=False,
-                              row_count=(0, "dynamic"),
-                              col_count=(11, "fixed"),
-                              label="Projects")
-
-            csv_btn = gr.Button("Download CSV")
-            csv_out = gr.File(label="Projects CSV")
-
-            def refresh_table():
-                rows = read_all_project_rows()
-                # Convert to matrix for Gradio Dataframe
-                headers = ["id","conference","year","link","domain","title","summary","tags","date_added","ready_to_publish","script_lines"]
-                matrix = [[r.get(h, "") for h in headers] for r in rows]
-                return gr.update(value=matrix)
-
-            refresh_tbl_btn.click(fn=refresh_table, inputs=None, outputs=[df])
-
-            def export_csv():
-                rows = read_all_project_rows()
-                return write_projects_csv(rows)
-
-            csv_btn.click(fn=export_csv, inputs=None, outputs=[csv_out])
-
-# demo.queue(concurrency_count=1)  # enable if needed
 if __name__ == "__main__":
+    demo = build_demo()
+    # demo.queue(concurrency_count=1)  # enable if needed
     demo.launch()
@@ -0,0 +1,329 @@
+# artifacts.py
+# Disk-bounded store for generated files (episodes, ZIPs, CSV exports) with LRU eviction.
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:  # optional: inotify/FSEvents instead of polling the directory mtime
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+REFS_FILE = ".refs.json"
+
+
+class ArtifactStore:
+    """
+    Files live flat under `root`. Recency is the file's atime, set explicitly on
+    register/touch (so relatime/noatime mounts don't matter and several
+    processes, e.g. Gradio and the API, see the same LRU order). References
+    ("{project}/{paper}" strings) live in root/.refs.json; referenced files are
+    never evicted. Neither are files used within `grace_sec`, so a URL that was
+    just handed out keeps working. `sidecars` are suffixes of directories that belong
+    to an artifact (<stem><suffix>/) and go when it is evicted.
+    """
+
+    def __init__(self, root: str, budget_bytes: int, grace_sec: float = 600.0,
+                 sidecars: Tuple[str, ...] = ()):
+        self.root = root
+        self.budget_bytes = int(budget_bytes)
+        self.grace_sec = grace_sec
+        self.sidecars = sidecars
+        self._lock = threading.Lock()
+        self._refs: Dict[str, List[str]] = {}
+        self._refs_mtime = None
+        self.listeners: List[Callable[[str, str], None]] = []  # fn(event, name); "added"/"removed"
+        os.makedirs(root, exist_ok=True)
+
+    def _notify(self, event: str, name: str):
+        for fn in self.listeners:
+            try:
+                fn(event, name)
+            except Exception as e:
+                print("[Artifacts listener warning]", e)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _name(self, name_or_path: str) -> str:
+        return os.path.basename(name_or_path)
+
+    # ---------- references ----------
+    def _refs_path(self) -> str:
+        return os.path.join(self.root, REFS_FILE)
+
+    def _load_refs(self):
+        # another process may have changed the file since we last read it
+        try:
+            mtime = os.path.getmtime(self._refs_path())
+        except OSError:
+            self._refs, self._refs_mtime = {}, None
+            return
+        if mtime != self._refs_mtime:
+            try:
+                with open(self._refs_path(), "r", encoding="utf-8") as f:
+                    self._refs = json.load(f)
+            except Exception:
+                self._refs = {}
+            self._refs_mtime = mtime
+
+    def _save_refs(self):
+        tmp = f"{self._refs_path()}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._refs, f, indent=2)
+        os.replace(tmp, self._refs_path())
+        self._refs_mtime = os.path.getmtime(self._refs_path())
+
+    def add_ref(self, name: str, ref: str):
+        name = self._name(name)
+        with self._lock:
+            self._load_refs()
+            refs = self._refs.setdefault(name, [])
+            if ref not in refs:
+                refs.append(ref)
+                self._save_refs()
+
+    def drop_refs(self, prefix: str):
+        """Drop every reference starting with prefix (e.g. a deleted project's id)."""
+        with self._lock:
+            self._load_refs()
+            changed = False
+            for name in list(self._refs):
+                kept = [r for r in self._refs[name] if not r.startswith(prefix)]
+                if kept != self._refs[name]:
+                    changed = True
+                    if kept:
+                        self._refs[name] = kept
+                    else:
+                        del self._refs[name]
+            if changed:
+                self._save_refs()
+
+    def refs(self, name: str) -> List[str]:
+        with self._lock:
+            self._load_refs()
+            return list(self._refs.get(self._name(name), []))
+
+    # ---------- usage ----------
+    def touch(self, name: str):
+        fp = self.path(self._name(name))
+        try:
+            st = os.stat(fp)
+            os.utime(fp, (time.time(), st.st_mtime))
+        except OSError:
+            pass
+
+    def register(self, name: str, ref: Optional[str] = None) -> str:
+        """Record a freshly written artifact and make room for it. Returns its path."""
+        name = self._name(name)
+        self.touch(name)
+        if ref:
+            self.add_ref(name, ref)
+        self._notify("added", name)
+        self.evict()
+        return self.path(name)
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        out = []
+        for e in os.scandir(self.root):
+            if not e.is_file() or e.name.startswith(".") or e.name.endswith(".part"):
+                continue
+            st = e.stat()
+            out.append((e.name, st.st_size, st.st_atime))
+        return out
+
+    def usage(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {"files": len(entries), "bytes": sum(sz for _, sz, _ in entries), "budget": self.budget_bytes}
+
+    def evict(self) -> List[str]:
+        """Delete least-recently-used unreferenced artifacts until usage fits the budget."""
+        with self._lock:
+            self._load_refs()
+            entries = self._entries()
+            total = sum(sz for _, sz, _ in entries)
+            if total <= self.budget_bytes:
+                return []
+            now = time.time()
+            removed = []
+            for name, size, atime in sorted(entries, key=lambda e: e[2]):
+                if total <= self.budget_bytes:
+                    break
+                if self._refs.get(name) or now - atime < self.grace_sec:
+                    continue
+                try:
+                    os.remove(self.path(name))
+                except OSError:
+                    continue
+                for suffix in self.sidecars:
+                    shutil.rmtree(self.path(os.path.splitext(name)[0] + suffix), ignore_errors=True)
+                total -= size
+                removed.append(name)
+            if removed:
+                print(f"[Artifacts] evicted {len(removed)} file(s) from {self.root}/")
+        for name in removed:
+            self._notify("removed", name)
+        return removed
+
+
+class AudioRegistry:
+    """
+    In-memory index of the MP3s in one folder: name, lowercase key, size and the
+    owning (project, paper) if `owner_of(name)` knows it. Kept current by
+    ArtifactStore notifications for writes in this process and by a directory
+    watcher for everything else (other processes, manual copies, deletes). Watcher
+    events update the one file they name; owners are cached per name (owner_of may
+    go to the store) and only looked up again when a file is (re)created.
+    """
+
+    def __init__(self, root: str, owner_of: Callable[[str], Optional[Tuple[str, str]]],
+                 poll_sec: float = 2.0):
+        self.root = root
+        self.owner_of = owner_of
+        self.poll_sec = poll_sec
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Dict[str, object]] = {}
+        self._by_project: Dict[str, Dict[str, Dict[str, object]]] = {}
+        self._owners: Dict[str, Optional[Tuple[str, str]]] = {}
+        self._dir_mtime = None
+        self.version = 0  # bumped on every index change, for cache validators
+        self._stop = threading.Event()
+        self._observer = None
+        self._poller = None
+
+    def _asset(self, name: str) -> Optional[Dict[str, object]]:
+        fp = os.path.join(self.root, name)
+        try:
+            size = os.path.getsize(fp)
+        except OSError:
+            return None
+        with self._lock:
+            cached = name in self._owners
+            owner = self._owners.get(name)
+        if not cached:
+            owner = self.owner_of(name)
+            with self._lock:
+                self._owners[name] = owner
+        return {
+            "name": name,
+            "key": name.lower(),
+            "size": size,
+            "projectId": owner[0] if owner else None,
+            "paperId": owner[1] if owner else None,
+        }
+
+    def _index(self, asset: Dict[str, object]):
+        self._unindex(asset["key"])
+        self._by_key[asset["key"]] = asset
+        if asset["projectId"]:
+            self._by_project.setdefault(asset["projectId"], {})[asset["name"]] = asset
+
+    def _unindex(self, key: str):
+        old = self._by_key.pop(key, None)
+        if old and old["projectId"]:
+            self._by_project.get(old["projectId"], {}).pop(old["name"], None)
+
+    @staticmethod
+    def _is_audio(name: str) -> bool:
+        return name.lower().endswith(".mp3") and not name.startswith(".")
+
+    # ---------- maintenance ----------
+    def refresh(self):
+        """Full rescan (at start, and when polling sees the directory change)."""
+        try:
+            mtime = os.stat(self.root).st_mtime
+            names = [n for n in os.listdir(self.root) if self._is_audio(n)]
+        except OSError:
+            mtime, names = None, []
+        with self._lock:
+            self._owners = {n: o for n, o in self._owners.items() if n in names}
+        assets = [a for a in (self._asset(n) for n in names) if a]
+        with self._lock:
+            self._by_key = {}
+            self._by_project = {}
+            for a in assets:
+                self._index(a)
+            self._dir_mtime = mtime
+            self.version += 1
+
+    def on_change(self, event: str, name: str):
+        """event: "added" (new or replaced file), "modified" (same file, new size) or "removed"."""
+        name = os.path.basename(name)
+        if not self._is_audio(name):
+            return
+        if event != "modified":
+            with self._lock:
+                self._owners.pop(name, None)
+        asset = self._asset(name) if event != "removed" else None
+        with self._lock:
+            if asset is None:
+                self._unindex(name.lower())
+            else:
+                self._index(asset)
+            self.version += 1
+
+    def start(self):
+        self.refresh()
+        self._stop.clear()
+        if Observer is not None:
+            registry = self
+
+            class _Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if event.is_directory:
+                        return
+                    if event.event_type == "moved":  # e.g. <name>.part renamed into place
+                        registry.on_change("removed", event.src_path)
+                        registry.on_change("added", event.dest_path)
+                    elif event.event_type == "deleted":
+                        registry.on_change("removed", event.src_path)
+                    elif event.event_type == "created":
+                        registry.on_change("added", event.src_path)
+                    elif event.event_type in ("modified", "closed"):
+                        registry.on_change("modified", event.src_path)
+
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), self.root, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._poller = threading.Thread(target=self._poll, name="audio-registry", daemon=True)
+            self._poller.start()
+
+    def refresh_if_changed(self):
+        # entries added/renamed/removed bump the directory mtime
+        try:
+            if os.stat(self.root).st_mtime != self._dir_mtime:
+                self.refresh()
+        except OSError:
+            pass
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_sec):
+            self.refresh_if_changed()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    # ---------- queries ----------
+    def lookup(self, name: str) -> Optional[Dict[str, object]]:
+        """Exact or case-insensitive match, O(1)."""
+        with self._lock:
+            return self._by_key.get(name.lower())
+
+    def for_project(self, pid: str) -> List[Dict[str, object]]:
+        with self._lock:
+            return list(self._by_project.get(pid, {}).values())
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            example = next(iter(self._by_key.values()), None)
+            return {"count": len(self._by_key), "example": example["name"] if example else None}
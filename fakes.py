@@ -0,0 +1,155 @@
+# fakes.py
+# Local stand-ins for external backends, for exercising quota/retry paths without a network.
+import re
+import json
+import time
+import zlib
+import random
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class FakeRateLimitError(Exception):
+    """Looks like google.api_core.exceptions.ResourceExhausted to the limiter."""
+    code = 429
+
+    def __init__(self, msg: str = "429 Resource has been exhausted (e.g. check quota).", retry_after: Optional[float] = None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class FakeResponse:
+    def __init__(self, text: str, total_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {"total_token_count": total_tokens})()
+
+
+class FakeStreamResponse:
+    """generate_content(..., stream=True): iterates chunks with .text; usage is known at the end."""
+
+    def __init__(self, text: str, total_tokens: int = 0, chunk_chars: int = 40, chunk_sec: float = 0.0):
+        self._text = text
+        self._tokens = total_tokens
+        self.chunk_chars = chunk_chars
+        self.chunk_sec = chunk_sec
+        self.usage_metadata = None
+
+    def __iter__(self):
+        for start in range(0, len(self._text), self.chunk_chars):
+            if self.chunk_sec:
+                time.sleep(self.chunk_sec)
+            yield FakeResponse(self._text[start:start + self.chunk_chars])
+        self.usage_metadata = type("Usage", (), {"total_token_count": self._tokens})()
+
+
+FAKE_METADATA: Dict[str, Any] = {
+    "conference": "Unknown",
+    "year": 2024,
+    "link": "Unknown",
+    "domain": "AI",
+    "title": "Fake Paper Title",
+    "summary": "A deterministic summary produced by the local fake Gemini backend.",
+    "tags": "fake, testing",
+    "script": [
+        "Male: Welcome to the show.",
+        "Female: Today we look at a fake paper.",
+        "Male: It exists only for local testing.",
+        "Female: Thanks for listening.",
+    ],
+}
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel. Injects 429s with probability `fail_rate`
+    (seeded, so runs are reproducible) and can enforce its own RPM ceiling, which
+    is how a real quota behaves under bursts.
+    """
+
+    def __init__(self, model_name: str = "fake", latency: float = 0.0, fail_rate: float = 0.0,
+                 rpm_ceiling: Optional[int] = None, seed: int = 0, payload: Optional[Dict[str, Any]] = None,
+                 stream_chunk_chars: int = 40, follow_stream_hint: bool = True):
+        self.model_name = model_name
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+        self.follow_stream_hint = follow_stream_hint  # False: keys stay in payload order
+        self.fail_rate = fail_rate
+        self.rpm_ceiling = rpm_ceiling
+        self.payload = payload or FAKE_METADATA
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+        self.calls = 0
+        self.failures = 0
+
+    def _maybe_fail(self):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 60.0]
+            over = self.rpm_ceiling is not None and len(self._window) >= self.rpm_ceiling
+            if over or self._rng.random() < self.fail_rate:
+                self.failures += 1
+                raise FakeRateLimitError()
+            self._window.append(now)
+
+    def generate_content(self, parts, stream: bool = False, **kwargs):
+        """
+        With stream=True the JSON arrives in stream_chunk_chars pieces, `latency` spread
+        evenly over them (the same total as a blocking call), with "script" first if the
+        prompt asks for that, as the real model does.
+        """
+        self._maybe_fail()
+        prompt_chars = sum(len(p) for p in parts if isinstance(p, str))
+        tokens = prompt_chars // 4 + 200
+        if not stream:
+            if self.latency:
+                time.sleep(self.latency)
+            return FakeResponse(json.dumps(self.payload), total_tokens=tokens)
+        payload = self.payload
+        if self.follow_stream_hint and any(isinstance(p, str) and '"script" key first' in p for p in parts):
+            payload = dict({"script": payload.get("script", [])}, **payload)
+        text = json.dumps(payload, indent=2)
+        chunks = max(1, -(-len(text) // self.stream_chunk_chars))
+        return FakeStreamResponse(text, tokens, self.stream_chunk_chars, self.latency / chunks)
+
+
+class FakeKokoro:
+    """
+    Drop-in for kokoro_onnx.Kokoro. create() sleeps `latency + char_latency * len(text)`
+    (a fixed per-call cost plus synthesis growing with length) and returns one quiet tone
+    per sentence, with a short silence between sentences as Kokoro leaves. Pitch and
+    length depend only on the text, so the same script always yields the same audio.
+    """
+
+    SAMPLE_RATE = 24000
+    CHARS_PER_SEC = 15.0  # roughly Kokoro's speaking rate at speed=1.0
+    SENTENCE_GAP_SEC = 0.25
+
+    def __init__(self, model_path: str = "fake", voices_path: str = "fake",
+                 latency: float = 0.0, char_latency: float = 0.0):
+        self.model_path = model_path
+        self.voices_path = voices_path
+        self.latency = latency
+        self.char_latency = char_latency
+        self.calls = 0
+
+    def create(self, text: str, voice: str = "af_heart", speed: float = 1.0,
+               lang: str = "en-us", **kwargs) -> Tuple[np.ndarray, int]:
+        self.calls += 1
+        delay = self.latency + self.char_latency * len(text)
+        if delay:
+            time.sleep(delay)
+        sr = self.SAMPLE_RATE
+        gap = np.zeros(int(sr * self.SENTENCE_GAP_SEC), dtype=np.float32)
+        parts = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text.strip()) or [text]:
+            n = max(1, int(sr * len(sentence) / (self.CHARS_PER_SEC * max(speed, 0.1))))
+            freq = 110.0 + zlib.crc32(f"{voice}:{sentence}".encode("utf-8")) % 220
+            t = np.arange(n, dtype=np.float32) / sr
+            if parts:
+                parts.append(gap)
+            parts.append((0.2 * np.sin(2 * np.pi * freq * t)).astype(np.float32))
+        return np.concatenate(parts), sr
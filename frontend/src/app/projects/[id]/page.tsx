@@ -4,7 +4,7 @@ import { useParams } from "next/navigation";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { useMemo, useState } from "react";
 import { api } from "@/app/api/client";
-import { Project, Paper } from "@/lib/types";
+import { ProjectDashboard } from "@/lib/types";
 import PDFUploader from "@/components/project/pdf-uploader";
 import PDFList from "@/components/project/pdf-list";
 import PDFViewer from "@/components/project/pdf-viewer";
@@ -21,19 +21,15 @@ export default function ProjectPage() {
   const projectId = params?.id as string;
   const qc = useQueryClient();
 
-  const { data: project } = useQuery({
-    queryKey: ["project", projectId],
+  // One round-trip for the whole page: project, papers, summaries, table, podcasts
+  const { data: dashboard } = useQuery({
+    queryKey: ["dashboard", projectId],
     queryFn: async () =>
-      (await api.get<Project>(`/api/projects/${projectId}`)).data,
-    enabled: !!projectId,
-  });
-
-  const { data: papers } = useQuery({
-    queryKey: ["papers", projectId],
-    queryFn: async () =>
-      (await api.get<Paper[]>(`/api/projects/${projectId}/papers`)).data,
+      (await api.get<ProjectDashboard>(`/api/projects/${projectId}/dashboard`)).data,
     enabled: !!projectId,
   });
+  const project = dashboard?.project;
+  const papers = dashboard?.papers;
 
   // Focused paper for viewing
   const [selectedPaperId, setSelectedPaperId] = useState<string | null>(null);
@@ -54,7 +50,7 @@ export default function ProjectPage() {
     mutationFn: async (ids: string[]) =>
       (await api.post(`/api/projects/${projectId}/papers/tools/summarize`, { paperIds: ids })).data,
     onSuccess: () => {
-      qc.invalidateQueries({ queryKey: ["project-summaries", projectId] });
+      qc.invalidateQueries({ queryKey: ["dashboard", projectId] });
       qc.invalidateQueries({ queryKey: ["metadata", projectId] }); // in case any single summary view is open
     },
   });
@@ -63,7 +59,7 @@ export default function ProjectPage() {
     mutationFn: async (ids: string[]) =>
       (await api.post(`/api/projects/${projectId}/papers/tools/podcast`, { paperIds: ids })).data,
     onSuccess: () => {
-      qc.invalidateQueries({ queryKey: ["project-podcasts", projectId] });
+      qc.invalidateQueries({ queryKey: ["dashboard", projectId] });
     },
   });
 
@@ -137,17 +133,17 @@ export default function ProjectPage() {
 
               {/* Summary tab: all summarized papers */}
               <TabsContent value="summary">
-                <ProjectSummaries projectId={projectId} />
+                <ProjectSummaries data={dashboard?.summaries} />
               </TabsContent>
 
               {/* Podcasts tab: all podcasted papers */}
               <TabsContent value="podcasts">
-                <ProjectPodcasts projectId={projectId} />
+                <ProjectPodcasts data={dashboard?.podcasts} />
               </TabsContent>
 
               {/* Table tab unchanged */}
               <TabsContent value="table">
-                <MetadataTable projectId={projectId} />
+                <MetadataTable projectId={projectId} data={dashboard?.table} />
               </TabsContent>
             </Tabs>
           </div>
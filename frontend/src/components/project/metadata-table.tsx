@@ -1,6 +1,5 @@
 "use client";
 
-import { useQuery } from "@tanstack/react-query";
 import { api } from "@/app/api/client";
 import { MetadataRow } from "@/lib/types";
 import {
@@ -15,21 +14,15 @@ import { Button } from "@/components/ui/button";
  * Table component to display all extracted metadata for papers in a project.
  * Uses react-table for headless table logic and applies a basic Tailwind
  * style. Includes a button to download the metadata as CSV via the
- * backend endpoint.
+ * backend endpoint. The rows come from the project page's dashboard query.
  */
-export default function MetadataTable({ projectId }: { projectId: string }) {
-  const { data } = useQuery({
-    queryKey: ["table", projectId],
-    queryFn: async () => {
-      return (
-        await api.get<MetadataRow[]>(
-          `/api/projects/${projectId}/metadata/table`
-        )
-      ).data;
-    },
-    enabled: !!projectId,
-  });
-
+export default function MetadataTable({
+  projectId,
+  data,
+}: {
+  projectId: string;
+  data?: MetadataRow[];
+}) {
   const columns: ColumnDef<MetadataRow>[] = [
     { accessorKey: "title", header: "Title" },
     { accessorKey: "conference", header: "Conf" },
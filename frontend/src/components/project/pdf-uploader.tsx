@@ -9,7 +9,7 @@ import { Input } from "@/components/ui/input";
 /**
  * Component for uploading PDF files to a project. Accepts multiple files
  * and uploads each one sequentially. Upon completion, invalidates the
- * papers query so the list refreshes. Shows basic busy state while
+ * project dashboard query so the list refreshes. Shows basic busy state while
  * uploading.
  */
 export default function PDFUploader({ projectId }: { projectId: string }) {
@@ -26,7 +26,7 @@ export default function PDFUploader({ projectId }: { projectId: string }) {
       });
     },
     onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ["papers", projectId] });
+      queryClient.invalidateQueries({ queryKey: ["dashboard", projectId] });
     },
   });
 
@@ -1,14 +1,6 @@
 "use client";
 
-import { useQuery } from "@tanstack/react-query";
-import { api } from "@/app/api/client";
-
-type PodcastRow = {
-  paperId: string;
-  title: string;
-  mp3Url: string;   // can be a path like /api/podcasts/global/...
-  pdfUrl: string;   // can be a path like /api/projects/.../file
-};
+import { PodcastRow } from "@/lib/types";
 
 function toAbsolute(u: string): string {
   if (!u) return u;
@@ -20,14 +12,8 @@ function toAbsolute(u: string): string {
   return `${base}/${u}`;
 }
 
-export default function ProjectPodcasts({ projectId }: { projectId: string }) {
-  const { data } = useQuery({
-    queryKey: ["project-podcasts", projectId],
-    queryFn: async () =>
-      (await api.get<PodcastRow[]>(`/api/projects/${projectId}/podcasts`)).data,
-    enabled: !!projectId,
-  });
-
+/** Podcasted papers; the rows come from the project page's dashboard query. */
+export default function ProjectPodcasts({ data }: { data?: PodcastRow[] }) {
   if (!data || data.length === 0) {
     return <div className="text-sm text-gray-500">No podcasts yet. Select files and run Podcast.</div>;
   }
@@ -1,27 +1,9 @@
 "use client";
 
-import { useQuery } from "@tanstack/react-query";
-import { api } from "@/app/api/client";
-
-type SummaryItem = {
-  paperId: string;
-  title: string;
-  summary: string;
-  conference: string;
-  year: number;
-  domain: string;
-  tags: string;
-  pdfUrl: string;
-};
-
-export default function ProjectSummaries({ projectId }: { projectId: string }) {
-  const { data } = useQuery({
-    queryKey: ["project-summaries", projectId],
-    queryFn: async () =>
-      (await api.get<SummaryItem[]>(`/api/projects/${projectId}/summaries`)).data,
-    enabled: !!projectId,
-  });
+import { SummaryItem } from "@/lib/types";
 
+/** Summarized papers; the rows come from the project page's dashboard query. */
+export default function ProjectSummaries({ data }: { data?: SummaryItem[] }) {
   if (!data || data.length === 0) {
     return <div className="text-sm text-gray-500">No summaries yet. Select files and run Summarize.</div>;
   }
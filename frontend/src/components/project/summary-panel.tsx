@@ -22,6 +22,8 @@ export default function SummaryPanel({
       ).data;
     },
     enabled: !!paper?.id,
+    // a provisional summary is replaced once Gemini finishes; the ETag makes polls cheap
+    refetchInterval: (row) => (row?.provisional ? 5000 : false),
   });
 
   if (!paper) {
@@ -44,6 +46,12 @@ export default function SummaryPanel({
         {data.summary}
       </p>
       <div className="text-xs text-gray-500">Tags: {data.tags}</div>
+      {data.provisional && (
+        <div className="text-xs text-amber-600">
+          Provisional summary extracted locally; the Gemini summary will
+          replace it when it is ready.
+        </div>
+      )}
     </div>
   );
 }
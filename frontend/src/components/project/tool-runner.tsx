@@ -5,7 +5,16 @@ import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { useMutation } from "@tanstack/react-query";
 import { api } from "@/app/api/client";
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
+
+type JobEvent = {
+  stage: string;
+  desc?: string;
+  frac?: number;
+  eta_sec?: number | null;
+};
+
+const STAGES = ["queued", "running", "saving", "done", "error", "cancelled"];
 
 export default function ToolRunner({
   paper,
@@ -17,6 +26,31 @@ export default function ToolRunner({
   const [status, setStatus] =
     useState<"idle" | "running" | "done" | "error">("idle");
   const [message, setMessage] = useState<string>("");
+  const [progress, setProgress] = useState<JobEvent | null>(null);
+  const events = useRef<EventSource | null>(null);
+
+  const closeEvents = () => {
+    events.current?.close();
+    events.current = null;
+  };
+  useEffect(() => closeEvents, []);
+
+  // Opened before the POST so no stage is missed; the server ends the stream after done/error
+  const watch = (tool: "summarize" | "podcast") => {
+    closeEvents();
+    setProgress(null);
+    const es = new EventSource(
+      `${api.defaults.baseURL}/api/projects/${projectId}/papers/${paper!.id}/tools/${tool}/events`
+    );
+    for (const stage of STAGES) {
+      es.addEventListener(stage, (e) => {
+        setProgress(JSON.parse((e as MessageEvent).data));
+        if (["done", "error", "cancelled"].includes(stage)) closeEvents();
+      });
+    }
+    es.onerror = closeEvents;
+    events.current = es;
+  };
 
   const run = (tool: "summarize" | "podcast") =>
     useMutation({
@@ -30,12 +64,15 @@ export default function ToolRunner({
       onMutate: () => {
         setStatus("running");
         setMessage("");
+        watch(tool);
       },
       onSuccess: (res) => {
+        closeEvents();
         setStatus("done");
         setMessage(res?.message || "");
       },
       onError: (e: any) => {
+        closeEvents();
         setStatus("error");
         setMessage(e?.response?.data?.detail || "Failed");
       },
@@ -65,6 +102,20 @@ export default function ToolRunner({
           <Badge variant="secondary" className="ml-2">
             {status}
           </Badge>
+          {status === "running" && progress && (
+            <div className="mt-2 space-y-1">
+              <div className="h-1.5 w-full rounded bg-gray-200">
+                <div
+                  className="h-1.5 rounded bg-gray-800 transition-all"
+                  style={{ width: `${Math.round((progress.frac ?? 0) * 100)}%` }}
+                />
+              </div>
+              <div className="text-xs text-gray-500">
+                {progress.desc || progress.stage}
+                {progress.eta_sec != null && ` · about ${Math.ceil(progress.eta_sec)}s left`}
+              </div>
+            </div>
+          )}
           {message && <div className="text-xs text-gray-500 mt-1">{message}</div>}
         </div>
       )}
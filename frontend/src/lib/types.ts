@@ -44,6 +44,37 @@ export interface MetadataRow {
   date_added: string;
   ready_to_publish: boolean;
   script_lines: number;
+  provisional: boolean; // local extractive summary, replaced when Gemini's arrives
+}
+
+export interface SummaryItem {
+  paperId: string;
+  title: string;
+  summary: string;
+  conference: string;
+  year: number;
+  domain: string;
+  tags: string;
+  pdfUrl: string;
+}
+
+export interface PodcastRow {
+  paperId: string;
+  title: string;
+  mp3Url: string; // can be a path like /api/podcasts/global/...
+  pdfUrl: string; // can be a path like /api/projects/.../file
+}
+
+/**
+ * GET /api/projects/{id}/dashboard: everything the project page shows in
+ * one response (each field may be left out with ?fields=...).
+ */
+export interface ProjectDashboard {
+  project?: Project;
+  papers?: Paper[];
+  summaries?: SummaryItem[];
+  table?: MetadataRow[];
+  podcasts?: PodcastRow[];
 }
 
 export interface PodcastAsset {
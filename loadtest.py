@@ -0,0 +1,303 @@
+# loadtest.py
+# Load test for server.py. By default the app runs in-process against fake Gemini and
+# Kokoro backends (fakes.py) inside a scratch directory, so nothing touches the network,
+# the model files or your projects/ folder.
+#
+#   python loadtest.py --levels 1,4,16,32 --duration 15 --gemini-latency 2 --tts-char-latency 0.002
+#   python loadtest.py --url http://localhost:8000 --mix list=60,range=40   # a running server
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "list=40,range=30,upload=10,summarize=15,podcast=5"
+
+WORDS = (
+    "attention transformer gradient latent diffusion retrieval benchmark ablation encoder decoder "
+    "token sparse kernel convolution policy reward agent graph embedding contrastive pretraining "
+    "finetuning quantization pruning distillation robustness calibration uncertainty inference "
+    "dataset evaluation baseline architecture optimizer regularization batch layer residual"
+).split()
+
+
+# ---------- fixtures ----------
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal text PDF (Helvetica, one line per string) that pypdf can extract."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 10 Tf 12 TL 50 760 Td"] + [f"({_pdf_escape(l)}) Tj T*" for l in lines] + ["ET"]
+        stream = "\n".join(ops)
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objs)
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+def fake_paper(rng: random.Random, n_pages: int = 3) -> bytes:
+    pages = []
+    for _ in range(n_pages):
+        pages.append([" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(55)])
+    return make_pdf(pages)
+
+
+# ---------- stats ----------
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[idx]
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, route: str, latency: float, ok: bool):
+        self.samples[route].append(latency)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for route in sorted(self.samples):
+            vals = sorted(self.samples[route])
+            out[route] = {
+                "count": len(vals),
+                "errors": self.errors.get(route, 0),
+                "rps": len(vals) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(vals, 50) * 1000,
+                "p95_ms": percentile(vals, 95) * 1000,
+                "p99_ms": percentile(vals, 99) * 1000,
+                "max_ms": vals[-1] * 1000,
+            }
+        return out
+
+
+# ---------- workload ----------
+class Workload:
+    """Shared state for one run: the test project, its papers and generated episodes."""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.pid: Optional[str] = None
+        self.papers: List[str] = []
+        self.summarized: List[str] = []
+        self.episodes: List[str] = []  # mp3 URLs
+
+    async def timed(self, rec: Recorder, route: str, method: str, url: str, **kw) -> Optional[httpx.Response]:
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kw)
+            ok = r.status_code < 400
+        except Exception as e:
+            print(f"[loadtest] {route}: {e!r}")
+            r, ok = None, False
+        rec.add(route, time.perf_counter() - t0, ok)
+        return r
+
+    async def setup(self, n_papers: int, n_podcasts: int):
+        r = await self.client.post("/api/projects", json={"name": "loadtest", "description": "load test fixture"})
+        r.raise_for_status()
+        self.pid = r.json()["id"]
+        scratch = Recorder()
+        for _ in range(n_papers):
+            await self.upload(scratch)
+        for paper_id in list(self.papers):
+            await self.summarize(scratch, paper_id)
+        for paper_id in self.summarized[:n_podcasts]:
+            await self.podcast(scratch, paper_id)
+        if scratch.errors:
+            print(f"[loadtest] setup errors: {dict(scratch.errors)}")
+
+    async def list(self, rec: Recorder):
+        await self.timed(rec, "GET /api/projects/{pid}/papers", "GET", f"/api/projects/{self.pid}/papers")
+
+    async def upload(self, rec: Recorder):
+        pdf = fake_paper(self.rng)
+        files = {"file": (f"paper-{self.rng.randrange(10**6)}.pdf", pdf, "application/pdf")}
+        r = await self.timed(rec, "POST /api/projects/{pid}/papers/upload", "POST",
+                             f"/api/projects/{self.pid}/papers/upload", files=files)
+        if r is not None and r.status_code == 200:
+            self.papers.append(r.json()["id"])
+
+    async def summarize(self, rec: Recorder, paper_id: Optional[str] = None):
+        paper_id = paper_id or self.rng.choice(self.papers)
+        r = await self.timed(rec, "POST /api/projects/{pid}/papers/{paper_id}/tools/summarize", "POST",
+                             f"/api/projects/{self.pid}/papers/{paper_id}/tools/summarize")
+        if r is not None and r.status_code == 200 and paper_id not in self.summarized:
+            self.summarized.append(paper_id)
+
+    async def podcast(self, rec: Recorder, paper_id: Optional[str] = None):
+        if not self.summarized:
+            return await self.summarize(rec)
+        paper_id = paper_id or self.rng.choice(self.summarized)
+        r = await self.timed(rec, "POST /api/projects/{pid}/papers/{paper_id}/tools/podcast", "POST",
+                             f"/api/projects/{self.pid}/papers/{paper_id}/tools/podcast")
+        if r is not None and r.status_code == 200:
+            url = r.json().get("mp3Url")
+            if url and url not in self.episodes:
+                self.episodes.append(url)
+
+    async def range(self, rec: Recorder):
+        # what an audio scrubber or PDF viewer does: small byte ranges at random offsets
+        if self.episodes and self.rng.random() < 0.5:
+            url, route = self.rng.choice(self.episodes), "GET /api/projects/{pid}/papers/{paper_id}/podcasts/{name} (range)"
+        else:
+            paper_id = self.rng.choice(self.papers)
+            url, route = f"/api/projects/{self.pid}/papers/{paper_id}/file", "GET /api/projects/{pid}/papers/{paper_id}/file (range)"
+        start = self.rng.randrange(0, 4096)
+        await self.timed(rec, route, "GET", url, headers={"Range": f"bytes={start}-{start + 65535}"})
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("list", "range", "upload", "summarize", "podcast"):
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+async def run_level(work: Workload, mix: List[Tuple[str, float]], concurrency: int,
+                    duration: float, think_sec: float) -> Tuple[Recorder, float]:
+    rec = Recorder()
+    names = [n for n, _ in mix]
+    weights = [w for _, w in mix]
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            op = work.rng.choices(names, weights)[0]
+            await getattr(work, op)(rec)
+            if think_sec:
+                await asyncio.sleep(work.rng.uniform(0, 2 * think_sec))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return rec, time.perf_counter() - t0  # includes requests still running at the deadline
+
+def print_level(concurrency: int, elapsed: float, stats: Dict[str, Dict[str, float]]):
+    total = sum(s["count"] for s in stats.values())
+    errors = sum(s["errors"] for s in stats.values())
+    print(f"\n== concurrency {concurrency}: {total} requests in {elapsed:.1f}s "
+          f"({total / elapsed:.1f} req/s, {errors} errors)")
+    print(f"{'route':<72} {'n':>6} {'err':>4} {'rps':>7} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}")
+    for route, s in stats.items():
+        print(f"{route:<72} {s['count']:>6} {s['errors']:>4} {s['rps']:>7.2f} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+# ---------- driver ----------
+def configure_fakes(args):
+    """Must run before server/app are imported: they read these at import time."""
+    os.environ["GEMINI_FAKE"] = "1"
+    os.environ["GEMINI_FAKE_LATENCY"] = str(args.gemini_latency)
+    os.environ["GEMINI_FAKE_429_RATE"] = str(args.gemini_429_rate)
+    os.environ["GEMINI_RPM"] = str(args.gemini_rpm)
+    os.environ["TTS_FAKE"] = "1"
+    os.environ["TTS_FAKE_LATENCY"] = str(args.tts_latency)
+    os.environ["TTS_FAKE_CHAR_LATENCY"] = str(args.tts_char_latency)
+    if args.tts_workers is not None:
+        os.environ["TTS_WORKERS"] = str(args.tts_workers)
+    # projects/, generated_podcasts/ and .cache/ are relative to the working directory
+    workdir = args.workdir or tempfile.mkdtemp(prefix="neurocache-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    print(f"[loadtest] in-process server, data in {workdir}")
+
+async def main_async(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {"args": vars(args), "levels": {}}
+
+    async def drive(client: httpx.AsyncClient):
+        work = Workload(client, rng)
+        t0 = time.perf_counter()
+        await work.setup(args.papers, args.podcasts)
+        print(f"[loadtest] setup: {len(work.papers)} papers, {len(work.episodes)} episodes "
+              f"in {time.perf_counter() - t0:.1f}s")
+        for c in levels:
+            rec, elapsed = await run_level(work, mix, c, args.duration, args.think)
+            stats = rec.report(elapsed)
+            print_level(c, elapsed, stats)
+            results["levels"][str(c)] = {"elapsed_sec": elapsed, "routes": stats}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            await drive(client)
+        return results
+
+    import server
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            await drive(client)
+    import app as core
+    results["backends"] = {"gemini": dict(core.GEMINI_LIMITER.stats), "tts_workers": server.TTS_POOL.workers}
+    print(f"\n[loadtest] gemini limiter: {results['backends']['gemini']}")
+    return results
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Throughput and p50/p95/p99 latency per route at increasing concurrency.")
+    ap.add_argument("--url", help="hit a running server instead of starting one in-process (fakes are then up to it)")
+    ap.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrent users per stage")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per stage")
+    ap.add_argument("--think", type=float, default=0.0, help="mean think time between a user's requests (s)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    ap.add_argument("--papers", type=int, default=5, help="papers uploaded and summarized before the first stage")
+    ap.add_argument("--podcasts", type=int, default=2, help="episodes generated before the first stage")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=600.0)
+    ap.add_argument("--workdir", help="data directory for the in-process server (default: a fresh temp dir)")
+    ap.add_argument("--gemini-latency", type=float, default=1.0, help="fake Gemini seconds per call")
+    ap.add_argument("--gemini-429-rate", type=float, default=0.0, help="fraction of fake Gemini calls that 429")
+    ap.add_argument("--gemini-rpm", type=float, default=1_000_000, help="limiter RPM (default: effectively unlimited)")
+    ap.add_argument("--tts-latency", type=float, default=0.05, help="fake Kokoro seconds per line")
+    ap.add_argument("--tts-char-latency", type=float, default=0.001, help="fake Kokoro seconds per character")
+    ap.add_argument("--tts-workers", type=int, default=None, help="override TTS_WORKERS")
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args(argv)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    if not args.url:
+        configure_fakes(args)
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[loadtest] wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# local_summary.py
+# Extractive stand-in for the Gemini summary, computed from the paper's extracted text
+# in well under a second: the highest-scoring sentences by TF-IDF (sentences as the
+# documents), plus title/year/link/venue guessed from the front matter. The result has
+# the same shape as app.parse_metadata_response and is marked provisional.
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from related import tokenize
+
+SUMMARY_WORDS = 120      # same budget the Gemini prompt asks for
+SCRIPT_SENTENCES = 6     # lines read out in the fallback podcast script
+FRONT_CHARS = 3000       # where title, venue, year and link are looked for
+
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\[])")
+_ABSTRACT_RE = re.compile(r"\babstract\b[\s.:\-—]*", re.I)
+_REFERENCES_RE = re.compile(r"^\s*(?:\d+\.?\s+)?(?:references|bibliography)\s*$", re.I | re.M)
+_ARXIV_RE = re.compile(r"arxiv[:\s]*(\d{4}\.\d{4,5})(v\d+)?", re.I)
+_DOI_RE = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+[^\s\"<>.,;])")
+_URL_RE = re.compile(r"https?://[^\s\"<>)]+[^\s\"<>).,;]")
+_YEAR_RE = re.compile(r"\b(19[89]\d|20\d\d)\b")
+_KEYWORDS_RE = re.compile(r"\b(?:index terms|keywords|key words)\b", re.I)
+_TITLE_CONTINUES = ("and", "of", "for", "the", "with", "in", "on", "to", "a", "an", "via", "from", "by", "-", ":")
+VENUES = ("NeurIPS", "NIPS", "ICML", "ICLR", "AAAI", "IJCAI", "CVPR", "ICCV", "ECCV", "ACL", "EMNLP",
+          "NAACL", "COLING", "KDD", "SIGIR", "WWW", "ICRA", "IROS", "CoRL", "RSS", "MICCAI", "Interspeech",
+          "ICASSP", "TPAMI", "JMLR", "TMLR", "Bioinformatics")
+_VENUE_RE = re.compile(r"\b(" + "|".join(VENUES) + r")\b")
+# domain -> words that point to it; the domain with the most hits in the text wins
+DOMAIN_WORDS = {
+    "NLP": ("language", "text", "token", "translation", "sentence", "linguistic", "llm", "llms"),
+    "CV": ("image", "images", "vision", "visual", "pixel", "video", "segmentation", "detection"),
+    "Audio": ("speech", "audio", "music", "musical", "acoustic", "speaker", "spectrogram"),
+    "Robotics": ("robot", "robots", "robotic", "manipulation", "grasping", "locomotion"),
+    "Genomics": ("gene", "genes", "genome", "genomic", "protein", "dna", "rna", "cell"),
+}
+
+
+def _prose(sentence: str) -> bool:
+    words = sentence.split()
+    if not 8 <= len(words) <= 60 or _KEYWORDS_RE.search(sentence):
+        return False
+    # keyword lists, headers and table rows are mostly capitalized words or numbers
+    return sum(1 for w in words if w[:1].islower()) >= 0.5 * len(words)
+
+def split_sentences(text: str) -> List[str]:
+    text = re.sub(r"-\n(?=[a-z])", "", text)  # words hyphenated across lines
+    text = re.sub(r"\s+", " ", text)
+    return [s.strip() for s in _SENT_SPLIT_RE.split(text) if _prose(s)]
+
+def rank_sentences(sentences: List[str]) -> np.ndarray:
+    """
+    TF-IDF score per sentence: the mean weight of its terms, where a term weighs its
+    frequency in the paper times its IDF over the sentences. Early sentences (abstract,
+    introduction) get a small boost, as they tend to state the contribution.
+    """
+    toks = [tokenize(s) for s in sentences]
+    df = Counter(t for ts in toks for t in set(ts))
+    tf = Counter(t for ts in toks for t in ts)
+    n = len(sentences)
+    weight = {t: (1.0 + np.log(tf[t])) * np.log((1.0 + n) / (1.0 + df[t])) for t in tf}
+    scores = np.array([sum(weight[t] for t in ts) / (len(ts) + 5) if ts else 0.0 for ts in toks])
+    return scores * (1.0 + 0.5 / (1.0 + np.arange(n) / 20.0))
+
+def _title_like(line: str) -> bool:
+    return bool(line) and len(line.split()) <= 25 and not _URL_RE.search(line) and not _ARXIV_RE.search(line) \
+        and "@" not in line and sum(c.isalpha() for c in line) > 0.7 * len(line)
+
+def guess_title(front: str) -> Optional[str]:
+    """The first title-like line of the front matter, joined with the next if it trails off."""
+    lines = [line.strip() for line in front.splitlines()[:20]]
+    for i, line in enumerate(lines):
+        if len(line.split()) >= 3 and _title_like(line):
+            title = line
+            for nxt in lines[i + 1:i + 3]:
+                if not (title.split()[-1].lower() in _TITLE_CONTINUES or title.endswith(("-", ":"))) \
+                        or not _title_like(nxt):
+                    break
+                title += " " + nxt
+            return title.rstrip(".")
+    return None
+
+def guess_link(front: str) -> str:
+    m = _ARXIV_RE.search(front)
+    if m:
+        return f"https://arxiv.org/abs/{m.group(1)}"
+    m = _DOI_RE.search(front)
+    if m:
+        return f"https://doi.org/{m.group(1)}"
+    m = _URL_RE.search(front)
+    return m.group(0) if m else "Unknown"
+
+def guess_year(front: str) -> int:
+    now = datetime.now().year
+    m = _ARXIV_RE.search(front)
+    if m:
+        return 2000 + int(m.group(1)[:2])
+    # the newest year on the first page; older ones are usually citations
+    years = [int(y) for y in _YEAR_RE.findall(front) if int(y) <= now]
+    return max(years) if years else now
+
+def guess_domain(tokens: List[str]) -> str:
+    counts = Counter(tokens)
+    hits = {d: sum(counts[w] for w in words) for d, words in DOMAIN_WORDS.items()}
+    best = max(hits, key=hits.get)
+    return best if hits[best] >= 5 else "AI"
+
+def top_terms(sentences: List[str], k: int = 6) -> List[str]:
+    counts = Counter(t for s in sentences for t in tokenize(s) if not t[0].isdigit())
+    return [t for t, _ in counts.most_common(k)]
+
+def local_metadata(text: str) -> Dict[str, Any]:
+    """Provisional meta.json fields from the paper's text (see the module comment)."""
+    refs = _REFERENCES_RE.search(text)
+    if refs and refs.start() > len(text) // 2:
+        text = text[:refs.start()]
+    front = text[:FRONT_CHARS]
+    abstract = _ABSTRACT_RE.search(front)
+    sentences = split_sentences(text[abstract.end():] if abstract else text)
+
+    picked: List[int] = []
+    if sentences:
+        scores = rank_sentences(sentences)
+        words = 0
+        for i in np.argsort(-scores):
+            if words >= SUMMARY_WORDS:
+                break
+            picked.append(int(i))
+            words += len(sentences[i].split())
+    chosen = [sentences[i] for i in sorted(picked)]  # back in reading order
+
+    title = guess_title(front) or "Unknown Title"
+    venue = _VENUE_RE.search(front)
+    script = [f"Male: Today we're looking at the paper {title}."]
+    for j, sent in enumerate(chosen[:SCRIPT_SENTENCES]):
+        script.append(f"{'Female' if j % 2 == 0 else 'Male'}: {sent}")
+    return {
+        "conference": venue.group(1) if venue else "Unknown",
+        "year": guess_year(front),
+        "link": guess_link(front),
+        "domain": guess_domain(tokenize(text)),
+        "title": title,
+        "summary": " ".join(chosen),
+        "tags": ", ".join(top_terms(sentences)),
+        "script": script if chosen else [],
+    }
@@ -0,0 +1,234 @@
+# profiling.py
+# Opt-in profiling of one request or one Gradio run: a sampling wall-clock profiler that
+# writes collapsed stacks (flamegraph.pl / speedscope / inferno input) of the threads
+# working for the run, and a tracemalloc top-N of what the whole process allocated meanwhile.
+import os
+import sys
+import json
+import time
+import uuid
+import functools
+import threading
+import contextvars
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "25"))
+PROFILE_TRACE_FRAMES = 1  # alloc.txt groups by line; deeper tracebacks slow tracing a lot
+
+# Leaf frames that mean "parked": idle pool threads would otherwise dominate every profile
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"), ("thread.py", "_worker"),
+}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of the added threads each `interval` seconds. A thread is
+    added once per enter() and sampled until the matching leave().
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000.0, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.seen_threads = set()
+        self._threads: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enter(self, tid: int):
+        with self._threads_lock:
+            self._threads[tid] += 1
+            self.seen_threads.add(tid)
+
+    def leave(self, tid: int):
+        with self._threads_lock:
+            self._threads[tid] -= 1
+            if self._threads[tid] <= 0:
+                del self._threads[tid]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            self.samples += 1
+            with self._threads_lock:
+                wanted = set(self._threads)
+            for tid, frame in sys._current_frames().items():
+                if tid not in wanted:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+# The session whose run the current context belongs to (see profiled)
+_ACTIVE: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+
+def profiled(fn: Callable) -> Callable:
+    """
+    fn with its thread sampled by the caller's profile session, if any, while it runs:
+    for thread pools and worker threads, which don't copy the caller's context.
+    """
+    session = _ACTIVE.get()
+    if session is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _ACTIVE.set(session)
+        tid = threading.get_ident()
+        session.sampler.enter(tid)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.sampler.leave(tid)
+            _ACTIVE.reset(token)
+    return run
+
+
+# tracemalloc is process-wide; concurrent sessions share one tracing period
+_trace_lock = threading.Lock()
+_trace_users = 0
+
+def _trace_start():
+    global _trace_users
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACE_FRAMES)
+        _trace_users += 1
+
+def _trace_stop():
+    global _trace_users
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class ProfileSession:
+    """
+    with ProfileSession(root, "POST /api/..."): ...
+    writes root/<id>/cpu.folded, alloc.txt and meta.json. cpu.folded covers the thread
+    that entered the session and threads started through profiled(); alloc.txt covers
+    the whole process, since tracemalloc can't tell threads apart. Another process (a
+    TTS worker) can add its own files to the same profile by passing profile_id and a
+    prefix, e.g. worker-cpu.folded.
+    """
+
+    def __init__(self, root: str, label: str, profile_id: Optional[str] = None, prefix: str = "",
+                 top_n: int = PROFILE_TOP_N):
+        self.root = root
+        self.label = label
+        self.id = profile_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.prefix = prefix
+        self.top_n = top_n
+        self.dir = os.path.join(root, self.id)
+        self.sampler = StackSampler()
+        self.meta: Dict[str, Any] = {}
+
+    def __enter__(self):
+        os.makedirs(self.dir, exist_ok=True)
+        _trace_start()
+        self._snap0 = tracemalloc.take_snapshot()
+        self._t0 = time.time()
+        self._cpu0 = time.process_time()
+        self._token = _ACTIVE.set(self)
+        self.sampler.enter(threading.get_ident())
+        self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sampler.leave(threading.get_ident())
+        _ACTIVE.reset(self._token)
+        self.sampler.stop()
+        wall = time.time() - self._t0
+        cpu = time.process_time() - self._cpu0
+        try:
+            snap1 = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            _trace_stop()
+        self._write(wall, cpu, snap1, peak, exc)
+        return False
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, self.prefix + name)
+
+    def _write(self, wall: float, cpu: float, snap1, peak: int, exc):
+        try:
+            with open(self._path("cpu.folded"), "w", encoding="utf-8") as f:
+                f.write(self.sampler.collapsed())
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            stats = snap1.filter_traces(filters).compare_to(self._snap0.filter_traces(filters), "lineno")
+            with open(self._path("alloc.txt"), "w", encoding="utf-8") as f:
+                f.write(f"# {self.label}: top {self.top_n} allocation sites by net growth, "
+                        f"traced peak {peak / 1e6:.1f} MB\n"
+                        f"# process-wide: includes every thread's allocations during the run, "
+                        f"not only this one's\n")
+                for st in stats[:self.top_n]:
+                    f.write(f"{st}\n")
+            self.meta = {
+                "id": self.id,
+                "label": self.label,
+                "pid": os.getpid(),
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._t0)),
+                "wall_sec": round(wall, 3),
+                "cpu_sec": round(cpu, 3),
+                "samples": self.sampler.samples,
+                "sampled_threads": len(self.sampler.seen_threads),
+                "process_wide": ["cpu_sec", "peak_traced_mb", "alloc.txt"],
+                "interval_ms": self.sampler.interval * 1000,
+                "peak_traced_mb": round(peak / 1e6, 2),
+                "error": repr(exc) if exc is not None else None,
+            }
+            with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, indent=2)
+        except Exception as e:
+            print("[Profile warning]", e)
+
+
+def list_profiles(root: str) -> List[Dict[str, Any]]:
+    out = []
+    if not os.path.isdir(root):
+        return out
+    for pid in os.listdir(root):
+        d = os.path.join(root, pid)
+        if not os.path.isdir(d):
+            continue
+        try:
+            with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {"id": pid}
+        meta["files"] = sorted(os.listdir(d))
+        out.append(meta)
+    out.sort(key=lambda m: m["id"], reverse=True)
+    return out
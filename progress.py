@@ -0,0 +1,118 @@
+# progress.py
+# Live progress of summarize/podcast jobs for Server-Sent Events. Jobs run on worker
+# threads and report through the usual progress(frac, desc=...) callback; the hub keeps
+# the latest event per job and fans new ones out to asyncio subscribers.
+import time
+import json
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Hashable, Iterator, List, Optional, Tuple
+
+TERMINAL = ("done", "error", "cancelled")
+
+
+class JobProgress:
+    """progress(frac, desc=...) callback for one job run, with an ETA from the rate so far."""
+
+    def __init__(self, hub: "ProgressHub", key: Hashable, job: str):
+        self.hub = hub
+        self.key = key
+        self.job = job
+        self.started = time.time()
+        self._run_t0: Optional[float] = None
+        self._run_f0 = 0.0
+
+    def stage(self, stage: str, desc: str = "", **extra):
+        self.hub.publish(self.key, job=self.job, stage=stage, desc=desc,
+                         elapsed_sec=round(time.time() - self.started, 2), **extra)
+
+    def __call__(self, frac: float, desc: str = ""):
+        now = time.time()
+        frac = min(1.0, max(0.0, float(frac)))
+        if self._run_t0 is None:
+            self._run_t0, self._run_f0 = now, frac
+        eta = None
+        done = frac - self._run_f0
+        if done > 0.01 and frac < 1.0:
+            eta = round((now - self._run_t0) * (1.0 - frac) / done, 1)
+        self.stage("running", desc, frac=round(frac, 4), eta_sec=eta)
+
+
+class ProgressHub:
+    def __init__(self, keep_sec: float = 600.0):
+        self.keep_sec = keep_sec
+        self._lock = threading.Lock()
+        self._latest: Dict[Hashable, Dict[str, Any]] = {}
+        self._subs: Dict[Hashable, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._seq = 0
+
+    def publish(self, key: Hashable, **event):
+        with self._lock:
+            self._seq += 1
+            event = dict(event, id=self._seq, t=round(time.time(), 3))
+            self._latest[key] = event
+            subs = list(self._subs.get(key, ()))
+            cutoff = time.time() - self.keep_sec
+            for k in [k for k, ev in self._latest.items() if ev["stage"] in TERMINAL and ev["t"] < cutoff]:
+                del self._latest[k]
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(q.put_nowait, event)
+            except RuntimeError:
+                pass  # the subscriber's loop is gone
+
+    def latest(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._latest.get(key)
+
+    @contextmanager
+    def track(self, key: Hashable, job: str) -> Iterator[JobProgress]:
+        """Publishes done / cancelled / error when the block exits."""
+        from app import JobCancelled
+        p = JobProgress(self, key, job)
+        try:
+            yield p
+        except JobCancelled:
+            p.stage("cancelled")
+            raise
+        except Exception as e:
+            p.stage("error", getattr(e, "detail", None) or str(e))
+            raise
+        p.stage("done", frac=1.0)
+
+    async def subscribe(self, key: Hashable, heartbeat_sec: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        The current event if the job is active, then every new one until the next
+        terminal event. Yields None every heartbeat_sec of silence (keeps proxies open).
+        """
+        loop = asyncio.get_running_loop()
+        q: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subs.setdefault(key, []).append((loop, q))
+            current = self._latest.get(key)
+        try:
+            if current is not None and current["stage"] not in TERMINAL:
+                yield current
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), heartbeat_sec)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["stage"] in TERMINAL:
+                    return
+        finally:
+            with self._lock:
+                subs = self._subs.get(key, [])
+                if (loop, q) in subs:
+                    subs.remove((loop, q))
+                if not subs:
+                    self._subs.pop(key, None)
+
+
+def sse_format(event: Optional[Dict[str, Any]]) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
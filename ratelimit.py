@@ -0,0 +1,159 @@
+# ratelimit.py
+# Process-wide Gemini quota handling: token buckets for RPM/TPM plus retry with backoff.
+import time
+import random
+import threading
+from typing import Any, Callable, Optional
+
+
+class RateLimitExhausted(RuntimeError):
+    """Raised when a call is still rate limited after every retry."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `per_minute / 60` tokens a second.
+    acquire() blocks instead of failing; waiters queue on a turnstile so a large
+    request is not starved by a stream of small ones.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = float(per_minute) / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._turnstile = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, n: float = 1.0) -> float:
+        """Take n tokens, sleeping until they are available. Returns seconds waited."""
+        n = min(float(n), self.capacity)
+        if n <= 0 or self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        with self._turnstile:
+            while True:
+                with self._lock:
+                    self._refill()
+                    if self.tokens >= n:
+                        self.tokens -= n
+                        return waited
+                    wait = (n - self.tokens) / self.rate
+                time.sleep(wait)
+                waited += wait
+
+    def adjust(self, delta: float):
+        """Credit (positive) or debit (negative) tokens after the real cost is known."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+    def drain(self):
+        # the server told us we're over quota; make everyone wait for a refill
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+def estimate_tokens(parts, file_tokens: int = 0) -> int:
+    """Rough prompt size: ~4 chars per token for text, a flat estimate per uploaded file."""
+    total = 0
+    for p in parts:
+        if isinstance(p, str):
+            total += len(p) // 4 + 1
+        else:
+            total += file_tokens
+    return total
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    code = getattr(e, "code", None)
+    if code == 429 or getattr(code, "value", None) == 429:
+        return True
+    name = type(e).__name__
+    msg = str(e).lower()
+    return name in ("ResourceExhausted", "TooManyRequests") or "429" in msg or "quota" in msg or "rate limit" in msg
+
+def is_transient_error(e: Exception) -> bool:
+    code = getattr(e, "code", None)
+    code = getattr(code, "value", code)
+    if code in (500, 502, 503, 504):
+        return True
+    name = type(e).__name__
+    return name in ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+                    "ConnectionError", "TimeoutError", "ReadTimeout")
+
+
+class GeminiLimiter:
+    """Shared by every Gemini caller in the process (API routes, batch tools, Gradio)."""
+
+    def __init__(self, rpm: float, tpm: float, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "queued_sec": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _bump(self, key: str, by: float = 1):
+        with self._stats_lock:
+            self.stats[key] += by
+
+    def backoff_delay(self, attempt: int, hint: Optional[float] = None) -> float:
+        # full jitter: uniform(0, min(cap, base * 2^attempt)), but never below a server hint
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if hint:
+            delay = max(delay, float(hint))
+        return delay
+
+    def call(self, fn: Callable[[], Any], est_tokens: int = 0, count_request: bool = True,
+             usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Run fn() under the limiter. Rate-limit and transient errors are retried with
+        exponential backoff; anything else propagates immediately. `usage(result)`
+        may return the real token count so the TPM bucket can be reconciled.
+        """
+        attempt = 0
+        while True:
+            waited = 0.0
+            if count_request:
+                waited += self.requests.acquire(1)
+            if est_tokens:
+                waited += self.tokens.acquire(est_tokens)
+            self._bump("calls")
+            if waited:
+                self._bump("queued_sec", waited)
+            try:
+                result = fn()
+            except Exception as e:
+                limited = is_rate_limit_error(e)
+                if not (limited or is_transient_error(e)):
+                    raise
+                if limited:
+                    self._bump("rate_limited")
+                    self.requests.drain()
+                if attempt >= self.max_retries:
+                    if limited:
+                        raise RateLimitExhausted(f"Gemini still rate limited after {attempt + 1} attempts: {e}") from e
+                    raise
+                delay = self.backoff_delay(attempt, getattr(e, "retry_after", None))
+                print(f"[Gemini retry] attempt {attempt + 1} in {delay:.1f}s: {e}")
+                self._bump("retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if usage is not None and est_tokens:
+                try:
+                    real = usage(result)
+                except Exception:
+                    real = None
+                if real:
+                    self.tokens.adjust(est_tokens - real)
+            return result
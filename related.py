@@ -0,0 +1,161 @@
+# related.py
+# Local "related papers" index: hashed TF-IDF vectors kept in one NumPy matrix.
+import os
+import re
+import zlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+N_FEATURES = 1 << 13   # hashed vocabulary width (columns of the matrix)
+FIELD_WEIGHT = 3.0     # title/tags/summary terms count more than body text
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9\-]{2,}")
+
+STOPWORDS = frozenset("""
+about above after again against all also among and any are because been before being
+below between both but can could did does doing down during each few for from further
+had has have having here how however into its itself just more most much must not now
+off once only other our out over own same should some such than that the their them
+then there these they this those through too under until upon very was were what when
+where which while who whom why will with would you your paper propose proposed show
+shows using used use based results approach method methods model models new our we
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+def _buckets(tokens: List[str]) -> np.ndarray:
+    # crc32 rather than hash(): must be stable across processes for the saved matrix
+    return np.fromiter((zlib.crc32(t.encode("utf-8")) % N_FEATURES for t in tokens),
+                       dtype=np.int64, count=len(tokens))
+
+def term_vector(fields: str, body: str = "") -> np.ndarray:
+    """Sublinear term-frequency row for one paper (IDF is applied at query time)."""
+    vec = np.zeros(N_FEATURES, dtype=np.float32)
+    np.add.at(vec, _buckets(tokenize(fields)), FIELD_WEIGHT)
+    np.add.at(vec, _buckets(tokenize(body)), 1.0)
+    nz = vec > 0
+    vec[nz] = 1.0 + np.log(vec[nz])
+    return vec
+
+
+class RelatedIndex:
+    """
+    Rows are papers keyed by "{project_id}/{paper_id}". Term frequencies and the
+    document-frequency vector are updated in place on upsert/remove; the
+    normalized TF-IDF matrix is rebuilt lazily on the next query, which is then
+    a single matrix-vector product.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self.keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._tf = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self._df = np.zeros(N_FEATURES, dtype=np.float32)
+        self._weighted: Optional[np.ndarray] = None
+        self._load()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                keys = [str(k) for k in data["keys"]]
+                tf = data["tf"].astype(np.float32)
+        except Exception as e:
+            print("[Related index warning]", e)
+            return
+        if tf.shape != (len(keys), N_FEATURES):
+            # feature width changed; rebuild from scratch on next sync
+            return
+        self.keys = keys
+        self._rows = {k: i for i, k in enumerate(keys)}
+        self._tf = tf
+        self._df = (tf > 0).sum(axis=0).astype(np.float32)
+
+    def save(self):
+        with self._lock:
+            n = len(self.keys)
+            tmp = self.path + ".tmp.npz"
+            np.savez_compressed(tmp, keys=np.array(self.keys, dtype=str), tf=self._tf[:n])
+            os.replace(tmp, self.path)
+
+    # ---------- updates ----------
+    def upsert(self, key: str, vec: np.ndarray):
+        with self._lock:
+            i = self._rows.get(key)
+            if i is None:
+                i = len(self.keys)
+                if i >= self._tf.shape[0]:
+                    grown = np.zeros((max(8, 2 * self._tf.shape[0]), N_FEATURES), dtype=np.float32)
+                    grown[:i] = self._tf[:i]
+                    self._tf = grown
+                self.keys.append(key)
+                self._rows[key] = i
+            else:
+                self._df -= (self._tf[i] > 0)
+            self._tf[i] = vec
+            self._df += (vec > 0)
+            self._weighted = None
+
+    def remove(self, key: str):
+        with self._lock:
+            i = self._rows.pop(key, None)
+            if i is None:
+                return
+            self._df -= (self._tf[i] > 0)
+            last = len(self.keys) - 1
+            if i != last:
+                # swap-remove keeps the rows contiguous
+                self._tf[i] = self._tf[last]
+                self.keys[i] = self.keys[last]
+                self._rows[self.keys[i]] = i
+            self._tf[last] = 0.0
+            self.keys.pop()
+            self._weighted = None
+
+    def remove_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self.keys if k.startswith(prefix)]:
+                self.remove(key)
+
+    # ---------- queries ----------
+    def _matrix(self) -> np.ndarray:
+        if self._weighted is None:
+            n = len(self.keys)
+            idf = np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+            w = self._tf[:n] * idf.astype(np.float32)
+            norms = np.linalg.norm(w, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._weighted = w / norms
+        return self._weighted
+
+    def most_similar(self, key: str, k: int = 5, prefix: Optional[str] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            i = self._rows.get(key)
+            if i is None:
+                return []
+            w = self._matrix()
+            scores = w @ w[i]
+            scores[i] = -np.inf
+            if prefix is not None:
+                mask = np.fromiter((kk.startswith(prefix) for kk in self.keys), dtype=bool, count=len(self.keys))
+                scores[~mask] = -np.inf
+            k = max(0, min(int(k), len(self.keys) - 1))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.keys[j], float(scores[j])) for j in top if np.isfinite(scores[j])]
@@ -0,0 +1,181 @@
+# scheduler.py
+# Priority admission for scarce execution slots (TTS worker processes, Gemini jobs).
+# Interactive work is admitted before bulk work, projects take turns within a class, and
+# an interactive job may borrow a slot by pausing a running bulk job at its next checkpoint.
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Hashable, Iterator, List, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)  # admission order
+
+
+class Ticket:
+    def __init__(self, priority: str, project: str, key: Optional[Hashable] = None):
+        self.priority = priority
+        self.project = project
+        self.key = key
+        self.admitted = False
+        self.paused = threading.Event()  # set while this job should hold at a checkpoint
+        self.victim: Optional["Ticket"] = None  # bulk job paused to make room for this one
+        self.enqueued = time.monotonic()
+        self.wait_sec = 0.0
+
+
+class PriorityScheduler:
+    """
+    `slots` jobs run at once. Up to `borrow` more interactive jobs may start when all
+    slots are busy, each pausing one running bulk job (its Ticket.paused is set; the job
+    is expected to wait at its next checkpoint) until the interactive job finishes.
+    So the backing executor needs slots + borrow workers, of which only `slots` are
+    ever busy. A slot that frees up goes to a paused job before any queued one.
+    """
+
+    def __init__(self, slots: int, borrow: int = 0, name: str = ""):
+        self.slots = max(1, slots)
+        self.borrow = max(0, borrow)
+        self.name = name
+        self._cond = threading.Condition()
+        self._queues: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._running: List[Ticket] = []
+        self.stats = {"admitted": 0, "preemptions": 0, "max_wait_sec": {p: 0.0 for p in PRIORITIES}}
+
+    # ---------- internals (lock held) ----------
+    def _active(self) -> int:
+        return sum(1 for t in self._running if not t.paused.is_set())
+
+    def _head(self) -> Optional[Ticket]:
+        for prio in PRIORITIES:
+            for dq in self._queues[prio].values():
+                if dq:
+                    return dq[0]
+        return None
+
+    def _pop(self, t: Ticket):
+        q = self._queues[t.priority]
+        q[t.project].remove(t)
+        if q[t.project]:
+            q.move_to_end(t.project)  # round-robin: this project goes to the back of its class
+        else:
+            del q[t.project]
+
+    def _admit(self, t: Ticket):
+        self._pop(t)
+        t.admitted = True
+        t.wait_sec = time.monotonic() - t.enqueued
+        self._running.append(t)
+        self.stats["admitted"] += 1
+        worst = self.stats["max_wait_sec"]
+        worst[t.priority] = max(worst[t.priority], round(t.wait_sec, 3))
+
+    def _victim(self) -> Optional[Ticket]:
+        # the most recently started bulk job has the least sunk work to keep hot
+        for t in reversed(self._running):
+            if t.priority == BULK and not t.paused.is_set():
+                return t
+        return None
+
+    def _resume_paused(self):
+        # a freed slot goes back to a paused job before anything new is admitted
+        for r in self._running:
+            if self._active() >= self.slots:
+                return
+            if r.paused.is_set():
+                for o in self._running:
+                    if o.victim is r:
+                        o.victim = None
+                r.paused.clear()
+
+    def _schedule(self):
+        self._resume_paused()
+        while True:
+            t = self._head()
+            if t is None:
+                return
+            if self._active() < self.slots and len(self._running) < self.slots + self.borrow:
+                self._admit(t)
+                continue
+            if t.priority == INTERACTIVE and len(self._running) < self.slots + self.borrow:
+                victim = self._victim()
+                if victim is not None:
+                    victim.paused.set()
+                    t.victim = victim
+                    self.stats["preemptions"] += 1
+                    self._admit(t)
+                    continue
+            return
+
+    # ---------- API ----------
+    def acquire(self, priority: str, project: str, key: Optional[Hashable] = None,
+                cancel: Optional[threading.Event] = None, poll_sec: float = 0.5) -> Optional[Ticket]:
+        """Block until admitted. Returns None (and leaves the queue) if `cancel` is set first."""
+        t = Ticket(priority if priority in PRIORITIES else BULK, project, key)
+        with self._cond:
+            self._queues[t.priority].setdefault(project, deque()).append(t)
+            self._schedule()
+            while not t.admitted:
+                if cancel is not None and cancel.is_set():
+                    self._pop(t)
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait(poll_sec)
+        return t
+
+    def release(self, t: Ticket):
+        with self._cond:
+            self._running.remove(t)
+            victim, t.victim = t.victim, None
+            if victim is not None and victim in self._running:
+                nxt = self._head()
+                if nxt is not None and nxt.priority == INTERACTIVE:
+                    # hand the paused job's slot straight to the next interactive job
+                    self._admit(nxt)
+                    nxt.victim = victim
+                else:
+                    victim.paused.clear()
+            # a paused job that loses its slot holder must not stay paused forever
+            for r in self._running:
+                if r.paused.is_set() and not any(o.victim is r for o in self._running):
+                    r.paused.clear()
+            self._schedule()
+            self._cond.notify_all()
+
+    def promote(self, key: Hashable) -> bool:
+        """Move a queued bulk job to the interactive class (someone is now waiting on it)."""
+        with self._cond:
+            for dq in list(self._queues[BULK].values()):
+                for t in dq:
+                    if t.key == key:
+                        self._pop(t)
+                        t.priority = INTERACTIVE
+                        self._queues[INTERACTIVE].setdefault(t.project, deque()).append(t)
+                        self._schedule()
+                        self._cond.notify_all()
+                        return True
+        return False
+
+    @contextmanager
+    def slot(self, priority: str, project: str, key: Optional[Hashable] = None,
+             cancel: Optional[threading.Event] = None) -> Iterator[Ticket]:
+        t = self.acquire(priority, project, key, cancel)
+        if t is None:
+            from app import JobCancelled
+            raise JobCancelled(f"{self.name or 'job'} cancelled while queued")
+        try:
+            yield t
+        finally:
+            self.release(t)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "borrow": self.borrow,
+                "queued": {p: {proj: len(dq) for proj, dq in q.items()} for p, q in self._queues.items()},
+                "running": [{"priority": t.priority, "project": t.project, "paused": t.paused.is_set(),
+                             "wait_sec": round(t.wait_sec, 3)} for t in self._running],
+                "stats": self.stats,
+            }
@@ -1,16 +1,24 @@
 import os
 import io
+import re
 import csv
 import uuid
 import json
-import shutil
+import time
+import asyncio
+import hashlib
+import functools
+import threading
+import contextvars
 from shutil import rmtree
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse, RedirectResponse
 from starlette.responses import FileResponse
 
 from fastapi import Body
@@ -21,8 +29,19 @@ from fastapi import Body
 from app import (
     GENERATED_FOLDER, PROJECTS_DIR, now_iso, safe_stem,
     gemini_extract_metadata_and_script, write_project_json,
-    process_script, list_project_ids, load_script_from_meta
+    remix_episode, list_project_ids, load_script_from_meta, read_pdf_text,
+    RateLimitExhausted, DEFAULT_GESTURE_PHRASES, JobCancelled, check_cancel, ARTIFACTS, PROFILES_DIR
 )
+from related import RelatedIndex, term_vector
+from local_summary import local_metadata
+from tts_pool import TTSPool, ScriptFeed, TTS_WORKERS, TTS_INTERACTIVE_RESERVE
+from singleflight import SingleFlight, ClientDisconnected
+from scheduler import PriorityScheduler, INTERACTIVE, BULK
+from progress import ProgressHub, sse_format
+from artifacts import AudioRegistry
+from profiling import ProfileSession, list_profiles, profiled
+from tracing import span, bind
+from storage import open_storage, STORAGE_PRESIGN_SEC
 
 # ---------------- Config / Folders ----------------
 os.makedirs(PROJECTS_DIR, exist_ok=True)
@@ -33,54 +52,166 @@ ROOT = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(ROOT, ".env"))
 
 
-def ensure_project_dir(pid: str) -> str:
-    pdir = os.path.join(PROJECTS_DIR, pid)
-    os.makedirs(pdir, exist_ok=True)
-    return pdir
+# Project records, PDFs and episodes live in STORE under "{pid}/..." keys: the projects/
+# tree by default, an S3-compatible bucket with STORAGE_BACKEND=s3 (see storage.py).
+STORE = open_storage(PROJECTS_DIR)
 
-def project_json_path(pid: str) -> str:
-    return os.path.join(PROJECTS_DIR, pid, "project.json")
+def project_key(pid: str) -> str:
+    return f"{pid}/project.json"
 
-def papers_dir(pid: str) -> str:
-    d = os.path.join(PROJECTS_DIR, pid, "papers")
-    os.makedirs(d, exist_ok=True)
-    return d
+def papers_prefix(pid: str) -> str:
+    return f"{pid}/papers/"
+
+def paper_key(pid: str, paper_id: str, name: str) -> str:
+    return f"{pid}/papers/{paper_id}/{name}"
 
 def paper_dir(pid: str, paper_id: str) -> str:
-    d = os.path.join(papers_dir(pid), paper_id)
+    # local working folder (episodes are synthesized here, then stored under paper_key)
+    d = os.path.join(STORE.local_root, pid, "papers", paper_id)
     os.makedirs(d, exist_ok=True)
     return d
 
-def paper_json_path(pid: str, paper_id: str) -> str:
-    return os.path.join(paper_dir(pid, paper_id), "paper.json")
+def paper_json_key(pid: str, paper_id: str) -> str:
+    return paper_key(pid, paper_id, "paper.json")
 
-def paper_pdf_path(pid: str, paper_id: str) -> str:
+def paper_pdf_key(pid: str, paper_id: str) -> str:
     # Keep original extension if we want; default to .pdf
-    pj = paper_json_path(pid, paper_id)
-    meta = {}
-    try:
-        with open(pj, "r", encoding="utf-8") as f:
-            meta = json.load(f)
-    except Exception:
-        pass
-    fname = meta.get("filename", f"{paper_id}.pdf")
-    return os.path.join(paper_dir(pid, paper_id), fname)
+    fname = read_record(paper_json_key(pid, paper_id), {}).get("filename", f"{paper_id}.pdf")
+    return paper_key(pid, paper_id, fname)
 
-def paper_meta_path(pid: str, paper_id: str) -> str:
+def paper_meta_key(pid: str, paper_id: str) -> str:
     # per-paper Gemini output
-    return os.path.join(paper_dir(pid, paper_id), "meta.json")
+    return paper_key(pid, paper_id, "meta.json")
 
-def read_json(fp: str, default):
+def paper_text_key(pid: str, paper_id: str) -> str:
+    # cached extracted PDF text (pypdf is slow; reuse across tools)
+    return paper_key(pid, paper_id, "text.txt")
+
+def paper_text(pid: str, paper_id: str) -> str:
+    tk = paper_text_key(pid, paper_id)
     try:
-        with open(fp, "r", encoding="utf-8") as f:
+        return STORE.read_bytes(tk).decode("utf-8")
+    except FileNotFoundError:
+        pass
+    try:
+        pdf = STORE.local_path(paper_pdf_key(pid, paper_id))
+    except FileNotFoundError:
+        return ""
+    text = read_pdf_text(pdf)
+    STORE.write_bytes(tk, text.encode("utf-8"))
+    return text
+
+def read_record(key: str, default):
+    return STORE.read_json(key, default)
+
+def write_record(key: str, data: dict):
+    # both backends replace the whole object, so readers never see a half-written record
+    STORE.write_json(key, data)
+
+# ---------------- Related papers index ----------------
+# Kept on each node (local_root), built from the store: every row remembers the version
+# (etag) of the meta.json it came from, so sync_related_index can tell stale rows apart
+RELATED_INDEX = RelatedIndex(os.path.join(STORE.local_root, "related_index.npz"))
+RELATED_VERSIONS_PATH = os.path.join(STORE.local_root, "related_index.versions.json")
+_related_lock = threading.RLock()
+_related_synced = False
+_related_gens: Dict[str, str] = {}  # shared store: generation token the index last saw per project
+
+def _load_related_versions() -> Dict[str, str]:
+    try:
+        with open(RELATED_VERSIONS_PATH, "r", encoding="utf-8") as f:
             return json.load(f)
-    except Exception:
-        return default
+    except (OSError, ValueError):
+        return {}
+
+_related_versions: Dict[str, str] = _load_related_versions()
+
+def save_related_index():
+    with _related_lock:
+        RELATED_INDEX.save()
+        tmp = RELATED_VERSIONS_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_related_versions, f)
+        os.replace(tmp, RELATED_VERSIONS_PATH)
+
+def related_key(pid: str, paper_id: str) -> str:
+    return f"{pid}/{paper_id}"
+
+def _meta_version(pid: str, paper_id: str) -> Optional[str]:
+    st = STORE.stat(paper_meta_key(pid, paper_id))
+    return st.etag if st is not None else None
 
-def write_json(fp: str, data: dict):
-    os.makedirs(os.path.dirname(fp), exist_ok=True)
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def index_paper_related(pid: str, paper_id: str, meta: Dict[str, Any], save: bool = True):
+    fields = " ".join([str(meta.get("title", "")), str(meta.get("tags", "")), str(meta.get("summary", ""))])
+    try:
+        body = paper_text(pid, paper_id)
+    except Exception as e:
+        print("[Related text warning]", e)
+        body = ""
+    key = related_key(pid, paper_id)
+    with _related_lock:
+        RELATED_INDEX.upsert(key, term_vector(fields, body))
+        _related_versions[key] = _meta_version(pid, paper_id)
+    if save:
+        save_related_index()
+
+def remove_related(prefix: str):
+    with _related_lock:
+        RELATED_INDEX.remove_prefix(prefix)
+        for key in [k for k in _related_versions if k.startswith(prefix)]:
+            del _related_versions[key]
+
+def _sync_related_project(pid: str) -> bool:
+    """Re-index the project's papers whose meta.json changed; drop the ones that are gone."""
+    changed = False
+    present = set()
+    for paper_id in STORE.listdir(papers_prefix(pid)):
+        version = _meta_version(pid, paper_id)
+        if version is None:
+            continue
+        key = related_key(pid, paper_id)
+        present.add(key)
+        if key in RELATED_INDEX and _related_versions.get(key, version) == version:
+            _related_versions[key] = version  # rows indexed before versions were recorded
+            continue
+        meta = read_record(paper_meta_key(pid, paper_id), None)
+        if meta is not None:
+            index_paper_related(pid, paper_id, meta, save=False)
+            changed = True
+    for key in [k for k in RELATED_INDEX.keys if k.startswith(related_key(pid, "")) and k not in present]:
+        remove_related(key)
+        changed = True
+    return changed
+
+def sync_related_index():
+    """
+    Bring this node's index in line with the store. Locally every write goes through
+    this process (and updates the index as it happens), so a backfill at the first
+    query is enough. With a shared store other nodes write too: projects whose
+    generation token moved since the last sync are re-checked, on every query (one
+    read when nothing changed anywhere).
+    """
+    global _related_synced
+    with _related_lock:
+        if not STORE.shared:
+            if _related_synced:
+                return
+            pids = [p for p in STORE.listdir("") if not p.startswith(".")]
+            changed = any([_sync_related_project(pid) for pid in pids])
+        else:
+            everything = generation_token(ALL_PROJECTS)
+            if _related_synced and _related_gens.get(ALL_PROJECTS) == everything:
+                return
+            gens = {p: generation_token(p) for p in STORE.listdir("") if not p.startswith(".")}
+            changed = any([_sync_related_project(pid) for pid, gen in gens.items() if _related_gens.get(pid) != gen])
+            for pid in {k.split("/", 1)[0] for k in RELATED_INDEX.keys} - set(gens):
+                remove_related(related_key(pid, ""))  # project deleted on another node
+                changed = True
+            _related_gens.clear()
+            _related_gens.update(gens, **{ALL_PROJECTS: everything})
+        if changed:
+            save_related_index()
+        _related_synced = True
 
 # ---------------- FastAPI ----------------
 app = FastAPI(title="Neurocache API", version="0.1.0")
@@ -95,20 +226,222 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Range"],  # for scrubbers; FileResponse handles range
+    expose_headers=["Content-Range", "X-Profile-Id", "ETag"],  # for scrubbers; FileResponse handles range
 )
 
 
+# Identical summarize/podcast requests in flight share one execution
+FLIGHTS = SingleFlight()
+
+async def run_shared(request: Request, key, fn):
+    try:
+        return await FLIGHTS.do(key, profiled(fn), request.is_disconnected)
+    except (ClientDisconnected, JobCancelled):
+        # nobody is listening any more; the status only shows up in access logs
+        return Response(status_code=499)
+
+# Single-paper requests (interactive) are admitted before batch work (bulk), and
+# projects take turns within each class. Gemini jobs aren't preemptible, so this only
+# orders the queue; TTS_SCHED (below) can also pause bulk episodes.
+GEMINI_JOB_SLOTS = int(os.environ.get("GEMINI_JOB_SLOTS", "8"))
+GEMINI_SCHED = PriorityScheduler(GEMINI_JOB_SLOTS, name="summarize")
+
+# If Gemini hasn't answered a summarize request this many seconds after it got a
+# Gemini slot (time queued behind other jobs doesn't count), or fails, a local extractive summary (local_summary.py) is saved as a
+# provisional meta.json and returned; Gemini's result replaces it when it lands.
+# 0 turns the fallback off
+SUMMARIZE_HEDGE_SEC = float(os.environ.get("SUMMARIZE_HEDGE_SEC", "20"))
+
+# Stage and per-line progress of summarize/podcast/pipeline jobs, keyed by progress_key;
+# streamed by the .../tools/{job}/events endpoint
+PROGRESS = ProgressHub()
+
+def progress_key(job: str, pid: str, paper_id: str, mode: str = "auto") -> tuple:
+    # summarize and pipeline runs in different modes are separate flights, each with its own progress
+    return (job, pid, paper_id) if job == "podcast" else (job, pid, paper_id, mode)
+
+
+# ---------- Profiling ----------
+# ?profile=1 or "X-Profile: 1" on any route records a CPU + allocation profile of that
+# request under PROFILES_DIR; the response carries its id in X-Profile-Id. Only the
+# request's own threads are sampled: the event loop (async handlers), the threadpool
+# thread running a sync handler, and threads it starts through bind/profiled.
+CURRENT_PROFILE: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            # runs in a threadpool thread; profiled() is resolved per call, inside the request
+            endpoint = _profiled_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+def _profiled_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    def run(*args, **kwargs):
+        return profiled(endpoint)(*args, **kwargs)
+    return run
+
+app.router.route_class = ProfiledRoute
+
+def profile_requested(request: Request) -> bool:
+    flag = request.query_params.get("profile") or request.headers.get("x-profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    if not profile_requested(request):
+        return await call_next(request)
+    session = ProfileSession(PROFILES_DIR, f"{request.method} {request.url.path}")
+    token = CURRENT_PROFILE.set(session)
+    try:
+        with session:
+            response = await call_next(request)
+    finally:
+        CURRENT_PROFILE.reset(token)
+    response.headers["X-Profile-Id"] = session.id
+    return response
+
+
+# ---------- Conditional GET ----------
+# Listing endpoints answer If-None-Match from a per-project generation counter that every
+# write through this API bumps, so refreshing an unchanged project is a 304 without
+# touching the disk. The counters live in memory; BOOT_ID keeps ETags from a previous
+# run (or another server process) from ever matching. With a shared store, writes may
+# land on another API node, so the generation is a random token kept in the store
+# instead (one small read per conditional GET).
+BOOT_ID = uuid.uuid4().hex[:8]
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+ALL_PROJECTS = ""  # generation key of the project list itself
+
+def generation_key(pid: str) -> str:
+    return f".generations/{pid or 'all'}"
+
+def bump_generation(pid: str):
+    with _generations_lock:
+        for key in (pid, ALL_PROJECTS):
+            _generations[key] = _generations.get(key, 0) + 1
+    if STORE.shared:
+        for key in (pid, ALL_PROJECTS):
+            STORE.write_bytes(generation_key(key), uuid.uuid4().hex[:12].encode("ascii"))
+
+def generation_token(pid: str) -> str:
+    """The shared store's current generation token for pid ("0" before the first write)."""
+    try:
+        return STORE.read_bytes(generation_key(pid)).decode("ascii")
+    except FileNotFoundError:
+        return "0"
+
+def generation_tag(pid: str, *extra) -> str:
+    if STORE.shared:
+        return ".".join(["shared", pid or "all", generation_token(pid)] + [str(x) for x in extra])
+    with _generations_lock:
+        gen = _generations.get(pid, 0)
+    return ".".join([BOOT_ID, pid or "all", str(gen)] + [str(x) for x in extra])
+
+def etag_json(request: Request, tag: str, build) -> Response:
+    etag = f'W/"{tag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # cache, but revalidate every time
+    match = request.headers.get("if-none-match", "")
+    if etag in [t.strip() for t in match.split(",")] or match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(build(), headers=headers)
+
+def stored_date_added(pid: str, paper_id: str, paper: Optional[Dict[str, Any]] = None) -> str:
+    """When the paper was uploaded; falls back to when its metadata was written."""
+    if paper is None:
+        paper = read_record(paper_json_key(pid, paper_id), {})
+    created = paper.get("createdAt")
+    if created:
+        return created
+    st = STORE.stat(paper_meta_key(pid, paper_id))
+    return datetime.fromtimestamp(st.mtime).isoformat(timespec="seconds") if st else ""
+
+
+# ---------- Stored files ----------
+def serve_stored(request: Request, key: str, media_type: str, headers: Dict[str, str]) -> Response:
+    """
+    A PDF or episode from STORE, Range requests included: a local file directly, else a
+    redirect to a presigned URL (the bucket serves the bytes), else streamed through here.
+    """
+    if not STORE.shared:
+        return FileResponse(STORE.local_path(key), media_type=media_type, headers=headers)
+    if STORAGE_PRESIGN_SEC > 0:
+        url = STORE.presigned_url(key, STORAGE_PRESIGN_SEC, content_type=media_type,
+                                  disposition=headers.get("Content-Disposition", ""))
+        if url:
+            return RedirectResponse(url, status_code=307)
+    st = STORE.stat(key)
+    if st is None:
+        raise FileNotFoundError(key)
+    start, end, status = 0, st.size - 1, 200
+    m = re.match(r"bytes=(\d*)-(\d*)$", request.headers.get("range", "").strip())
+    if m and (m.group(1) or m.group(2)):
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), end) if m.group(2) else end
+        else:
+            start = max(0, st.size - int(m.group(2)))
+        if start > end:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{st.size}"})
+        status = 206
+    headers = dict(headers, **{"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1),
+                               "ETag": f'"{st.etag}"'})
+    if status == 206:
+        headers["Content-Range"] = f"bytes {start}-{end}/{st.size}"
+    return StreamingResponse(STORE.iter_range(key, start, end), status_code=status,
+                             media_type=media_type, headers=headers)
+
+
+# ---------- Paper scan ----------
+def scan_papers(pid: str, meta: bool = True) -> List[Dict[str, Any]]:
+    """
+    One listing of the project's papers/ tree, then each paper.json (and meta.json, if
+    `meta`) read once. Listings take the result, so several of them can share one scan.
+    [{"id", "files" (names in the paper folder), "paper", "meta" (None when absent)}]
+    """
+    files: Dict[str, List[str]] = {}
+    for rel in STORE.walk(papers_prefix(pid)):
+        paper_id, _, name = rel.partition("/")
+        if name and "/" not in name:
+            files.setdefault(paper_id, []).append(name)
+    return [{
+        "id": paper_id,
+        "files": names,
+        "paper": read_record(paper_json_key(pid, paper_id), None) if "paper.json" in names else None,
+        "meta": read_record(paper_meta_key(pid, paper_id), None) if meta and "meta.json" in names else None,
+    } for paper_id, names in files.items()]
+
+def metadata_row(pid: str, paper_id: str, data: Dict[str, Any], paper: Optional[Dict[str, Any]] = None):
+    # Normalize for frontend’s MetadataRow shape
+    return {
+        "paperId": paper_id,
+        "conference": data.get("conference", "Unknown"),
+        "year": int(data.get("year", datetime.now().year)),
+        "link": data.get("link", "Unknown"),
+        "domain": data.get("domain", "Unknown"),
+        "title": data.get("title", "Unknown Title"),
+        "summary": data.get("summary", ""),
+        "tags": data.get("tags", ""),
+        "date_added": stored_date_added(pid, paper_id, paper),
+        "ready_to_publish": bool(data.get("ready_to_publish", False)),
+        "script_lines": len(data.get("script", [])) if isinstance(data.get("script", []), list) else 0,
+        "provisional": bool(data.get("provisional", False)),
+    }
+
+
 # ---------- Projects ----------
 @app.get("/api/projects")
-def list_projects():
+def list_projects(request: Request):
+    return etag_json(request, generation_tag(ALL_PROJECTS), _list_projects)
+
+def _list_projects():
     out = []
     # Don't use list_project_ids() here. It only returns projects that have meta.json (legacy).
-    for pid in os.listdir(PROJECTS_DIR):
-        pdir = os.path.join(PROJECTS_DIR, pid)
-        pj = project_json_path(pid)  # projects/{pid}/project.json
-        if os.path.isdir(pdir) and os.path.exists(pj):
-            out.append(read_json(pj, {}))
+    for pid in STORE.listdir(""):
+        pj = read_record(project_key(pid), None)  # projects/{pid}/project.json
+        if pj is not None:
+            out.append(pj)
     # newest first
     out.sort(key=lambda x: x.get("updatedAt", x.get("createdAt", "")), reverse=True)
     return out
@@ -117,13 +450,17 @@ def list_projects():
 
 @app.delete("/api/projects/{pid}")
 def delete_project(pid: str):
-    pdir = os.path.join(PROJECTS_DIR, pid)
-    if not os.path.isdir(pdir) or not os.path.exists(project_json_path(pid)):
+    if not STORE.exists(project_key(pid)):
         raise HTTPException(404, "project not found")
     try:
-        rmtree(pdir)
+        STORE.delete_prefix(f"{pid}/")
+        rmtree(os.path.join(STORE.local_root, pid), ignore_errors=True)  # work files
     except Exception as e:
         raise HTTPException(500, f"failed to delete project: {e}")
+    remove_related(related_key(pid, ""))
+    save_related_index()
+    ARTIFACTS.drop_refs(f"{pid}/")
+    bump_generation(pid)
     return {"status": "deleted", "id": pid}
 
 
@@ -134,7 +471,6 @@ def create_project(payload: Dict[str, Any]):
         raise HTTPException(400, "name is required")
     desc = payload.get("description", "")
     pid = str(uuid.uuid4())
-    ensure_project_dir(pid)
     pj = {
         "id": pid,
         "name": name,
@@ -143,79 +479,80 @@ def create_project(payload: Dict[str, Any]):
         "createdAt": now_iso(),
         "updatedAt": now_iso(),
     }
-    write_json(project_json_path(pid), pj)
+    write_record(project_key(pid), pj)
+    bump_generation(pid)
     return pj
 
 @app.get("/api/projects/{pid}")
 def get_project(pid: str):
-    pj = project_json_path(pid)
-    if not os.path.exists(pj):
+    pj = read_record(project_key(pid), None)
+    if pj is None:
         raise HTTPException(404, "project not found")
-    return read_json(pj, {})
+    return pj
 
 # ---------- Papers ----------
 @app.post("/api/projects/{pid}/papers/upload")
 def upload_paper(pid: str, file: UploadFile = File(...)):
-    if not os.path.exists(project_json_path(pid)):
+    if not STORE.exists(project_key(pid)):
         raise HTTPException(404, "project not found")
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF files are accepted")
 
     paper_id = str(uuid.uuid4())
-    pdir = paper_dir(pid, paper_id)
-    dest = os.path.join(pdir, safe_stem(file.filename) + ".pdf")
-
-    with open(dest, "wb") as out:
-        shutil.copyfileobj(file.file, out)
+    fname = safe_stem(file.filename) + ".pdf"
+    dest = paper_key(pid, paper_id, fname)
+    STORE.write_stream(dest, file.file)  # streamed; multipart upload on S3
 
     meta = {
         "id": paper_id,
         "projectId": pid,
-        "filename": os.path.basename(dest),
+        "filename": fname,
         "originalName": file.filename,
-        "size": os.path.getsize(dest),
+        "size": STORE.stat(dest).size,
         "mime": "application/pdf",
         "createdAt": now_iso(),
         "updatedAt": now_iso(),
     }
-    write_json(paper_json_path(pid, paper_id), meta)
+    write_record(paper_json_key(pid, paper_id), meta)
 
     # touch project updatedAt
-    pj = read_json(project_json_path(pid), {})
+    pj = read_record(project_key(pid), {})
     pj["updatedAt"] = now_iso()
-    write_json(project_json_path(pid), pj)
+    write_record(project_key(pid), pj)
+    bump_generation(pid)
     return meta
 
 @app.get("/api/projects/{pid}/papers")
-def list_papers(pid: str):
-    if not os.path.exists(project_json_path(pid)):
+def list_papers(request: Request, pid: str):
+    if not STORE.exists(project_key(pid)):
         raise HTTPException(404, "project not found")
-    out = []
-    pdir = papers_dir(pid)
-    for paper_id in os.listdir(pdir):
-        pj = paper_json_path(pid, paper_id)
-        if os.path.exists(pj):
-            out.append(read_json(pj, {}))
+    return etag_json(request, generation_tag(pid), lambda: _list_papers(pid))
+
+def _list_papers(pid: str, papers: Optional[List[Dict[str, Any]]] = None):
+    if papers is None:
+        papers = scan_papers(pid, meta=False)
+    out = [p["paper"] for p in papers if p["paper"] is not None]
     out.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
     return out
 
 @app.get("/api/projects/{pid}/papers/{paper_id}")
 def get_paper(pid: str, paper_id: str):
-    pj = paper_json_path(pid, paper_id)
-    if not os.path.exists(pj):
+    pj = read_record(paper_json_key(pid, paper_id), None)
+    if pj is None:
         raise HTTPException(404, "paper not found")
-    return read_json(pj, {})
+    return pj
 
 @app.get("/api/projects/{pid}/papers/{paper_id}/file")
-def get_paper_file(pid: str, paper_id: str):
-    pdf = paper_pdf_path(pid, paper_id)
-    if not os.path.exists(pdf):
+def get_paper_file(request: Request, pid: str, paper_id: str):
+    pdf = paper_pdf_key(pid, paper_id)
+    try:
+        return serve_stored(
+            request, pdf,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'inline; filename="{pdf.rsplit("/", 1)[-1]}"'}
+        )
+    except FileNotFoundError:
         raise HTTPException(404, f"pdf not found at {pdf}")
-    return FileResponse(
-        pdf,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'inline; filename="{os.path.basename(pdf)}"'}
-    )
 
 
 # ---------- Tools: Summarize (Gemini) ----------
@@ -224,12 +561,18 @@ def summarize_batch(pid: str, body: Dict[str, Any] = Body(...)):
     paper_ids: List[str] = body.get("paperIds", [])
     if not paper_ids:
         raise HTTPException(400, "paperIds required")
+    mode = body.get("mode", "auto")
     results = []
     for paper_id in paper_ids:
         try:
-            # reuse single summarize
-            _ = summarize_paper(pid, paper_id)  # will raise if fails
+            # reuse single summarize; shares the call if the same paper is already running.
+            # Not hedged: bulk work waits behind interactive work by design
+            _ = FLIGHTS.do_sync(("summarize", pid, paper_id, mode),
+                                lambda cancel: gemini_summarize_paper(pid, paper_id, mode=mode, cancel=cancel,
+                                                                      priority=BULK))
             results.append({"paperId": paper_id, "status": "done"})
+        except JobCancelled as e:
+            results.append({"paperId": paper_id, "status": "cancelled", "detail": str(e)})
         except HTTPException as e:
             results.append({"paperId": paper_id, "status": "error", "detail": e.detail})
         except Exception as e:
@@ -241,10 +584,24 @@ def podcast_batch(pid: str, body: Dict[str, Any] = Body(...)):
     paper_ids: List[str] = body.get("paperIds", [])
     if not paper_ids:
         raise HTTPException(400, "paperIds required")
+    # Start every episode first so they synthesize in parallel on the pool
+    flights = {}
+    for paper_id in paper_ids:
+        try:
+            key, fn = podcast_flight(pid, paper_id, profile=CURRENT_PROFILE.get(), priority=BULK)
+            flights[paper_id] = FLIGHTS.join(key, fn)
+        except HTTPException as e:
+            flights[paper_id] = e
     results = []
     for paper_id in paper_ids:
+        flight = flights[paper_id]
         try:
-            _ = podcast_paper(pid, paper_id)  # reuses single path
+            if isinstance(flight, HTTPException):
+                raise flight
+            try:
+                _ = flight.future.result()
+            finally:
+                FLIGHTS.leave(flight)
             results.append({"paperId": paper_id, "status": "done"})
         except HTTPException as e:
             results.append({"paperId": paper_id, "status": "error", "detail": e.detail})
@@ -253,18 +610,17 @@ def podcast_batch(pid: str, body: Dict[str, Any] = Body(...)):
     return {"results": results}
 
 @app.get("/api/projects/{pid}/summaries")
-def list_project_summaries(pid: str):
+def list_project_summaries(request: Request, pid: str):
     """Return papers in this project that have per-paper meta.json"""
-    if not os.path.exists(project_json_path(pid)):
+    if not STORE.exists(project_key(pid)):
         raise HTTPException(404, "project not found")
+    return etag_json(request, generation_tag(pid), lambda: _list_project_summaries(pid))
+
+def _list_project_summaries(pid: str, papers: Optional[List[Dict[str, Any]]] = None):
     out = []
-    base = papers_dir(pid)
-    for paper_id in os.listdir(base):
-        mp = paper_meta_path(pid, paper_id)
-        pj = paper_json_path(pid, paper_id)
-        if os.path.exists(mp) and os.path.exists(pj):
-            meta = read_json(mp, {})
-            paper = read_json(pj, {})
+    for p in scan_papers(pid) if papers is None else papers:
+        paper_id, meta, paper = p["id"], p["meta"], p["paper"]
+        if meta is not None and paper is not None:
             out.append({
                 "paperId": paper_id,
                 "title": meta.get("title", paper.get("originalName", "Untitled")),
@@ -280,193 +636,636 @@ def list_project_summaries(pid: str):
     return out
 
 @app.get("/api/projects/{pid}/podcasts")
-def list_project_podcasts(pid: str):
+def list_project_podcasts(request: Request, pid: str):
     """
     Return podcast rows for this project. We include:
       1) MP3s inside each paper folder (preferred)
-      2) Any MP3s found in generated_podcasts/ (fallback)
+      2) This project's assets in AUDIO_REGISTRY, i.e. the generated_podcasts/ MP3s
+         it owns by reference or by paper id (see audio_owner)
     so the UI always has a playable URL.
     """
-    if not os.path.exists(project_json_path(pid)):
+    if not STORE.exists(project_key(pid)):
         raise HTTPException(404, "project not found")
+    # generated_podcasts/ changes outside this API too; the registry counts those changes
+    tag = generation_tag(pid, AUDIO_REGISTRY.version)
+    return etag_json(request, tag, lambda: _list_project_podcasts(pid))
 
+def _list_project_podcasts(pid: str, papers: Optional[List[Dict[str, Any]]] = None):
     out = []
 
     # 1) Per-paper mp3s
-    base = papers_dir(pid)
-    if os.path.isdir(base):
-        for paper_id in os.listdir(base):
-            pdir = paper_dir(pid, paper_id)
-            if not os.path.isdir(pdir):
-                continue
-            mp3s = sorted(
-                [fn for fn in os.listdir(pdir) if fn.lower().endswith(".mp3")],
-                reverse=True
-            )
-            if mp3s:
-                # Title
-                title = None
-                mp = paper_meta_path(pid, paper_id)
-                pj = paper_json_path(pid, paper_id)
-                if os.path.exists(mp):
-                    title = read_json(mp, {}).get("title")
-                if not title and os.path.exists(pj):
-                    title = read_json(pj, {}).get("originalName")
-                out.append({
-                    "paperId": paper_id,
-                    "title": title or mp3s[0],
-                    "mp3Url": f"/api/projects/{pid}/papers/{paper_id}/podcasts/{mp3s[0]}",
-                    "pdfUrl": f"/api/projects/{pid}/papers/{paper_id}/file",
-                })
-
-    # 2) Fallback: anything under generated_podcasts/
-    try:
-        gen = [fn for fn in os.listdir(GENERATED_FOLDER) if fn.lower().endswith(".mp3")]
-    except FileNotFoundError:
-        gen = []
+    for p in scan_papers(pid) if papers is None else papers:
+        paper_id = p["id"]
+        mp3s = sorted([fn for fn in p["files"] if fn.lower().endswith(".mp3")], reverse=True)
+        if mp3s:
+            # Title
+            title = (p["meta"] or {}).get("title") or (p["paper"] or {}).get("originalName")
+            out.append({
+                "paperId": paper_id,
+                "title": title or mp3s[0],
+                "mp3Url": f"/api/projects/{pid}/papers/{paper_id}/podcasts/{mp3s[0]}",
+                "pdfUrl": f"/api/projects/{pid}/papers/{paper_id}/file",
+            })
 
-    # Include these too so you can always play what you see in Explorer
-    for fn in sorted(gen, reverse=True):
+    # 2) Fallback: this project's episodes that only exist under generated_podcasts/
+    for asset in sorted(AUDIO_REGISTRY.for_project(pid), key=lambda a: a["name"], reverse=True):
+        paper_id = asset["paperId"] or "unknown"
         out.append({
-            "paperId": "unknown",
-            "title": fn,
-            "mp3Url": f"/api/podcasts/global/{fn}",
-            "pdfUrl": "",
+            "paperId": paper_id,
+            "title": asset["name"],
+            "mp3Url": f"/api/podcasts/global/{asset['name']}",
+            "pdfUrl": f"/api/projects/{pid}/papers/{paper_id}/file" if asset["paperId"] else "",
         })
 
     return out
 
 
+SUMMARIZE_MODES = ("auto", "text", "pages", "upload", "long")
+
 @app.post("/api/projects/{pid}/papers/{paper_id}/tools/summarize")
-def summarize_paper(pid: str, paper_id: str):
-    pdf = paper_pdf_path(pid, paper_id)
-    if not os.path.exists(pdf):
+async def summarize_paper_endpoint(request: Request, pid: str, paper_id: str, mode: str = "auto"):
+    if mode not in SUMMARIZE_MODES:
+        raise HTTPException(400, "mode must be one of " + ", ".join(SUMMARIZE_MODES))
+    key = ("summarize", pid, paper_id, mode)
+    GEMINI_SCHED.promote(key)  # a batch may have queued this paper already; someone is waiting now
+    prof = CURRENT_PROFILE.get()
+    if prof is not None:
+        key += (prof.id,)  # a profiled request gets a run of its own
+    return await run_shared(request, key,
+                            lambda cancel: summarize_paper(pid, paper_id, mode=mode, cancel=cancel))
+
+# Gemini summaries still running after their request got a provisional answer,
+# with the event set once each was admitted to GEMINI_SCHED
+_GEMINI_SUMMARIES: Dict[tuple, Tuple[Future, threading.Event]] = {}
+_GEMINI_SUMMARIES_LOCK = threading.Lock()
+# provisional meta.json is only written where no Gemini one is, checked under this lock
+_META_LOCK = threading.RLock()
+
+def _in_thread(fn, *args) -> Future:
+    # a thread each, not a pool: these wait in GEMINI_SCHED like flights do (see singleflight.py)
+    fut: Future = Future()
+    fut.set_running_or_notify_cancel()
+
+    def run():
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+    threading.Thread(target=bind(run), name="summarize-hedge", daemon=True).start()
+    return fut
+
+def summarize_paper(pid: str, paper_id: str, mode: str = "auto", cancel: threading.Event = None,
+                    priority: str = INTERACTIVE):
+    """
+    gemini_summarize_paper, hedged: SUMMARIZE_HEDGE_SEC after it gets a Gemini slot,
+    or on a Gemini error, returns a provisional local summary instead (status "provisional", or "pending"
+    when the paper already has a Gemini summary, which is kept) and lets Gemini finish
+    in the background. The paper text is read alongside, so the fallback is ready in time.
+    """
+    if SUMMARIZE_HEDGE_SEC <= 0:
+        return gemini_summarize_paper(pid, paper_id, mode, cancel, priority)
+    key = ("summarize", pid, paper_id, mode)
+    with _GEMINI_SUMMARIES_LOCK:
+        running = _GEMINI_SUMMARIES.get(key)
+        if running is None:
+            admitted = threading.Event()
+            job = _in_thread(gemini_summarize_paper, pid, paper_id, mode, cancel, priority, admitted)
+            running = _GEMINI_SUMMARIES[key] = (job, admitted)
+            job.add_done_callback(lambda _: _GEMINI_SUMMARIES.pop(key, None))
+    job, admitted = running
+    text = _in_thread(paper_text, pid, paper_id)  # cached text.txt after the first time
+    error: Optional[HTTPException] = None
+    while not admitted.wait(0.25) and not job.done():
+        pass
+    try:
+        return job.result(timeout=SUMMARIZE_HEDGE_SEC)
+    except FutureTimeoutError:
+        reason = f"Gemini has not answered after {SUMMARIZE_HEDGE_SEC:g}s"
+    except HTTPException as e:
+        if e.status_code < 429:
+            raise  # bad mode, missing PDF: nothing a local summary fixes
+        error, reason = e, e.detail
+    return provisional_summary(pid, paper_id, reason, text, error)
+
+def provisional_summary(pid: str, paper_id: str, reason: str, text: Future,
+                        error: Optional[HTTPException] = None) -> Dict[str, Any]:
+    current = read_record(paper_meta_key(pid, paper_id), None)
+    if current is not None and not current.get("provisional"):
+        if error is not None:
+            raise error  # a failed re-summarize: the earlier Gemini summary stays as it is
+        return {"status": "pending", "metadata": current, "detail": reason}
+    with span("summarize.local", project=pid, paper=paper_id, reason=reason) as sp:
+        t0 = time.time()
+        try:
+            body = text.result()
+        except Exception as e:
+            print("[Local summary warning]", e)
+            body = ""
+        if not body.strip():
+            if error is not None:
+                raise error
+            return {"status": "pending", "metadata": current, "detail": reason}
+        data = local_metadata(body)
+        data["provisional"] = True
+        data["extraction"] = {"mode": "local", "reason": reason, "latency_sec": round(time.time() - t0, 3),
+                              "chars": len(body)}
+        sp.set(latency_sec=data["extraction"]["latency_sec"])
+    with _META_LOCK:
+        current = read_record(paper_meta_key(pid, paper_id), None)
+        if current is not None and not current.get("provisional"):
+            # Gemini landed while this was being written
+            return {"status": "done", "metadata": current}
+        save_metadata(pid, paper_id, data)
+    return {"status": "provisional", "metadata": data, "detail": reason, "pending": error is None}
+
+def gemini_summarize_paper(pid: str, paper_id: str, mode: str = "auto", cancel: threading.Event = None,
+                           priority: str = INTERACTIVE, admitted: threading.Event = None):
+    with span("summarize_paper", project=pid, paper=paper_id, mode=mode, priority=priority) as sp, \
+            PROGRESS.track(progress_key("summarize", pid, paper_id, mode), "summarize") as progress:
+        progress.stage("queued", priority=priority)
+        with GEMINI_SCHED.slot(priority, pid, key=("summarize", pid, paper_id, mode), cancel=cancel) as ticket:
+            sp.set(queued_sec=round(ticket.wait_sec, 3))
+            if admitted is not None:
+                admitted.set()
+            return _summarize_paper(pid, paper_id, mode, cancel, progress)
+
+def _summarize_paper(pid: str, paper_id: str, mode: str, cancel: threading.Event, progress=None):
+    if mode not in SUMMARIZE_MODES:
+        raise HTTPException(400, "mode must be one of " + ", ".join(SUMMARIZE_MODES))
+    data = extract_paper(pid, paper_id, mode, cancel, progress)
+    with _META_LOCK:
+        # every client left while Gemini ran: a newer run may have saved since, keep that one
+        check_cancel(cancel)
+        save_metadata(pid, paper_id, data)
+    return {"status": "done", "metadata": data}
+
+def paper_pdf_path(pid: str, paper_id: str) -> str:
+    try:
+        return STORE.local_path(paper_pdf_key(pid, paper_id))  # downloaded once per node on S3
+    except FileNotFoundError:
         raise HTTPException(404, "pdf not found")
+
+def extract_paper(pid: str, paper_id: str, mode: str, cancel: threading.Event, progress=None,
+                  on_script_line=None) -> Dict[str, Any]:
+    """gemini_extract_metadata_and_script on the paper's PDF, with errors mapped to HTTP."""
+    pdf = paper_pdf_path(pid, paper_id)
     try:
-        data = gemini_extract_metadata_and_script(pdf)
+        return gemini_extract_metadata_and_script(pdf, mode=mode, cancel=cancel, progress=progress,
+                                                  on_script_line=on_script_line)
+    except JobCancelled:
+        raise
+    except RateLimitExhausted as e:
+        raise HTTPException(429, f"Gemini quota exhausted, try again later: {e}", headers={"Retry-After": "60"})
     except Exception as e:
         raise HTTPException(500, f"Gemini failed: {e}")
 
+def save_metadata(pid: str, paper_id: str, data: Dict[str, Any]):
     # Persist per-paper meta.json for table view
-    write_json(paper_meta_path(pid, paper_id), data)
+    with _META_LOCK:
+        write_record(paper_meta_key(pid, paper_id), data)
+    bump_generation(pid)
+    try:
+        with span("related.index"):
+            index_paper_related(pid, paper_id, data)
+    except Exception as e:
+        print("[Related index warning]", e)
 
     # Also reflect core fields into top-level project index (optional)
     # (You already have project-level meta in your Gradio flow.)
-    return {"status": "done", "metadata": data}
 
 @app.get("/api/projects/{pid}/papers/{paper_id}/metadata")
-def get_paper_metadata(pid: str, paper_id: str):
-    mp = paper_meta_path(pid, paper_id)
-    if not os.path.exists(mp):
+def get_paper_metadata(request: Request, pid: str, paper_id: str):
+    if not STORE.exists(paper_meta_key(pid, paper_id)):
         raise HTTPException(404, "metadata not found; run summarize")
-    data = read_json(mp, {})
-    # Normalize for frontend’s MetadataRow shape
-    row = {
-        "paperId": paper_id,
-        "conference": data.get("conference", "Unknown"),
-        "year": int(data.get("year", datetime.now().year)),
-        "link": data.get("link", "Unknown"),
-        "domain": data.get("domain", "Unknown"),
-        "title": data.get("title", "Unknown Title"),
-        "summary": data.get("summary", ""),
-        "tags": data.get("tags", ""),
-        "date_added": now_iso(),
-        "ready_to_publish": bool(data.get("ready_to_publish", False)),
-        "script_lines": len(data.get("script", [])) if isinstance(data.get("script", []), list) else 0,
-    }
-    return row
+    return etag_json(request, generation_tag(pid, paper_id), lambda: _paper_metadata_row(pid, paper_id))
+
+def _paper_metadata_row(pid: str, paper_id: str):
+    return metadata_row(pid, paper_id, read_record(paper_meta_key(pid, paper_id), {}))
+
+@app.get("/api/projects/{pid}/papers/{paper_id}/related")
+def related_papers(pid: str, paper_id: str, k: int = 5, sameProject: bool = False):
+    """Top-k papers across the corpus by TF-IDF cosine similarity."""
+    meta = read_record(paper_meta_key(pid, paper_id), None)
+    if meta is None:
+        raise HTTPException(404, "metadata not found; run summarize")
+    sync_related_index()
+    key = related_key(pid, paper_id)
+    if key not in RELATED_INDEX:
+        index_paper_related(pid, paper_id, meta)
+    prefix = related_key(pid, "") if sameProject else None
+    out = []
+    for other, score in RELATED_INDEX.most_similar(key, k=k, prefix=prefix):
+        opid, opaper = other.split("/", 1)
+        meta = read_record(paper_meta_key(opid, opaper), {})
+        out.append({
+            "projectId": opid,
+            "paperId": opaper,
+            "title": meta.get("title", "Unknown Title"),
+            "tags": meta.get("tags", ""),
+            "score": round(score, 4),
+            "pdfUrl": f"/api/projects/{opid}/papers/{opaper}/file",
+        })
+    return out
 
 # ---------- Tools: Podcast (Kokoro) ----------
-@app.post("/api/projects/{pid}/papers/{paper_id}/tools/podcast")
-def podcast_paper(pid: str, paper_id: str):
-    mp = paper_meta_path(pid, paper_id)
-    if not os.path.exists(mp):
+# defaults; adjust as you like
+PODCAST_MODEL_PATH = "./models/kokoro-v1.0.onnx"
+PODCAST_VOICE_CONFIG = "voices-v1.0.bin"
+PODCAST_MALE_VOICE = "am_adam"
+PODCAST_FEMALE_VOICE = "af_heart"
+# fixed seed: regenerating an unchanged script returns the cached episode (see app.episode_key)
+PODCAST_SEED = int(os.environ.get("PODCAST_SEED", "0"))
+
+# Synthesis runs in worker processes (see tts_pool.py) so the API stays responsive.
+# TTS_SCHED admits at most TTS_WORKERS episodes at once; the reserve processes only
+# run interactive episodes while a bulk episode is paused for them.
+TTS_POOL = TTSPool(
+    workers=TTS_WORKERS + TTS_INTERACTIVE_RESERVE if TTS_WORKERS > 0 else 0,
+    preload=(PODCAST_MODEL_PATH, PODCAST_VOICE_CONFIG),
+    gestures=(DEFAULT_GESTURE_PHRASES, [PODCAST_MALE_VOICE, PODCAST_FEMALE_VOICE]),
+)
+TTS_SCHED = PriorityScheduler(max(1, TTS_WORKERS), borrow=TTS_INTERACTIVE_RESERVE, name="podcast")
+
+@app.on_event("shutdown")
+def _shutdown_tts_pool():
+    TTS_POOL.shutdown()
+
+def file_sha256(fp: str) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def migrate_dedupe_podcasts() -> List[str]:
+    """
+    Older versions generated into generated_podcasts/ and then copied into the
+    paper folder. Remove generated_podcasts/ MP3s that are byte-identical to a
+    per-paper copy (size first, hash only on a size match).
+    """
+    by_size: Dict[int, List[str]] = {}
+    for pid in os.listdir(PROJECTS_DIR):
+        base = os.path.join(PROJECTS_DIR, pid, "papers")
+        if not os.path.isdir(base):
+            continue
+        for paper_id in os.listdir(base):
+            pdir = os.path.join(base, paper_id)
+            if not os.path.isdir(pdir):
+                continue
+            for fn in os.listdir(pdir):
+                if fn.lower().endswith(".mp3"):
+                    fp = os.path.join(pdir, fn)
+                    by_size.setdefault(os.path.getsize(fp), []).append(fp)
+
+    removed = []
+    hashes: Dict[str, str] = {}
+    for fn in os.listdir(GENERATED_FOLDER):
+        gp = os.path.join(GENERATED_FOLDER, fn)
+        if not (fn.lower().endswith(".mp3") and os.path.isfile(gp)):
+            continue
+        candidates = by_size.get(os.path.getsize(gp), [])
+        if not candidates:
+            continue
+        digest = file_sha256(gp)
+        for cp in candidates:
+            if cp not in hashes:
+                hashes[cp] = file_sha256(cp)
+            if hashes[cp] == digest:
+                os.remove(gp)
+                removed.append(fn)
+                break
+    return removed
+
+def sync_artifact_refs() -> int:
+    """
+    Legacy episodes named "{project}_{paper_id}.mp3" that only exist in
+    generated_podcasts/ are still that paper's podcast: pin them against eviction.
+    """
+    papers = {}
+    for pid in STORE.listdir(""):
+        for paper_id in STORE.listdir(papers_prefix(pid)):
+            papers[paper_id] = pid
+    pinned = 0
+    for fn in os.listdir(GENERATED_FOLDER):
+        stem, ext = os.path.splitext(fn)
+        paper_id = stem[-36:]
+        if ext.lower() == ".mp3" and paper_id in papers:
+            pid = papers[paper_id]
+            if not STORE.exists(paper_key(pid, paper_id, fn)):
+                ARTIFACTS.add_ref(fn, f"{pid}/{paper_id}")
+                pinned += 1
+    return pinned
+
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+def audio_owner(name: str):
+    """(project, paper) owning a generated_podcasts/ file: explicit ref, else the name's paper id."""
+    refs = ARTIFACTS.refs(name)
+    if refs:
+        pid, _, paper_id = refs[0].partition("/")
+        return pid, paper_id
+    paper_id = os.path.splitext(name)[0][-36:]
+    if _UUID_RE.fullmatch(paper_id):
+        for pid in STORE.listdir(""):
+            if STORE.exists(paper_json_key(pid, paper_id)):
+                return pid, paper_id
+    return None
+
+# name/lowercase/owner index over generated_podcasts/, kept fresh by a directory watcher
+AUDIO_REGISTRY = AudioRegistry(GENERATED_FOLDER, audio_owner)
+ARTIFACTS.listeners.append(AUDIO_REGISTRY.on_change)
+
+@app.on_event("startup")
+def _migrate_podcast_copies():
+    try:
+        removed = migrate_dedupe_podcasts()
+        if removed:
+            print(f"[Podcast dedupe] removed {len(removed)} duplicate(s) from {GENERATED_FOLDER}/")
+        sync_artifact_refs()
+        ARTIFACTS.evict()
+    except Exception as e:
+        print("[Artifact startup warning]", e)
+    AUDIO_REGISTRY.start()
+
+@app.on_event("shutdown")
+def _stop_audio_registry():
+    AUDIO_REGISTRY.stop()
+
+def podcast_job_kwargs(pid: str, paper_id: str) -> Dict[str, Any]:
+    """Validate the paper's script and build process_script kwargs for it."""
+    data = read_record(paper_meta_key(pid, paper_id), None)
+    if data is None:
         raise HTTPException(400, "No metadata/script. Run summarize first.")
-    data = read_json(mp, {})
     script_lines = data.get("script", [])
     if not script_lines or not isinstance(script_lines, list):
         raise HTTPException(400, "No script in metadata")
 
-    script_text = "\n".join(script_lines)
+    return podcast_kwargs(pid, paper_id, "\n".join(script_lines))
 
-    # defaults; adjust as you like
-    model_path = "./models/kokoro-v1.0.onnx"
-    voice_config = "voices-v1.0.bin"
-    male_voice = "am_adam"
-    female_voice = "af_heart"
-
-    project_name = read_json(project_json_path(pid), {}).get("name", pid)
+def podcast_kwargs(pid: str, paper_id: str, script_text: str) -> Dict[str, Any]:
+    project_name = read_record(project_key(pid), {}).get("name", pid)
     file_base = f"{safe_stem(project_name)}_{paper_id}.mp3"
 
-    audio_path, file_path, md = process_script(
+    return dict(
         script_text=script_text,
         output_file=file_base,
-        model_path=model_path,
-        voice_config_path=voice_config,
-        male_voice=male_voice,
-        female_voice=female_voice,
+        output_path=os.path.join(paper_dir(pid, paper_id), file_base),
+        model_path=PODCAST_MODEL_PATH,
+        voice_config_path=PODCAST_VOICE_CONFIG,
+        male_voice=PODCAST_MALE_VOICE,
+        female_voice=PODCAST_FEMALE_VOICE,
         random_pause_enabled=True,
         pause_min_sec=0.2,
         pause_max_sec=0.4,
         enable_gestures=False,
         gesture_prob=0.2,
-        gesture_phrases_csv="yeah, uh-huh, right, ok",
+        gesture_phrases_csv=DEFAULT_GESTURE_PHRASES,
         enable_bg_music=False,
         bg_choice_name=None,
         bg_map={},
         bg_reduction_db=20,
         add_bg_end=False,
         bg_end_duration_sec=3,
-        kokoro=None,
-        progress=None,
+        seed=PODCAST_SEED,
     )
 
+def finish_podcast(pid: str, paper_id: str, result) -> Dict[str, Any]:
+    audio_path, file_path, md = result
+
     if not file_path or not os.path.exists(file_path):
         raise HTTPException(500, "podcast generation failed")
 
-    # Try to copy into paper folder for per-paper serving; fall back to global serving
-    paper_out = os.path.join(paper_dir(pid, paper_id), os.path.basename(file_path))
-    mp3_url = None
-    try:
-        shutil.copy2(file_path, paper_out)
-        mp3_url = f"/api/projects/{pid}/papers/{paper_id}/podcasts/{os.path.basename(file_path)}"
-    except Exception:
-        # fallback: serve directly from generated_podcasts
-        mp3_url = f"/api/podcasts/global/{os.path.basename(file_path)}"
+    # process_script wrote into the paper's work folder: already in place locally,
+    # uploaded on a shared store
+    name = os.path.basename(file_path)
+    if os.path.dirname(os.path.abspath(file_path)) == os.path.abspath(paper_dir(pid, paper_id)):
+        STORE.put_file(paper_key(pid, paper_id, name), file_path)
+        mp3_url = f"/api/projects/{pid}/papers/{paper_id}/podcasts/{name}"
+    else:
+        mp3_url = f"/api/podcasts/global/{name}"
+    bump_generation(pid)
 
     return {"status": "done", "mp3Url": mp3_url, "message": md}
 
+def podcast_flight(pid: str, paper_id: str, profile: Optional[ProfileSession] = None,
+                   priority: str = INTERACTIVE):
+    """(single-flight key, job) for one episode; the key covers every synthesis parameter."""
+    kwargs = podcast_job_kwargs(pid, paper_id)
+    if profile is not None:
+        # the worker process profiles itself into the same profile directory
+        kwargs["profile"] = (profile.root, profile.id)
+    digest = hashlib.sha1(json.dumps(kwargs, sort_keys=True).encode("utf-8")).hexdigest()
+    key = ("podcast", pid, paper_id, digest)
+    return key, lambda cancel: podcast_paper(pid, paper_id, kwargs, cancel, priority=priority, sched_key=key)
+
+@app.post("/api/projects/{pid}/papers/{paper_id}/tools/podcast")
+async def podcast_paper_endpoint(request: Request, pid: str, paper_id: str):
+    key, fn = podcast_flight(pid, paper_id, profile=CURRENT_PROFILE.get())
+    TTS_SCHED.promote(key)  # a batch may have queued this episode already; someone is waiting now
+    return await run_shared(request, key, fn)
+
+def podcast_paper(pid: str, paper_id: str, kwargs: Dict[str, Any] = None, cancel: threading.Event = None,
+                  priority: str = INTERACTIVE, sched_key=None):
+    with span("podcast_paper", project=pid, paper=paper_id, tts_workers=TTS_POOL.workers, priority=priority) as sp, \
+            PROGRESS.track(progress_key("podcast", pid, paper_id), "podcast") as progress:
+        if kwargs is None:
+            kwargs = podcast_job_kwargs(pid, paper_id)
+        lines = kwargs["script_text"].count("\n") + 1
+        sp.set(script_lines=lines)
+        kwargs = dict(kwargs, trace_parent=sp.traceparent())
+        progress.stage("queued", priority=priority, script_lines=lines)
+        with TTS_SCHED.slot(priority, pid, key=sched_key, cancel=cancel) as ticket:
+            sp.set(queued_sec=round(ticket.wait_sec, 3))
+            # ticket.paused is set while an interactive episode borrows this one's slot
+            result = TTS_POOL.run(kwargs, cancel=cancel, pause=ticket.paused, progress=progress)
+        progress.stage("saving", "Saving episode")
+        return finish_podcast(pid, paper_id, result)
+
+@app.get("/api/projects/{pid}/papers/{paper_id}/tools/{job}/events")
+async def job_events(request: Request, pid: str, paper_id: str, job: str, mode: str = "auto"):
+    """
+    Server-Sent Events for the paper's summarize, podcast or pipeline job: queued,
+    running (with frac, desc and eta_sec; a pipeline also sends summarizing), saving,
+    then done / error / cancelled, after which the
+    stream ends. Open it before POSTing the job; an active job's current state is sent
+    first, so connecting mid-run works too. `mode` picks which summarize/pipeline run
+    to follow (the same mode as the POST); podcasts ignore it.
+    """
+    if job not in ("summarize", "podcast", "pipeline"):
+        raise HTTPException(404, "job must be summarize, podcast or pipeline")
+    if mode not in SUMMARIZE_MODES:
+        raise HTTPException(400, "mode must be one of " + ", ".join(SUMMARIZE_MODES))
+
+    async def gen():
+        async for event in PROGRESS.subscribe(progress_key(job, pid, paper_id, mode)):
+            if await request.is_disconnected():
+                return
+            yield sse_format(event)
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ---------- Tools: Pipeline (summarize + podcast) ----------
+@app.post("/api/projects/{pid}/papers/{paper_id}/tools/pipeline")
+async def pipeline_paper_endpoint(request: Request, pid: str, paper_id: str, mode: str = "auto"):
+    if mode not in SUMMARIZE_MODES:
+        raise HTTPException(400, "mode must be one of " + ", ".join(SUMMARIZE_MODES))
+    key = ("pipeline", pid, paper_id, mode)
+    return await run_shared(request, key,
+                            lambda cancel: pipeline_paper(pid, paper_id, mode=mode, cancel=cancel))
+
+def pipeline_paper(pid: str, paper_id: str, mode: str = "auto", cancel: threading.Event = None,
+                   priority: str = INTERACTIVE):
+    """
+    Summarize, then podcast, overlapped: Gemini's response is streamed and each script
+    line goes to TTS as soon as it is complete, so the first lines are voiced while the
+    model is still writing and the episode is done about when the response is. The
+    Gemini slot is held until the response ends; the TTS slot (and a pool worker) is
+    only taken once the first line arrives. Returns finish_podcast's result plus the
+    metadata and timings (seconds from getting the Gemini slot to the first line, to
+    the end of the response, and in all).
+    """
+    with span("pipeline_paper", project=pid, paper=paper_id, mode=mode, priority=priority) as sp, \
+            PROGRESS.track(progress_key("pipeline", pid, paper_id, mode), "pipeline") as progress:
+        paper_pdf_path(pid, paper_id)  # 404 before queueing
+        kwargs = dict(podcast_kwargs(pid, paper_id, ""), trace_parent=sp.traceparent())
+        key = ("pipeline", pid, paper_id, mode)
+        progress.stage("queued", priority=priority)
+        feed = ScriptFeed()
+        first_line = threading.Event()  # also set when Gemini ends without one
+        timings: Dict[str, float] = {}
+        queued: Dict[str, float] = {}
+        t0 = [time.time()]
+
+        def on_line(line: str):
+            if not first_line.is_set():
+                timings["first_line_sec"] = round(time.time() - t0[0], 3)
+                first_line.set()
+            feed.put(line)
+
+        def extract():
+            try:
+                with GEMINI_SCHED.slot(priority, pid, key=key, cancel=cancel) as ticket:
+                    queued["gemini"] = ticket.wait_sec
+                    t0[0] = time.time()
+                    data = extract_paper(pid, paper_id, mode, cancel, progress=lambda frac, desc="": progress.stage(
+                        "summarizing", desc, frac=round(frac, 4)), on_script_line=on_line)
+            except BaseException as e:
+                feed.close(e)
+                raise
+            finally:
+                first_line.set()
+            timings["gemini_sec"] = round(time.time() - t0[0], 3)
+            feed.close()
+            return data
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-gemini") as ex:
+            gemini = ex.submit(bind(extract))
+            # in long mode the map phase runs a while before the first line; no worker idles through it
+            first_line.wait()
+            if gemini.done() and gemini.exception() is not None:
+                gemini.result()
+            try:
+                with TTS_SCHED.slot(priority, pid, key=key, cancel=cancel) as ticket:
+                    queued["tts"] = ticket.wait_sec
+                    result = TTS_POOL.run(kwargs, cancel=cancel, pause=ticket.paused, progress=progress,
+                                          script_feed=feed)
+            except BaseException:
+                # a Gemini failure is the one to report (the feed only echoes it); if
+                # Gemini was fine, keep its metadata even though the episode failed
+                save_metadata(pid, paper_id, gemini.result())
+                raise
+            data = gemini.result()
+        timings["total_sec"] = round(time.time() - t0[0], 3)
+        sp.set(queued_sec=round(sum(queued.values()), 3), **timings)
+        progress.stage("saving", "Saving metadata and episode")
+        save_metadata(pid, paper_id, data)
+        return dict(finish_podcast(pid, paper_id, result), metadata=data, timings=timings)
+
+
+# ---------- Tools: Podcast remix ----------
+# Background tracks the API can mix in: MP3s in this folder, referred to by file name
+PODCAST_BG_DIR = os.environ.get("PODCAST_BG_DIR", "backgrounds")
+
+def background_tracks() -> Dict[str, str]:
+    if not os.path.isdir(PODCAST_BG_DIR):
+        return {}
+    return {fn: os.path.join(PODCAST_BG_DIR, fn) for fn in sorted(os.listdir(PODCAST_BG_DIR))
+            if fn.lower().endswith(".mp3")}
+
+@app.get("/api/podcasts/backgrounds")
+def list_backgrounds():
+    return list(background_tracks())
+
+@app.post("/api/projects/{pid}/papers/{paper_id}/tools/podcast/remix")
+def remix_podcast(pid: str, paper_id: str, body: Dict[str, Any] = Body(default={})):
+    """
+    Rebuild the paper's episode from its stored stems: background (bgTrack, bgReductionDb,
+    addBgEnd, bgEndDurationSec) and pauses (randomPause, pauseMinSec, pauseMaxSec, seed)
+    change; the voices are reused, so no TTS runs. Omitted pause fields keep the
+    episode's pauses.
+    """
+    kwargs = podcast_job_kwargs(pid, paper_id)
+    try:
+        # stems only exist on the node that synthesized the episode (see app.stems_path)
+        episode = STORE.local_path(paper_key(pid, paper_id, kwargs["output_file"]))
+    except FileNotFoundError:
+        raise HTTPException(404, "no episode yet; run podcast first")
+    tracks = background_tracks()
+    bg = body.get("bgTrack") or None
+    if bg is not None and bg not in tracks:
+        raise HTTPException(400, f"unknown bgTrack; available: {', '.join(tracks) or 'none'}")
+    with span("remix_podcast", project=pid, paper=paper_id, bg=bg or ""):
+        result = remix_episode(
+            episode,
+            enable_bg_music=bg is not None,
+            bg_choice_name=bg,
+            bg_map=tracks,
+            bg_reduction_db=int(body.get("bgReductionDb", 20)),
+            add_bg_end=bool(body.get("addBgEnd", False)),
+            bg_end_duration_sec=int(body.get("bgEndDurationSec", 3)),
+            random_pause_enabled=body.get("randomPause"),
+            pause_min_sec=body.get("pauseMinSec"),
+            pause_max_sec=body.get("pauseMaxSec"),
+            seed=int(body.get("seed", PODCAST_SEED)),
+        )
+    if not result[1]:
+        raise HTTPException(409, result[2].strip("*"))
+    return finish_podcast(pid, paper_id, result)
+
 
 @app.get("/api/projects/{pid}/papers/{paper_id}/podcasts")
 def list_podcasts(pid: str, paper_id: str):
-    d = paper_dir(pid, paper_id)
     files = []
-    for fn in sorted(os.listdir(d), reverse=True):
+    for fn in sorted(STORE.listdir(paper_key(pid, paper_id, "")), reverse=True):
         if fn.lower().endswith(".mp3"):
+            st = STORE.stat(paper_key(pid, paper_id, fn))
             files.append({
                 "id": safe_stem(fn),
                 "paperId": paper_id,
                 "mp3Url": f"/api/projects/{pid}/papers/{paper_id}/podcasts/{fn}",
                 "durationSec": 0.0,  # could parse from file if needed
-                "createdAt": now_iso(),
+                "createdAt": datetime.fromtimestamp(st.mtime).isoformat(timespec="seconds") if st else "",
             })
     return files
 
 @app.get("/api/projects/{pid}/papers/{paper_id}/podcasts/{name}")
-def get_podcast_file(pid: str, paper_id: str, name: str):
-    path = os.path.join(paper_dir(pid, paper_id), name)
-    if not os.path.exists(path):
-        alt = os.path.join(GENERATED_FOLDER, name)
-        if not os.path.exists(alt):
-            raise HTTPException(404, "mp3 not found")
-        path = alt
-
+def get_podcast_file(request: Request, pid: str, paper_id: str, name: str):
     headers = {
         "Accept-Ranges": "bytes",
         "Cache-Control": "no-store",
-        "Content-Disposition": f'inline; filename="{os.path.basename(path)}"',
+        "Content-Disposition": f'inline; filename="{os.path.basename(name)}"',
     }
-    return FileResponse(path, media_type="audio/mpeg", headers=headers)
+    try:
+        return serve_stored(request, paper_key(pid, paper_id, name), "audio/mpeg", headers)
+    except (FileNotFoundError, ValueError):
+        pass
+    alt = os.path.join(GENERATED_FOLDER, name)
+    if not os.path.exists(alt):
+        raise HTTPException(404, "mp3 not found")
+    ARTIFACTS.touch(name)
+    return FileResponse(alt, media_type="audio/mpeg", headers=headers)
 
 @app.get("/api/debug/generated")
 def debug_generated():
@@ -485,10 +1284,45 @@ def debug_generated():
         "cwd": os.getcwd(),
         "generated_abs": folder_abs,
         "generated_exists": os.path.isdir(GENERATED_FOLDER),
+        "usage": ARTIFACTS.usage(),
         "files": listing,
     }
 
 
+@app.get("/api/debug/profiles")
+def debug_profiles():
+    return list_profiles(PROFILES_DIR)
+
+@app.get("/api/debug/profiles/{profile_id}/{name}")
+def get_profile_file(profile_id: str, name: str):
+    # only names that actually exist, so nothing outside PROFILES_DIR is reachable
+    if not os.path.isdir(PROFILES_DIR) or profile_id not in os.listdir(PROFILES_DIR):
+        raise HTTPException(404, "profile not found")
+    d = os.path.join(PROFILES_DIR, profile_id)
+    if not os.path.isdir(d) or name not in os.listdir(d):
+        raise HTTPException(404, "profile file not found")
+    return FileResponse(
+        os.path.join(d, name),
+        media_type="application/json" if name.endswith(".json") else "text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}-{name}"'},
+    )
+
+
+@app.get("/api/debug/scheduler")
+def debug_scheduler():
+    return {"podcast": TTS_SCHED.snapshot(), "summarize": GEMINI_SCHED.snapshot()}
+
+
+@app.get("/api/debug/gemini")
+def debug_gemini():
+    from app import GEMINI_LIMITER
+    return {
+        "rpm": round(GEMINI_LIMITER.requests.rate * 60, 3),
+        "tpm": round(GEMINI_LIMITER.tokens.rate * 60, 3),
+        "stats": GEMINI_LIMITER.stats,
+    }
+
+
 # Global fallback for MP3s sitting in generated_podcasts/
 @app.get("/api/podcasts/global/{name:path}")
 def get_global_podcast(name: str):
@@ -498,37 +1332,31 @@ def get_global_podcast(name: str):
     if not os.path.isdir(base):
         raise HTTPException(404, f"generated_podcasts missing at {base}")
 
-    # 1) Exact match
-    candidate = os.path.join(base, name)
-    if os.path.isfile(candidate):
+    # Exact or case-insensitive match (Windows sometimes hides true casing), via the index
+    asset = AUDIO_REGISTRY.lookup(name)
+    if asset is None and os.path.isfile(os.path.join(base, name)):
+        # written by another process since the watcher last looked
+        AUDIO_REGISTRY.on_change("added", name)
+        asset = AUDIO_REGISTRY.lookup(name)
+    if asset is not None:
+        candidate = os.path.join(base, asset["name"])
+        ARTIFACTS.touch(asset["name"])
         headers = {
             "Accept-Ranges": "bytes",
             "Cache-Control": "no-store",
-            "Content-Disposition": f'inline; filename="{os.path.basename(candidate)}"',
+            "Content-Disposition": f'inline; filename="{asset["name"]}"',
         }
         return FileResponse(candidate, media_type="audio/mpeg", headers=headers)
 
-    # 2) Case-insensitive fallback (Windows sometimes hides true casing)
-    lower = name.lower()
-    for fn in os.listdir(base):
-        if fn.lower() == lower:
-            candidate = os.path.join(base, fn)
-            headers = {
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "no-store",
-                "Content-Disposition": f'inline; filename="{fn}"',
-            }
-            return FileResponse(candidate, media_type="audio/mpeg", headers=headers)
-
-    # 3) Not found: return helpful info
-    available = [f for f in os.listdir(base) if f.lower().endswith(".mp3")]
+    # Not found: return helpful info
+    stats = AUDIO_REGISTRY.stats()
     raise HTTPException(
         404,
         detail={
             "message": f"mp3 not found in {base}",
             "requested": name,
-            "available_count": len(available),
-            "example": available[0] if available else None,
+            "available_count": stats["count"],
+            "example": stats["example"],
         },
     )
 
@@ -536,27 +1364,12 @@ def get_global_podcast(name: str):
 
 # ---------- Project table ----------
 @app.get("/api/projects/{pid}/metadata/table")
-def table_rows(pid: str):
-    rows = []
-    pdir = papers_dir(pid)
-    for paper_id in os.listdir(pdir):
-        mp = paper_meta_path(pid, paper_id)
-        if os.path.exists(mp):
-            data = read_json(mp, {})
-            rows.append({
-                "paperId": paper_id,
-                "conference": data.get("conference", "Unknown"),
-                "year": int(data.get("year", datetime.now().year)),
-                "link": data.get("link", "Unknown"),
-                "domain": data.get("domain", "Unknown"),
-                "title": data.get("title", "Unknown Title"),
-                "summary": data.get("summary", ""),
-                "tags": data.get("tags", ""),
-                "date_added": now_iso(),
-                "ready_to_publish": bool(data.get("ready_to_publish", False)),
-                "script_lines": len(data.get("script", [])) if isinstance(data.get("script", []), list) else 0,
-            })
-    return rows
+def table_rows_endpoint(request: Request, pid: str):
+    return etag_json(request, generation_tag(pid), lambda: table_rows(pid))
+
+def table_rows(pid: str, papers: Optional[List[Dict[str, Any]]] = None):
+    return [metadata_row(pid, p["id"], p["meta"], p["paper"] or {})
+            for p in (scan_papers(pid) if papers is None else papers) if p["meta"] is not None]
 
 @app.get("/api/projects/{pid}/metadata/csv")
 def table_csv(pid: str):
@@ -574,3 +1387,37 @@ def table_csv(pid: str):
         yield out.getvalue()
     return StreamingResponse(gen(), media_type="text/csv",
                              headers={"Content-Disposition": f"attachment; filename=project_{pid}_metadata.csv"})
+
+
+# ---------- Project dashboard ----------
+DASHBOARD_FIELDS = ("project", "papers", "summaries", "table", "podcasts")
+
+@app.get("/api/projects/{pid}/dashboard")
+def project_dashboard(request: Request, pid: str, fields: str = ""):
+    """
+    What the project page shows, in one response built from one scan of the papers
+    tree: {"project", "papers", "summaries", "table", "podcasts"}, each shaped like its
+    own endpoint's response. `fields` (comma-separated) picks a subset.
+    """
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] or list(DASHBOARD_FIELDS)
+    unknown = [f for f in wanted if f not in DASHBOARD_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"unknown fields {', '.join(unknown)}; choose from {', '.join(DASHBOARD_FIELDS)}")
+    project = read_record(project_key(pid), None)
+    if project is None:
+        raise HTTPException(404, "project not found")
+    extra = ["+".join(wanted)]
+    if "podcasts" in wanted:
+        extra.insert(0, AUDIO_REGISTRY.version)  # see list_project_podcasts
+    return etag_json(request, generation_tag(pid, *extra), lambda: _project_dashboard(pid, project, wanted))
+
+def _project_dashboard(pid: str, project: Dict[str, Any], fields: List[str]):
+    papers = scan_papers(pid, meta=any(f in fields for f in ("summaries", "table", "podcasts")))
+    build = {
+        "project": lambda: project,
+        "papers": lambda: _list_papers(pid, papers),
+        "summaries": lambda: _list_project_summaries(pid, papers),
+        "table": lambda: table_rows(pid, papers),
+        "podcasts": lambda: _list_project_podcasts(pid, papers),
+    }
+    return {f: build[f]() for f in fields}
@@ -0,0 +1,120 @@
+# singleflight.py
+# In-flight de-duplication: concurrent identical requests share one execution.
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ClientDisconnected(Exception):
+    """Every client waiting on a call went away before it finished."""
+
+
+class Flight:
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.future: Future = Future()
+        self.cancel = threading.Event()  # set once nobody is waiting any more
+        self.abandoned = False  # cancel was set at some point; fn may have stopped because of it
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    join(key, fn) starts fn(cancel_event) on a worker thread unless a call with the
+    same key is already running, in which case the caller shares it. Each joiner
+    must leave() when done waiting; when the last waiter leaves an unfinished
+    call, its cancel event is set so fn can stop at its next checkpoint. The call
+    stays in flight until fn returns, so a repeat of the request rejoins it (and
+    clears the cancel) instead of starting a second run next to it.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        # None: a thread per flight. Flights may sit in a priority queue (see scheduler.py),
+        # and queued bulk flights must not use up the threads interactive flights need.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flight") if max_workers else None
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def join(self, key: Hashable, fn: Callable[[threading.Event], Any]) -> Flight:
+        return self._join(key, fn)[0]
+
+    def _join(self, key: Hashable, fn: Callable[[threading.Event], Any]) -> Tuple[Flight, bool]:
+        """(flight, rejoined): rejoined when the flight had been abandoned before this join."""
+        with self._lock:
+            flight = self._flights.get(key)
+            rejoined = flight is not None and flight.abandoned
+            if flight is not None and flight.cancel.is_set():
+                flight.cancel.clear()  # someone is waiting again; fn keeps going if it hasn't stopped yet
+            if flight is None:
+                flight = Flight(key)
+                # RUNNING from the start: one waiter's asyncio cancellation must not cancel it for the rest
+                flight.future.set_running_or_notify_cancel()
+                self._flights[key] = flight
+                if self._executor is not None:
+                    self._executor.submit(self._run, flight, fn)
+                else:
+                    threading.Thread(target=self._run, args=(flight, fn), name="flight", daemon=True).start()
+            flight.waiters += 1
+            return flight, rejoined
+
+    def _run(self, flight: Flight, fn: Callable[[threading.Event], Any]):
+        try:
+            if flight.cancel.is_set():
+                raise ClientDisconnected(f"{flight.key} cancelled before start")
+            result = fn(flight.cancel)
+        except BaseException as e:
+            self._finish(flight)
+            flight.future.set_exception(e)
+        else:
+            self._finish(flight)
+            flight.future.set_result(result)
+
+    def _finish(self, flight: Flight):
+        # later identical requests start a fresh call rather than reusing this result
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def leave(self, flight: Flight):
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters <= 0 and not flight.future.done():
+                flight.abandoned = True
+                flight.cancel.set()
+
+    def do_sync(self, key: Hashable, fn: Callable[[threading.Event], Any]) -> Any:
+        while True:
+            flight, rejoined = self._join(key, fn)
+            try:
+                return flight.future.result()
+            except BaseException:
+                # an abandoned run may have failed only because it was cancelled: run it again
+                if not rejoined:
+                    raise
+            finally:
+                self.leave(flight)
+
+    async def do(self, key: Hashable, fn: Callable[[threading.Event], Any],
+                 is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                 poll_sec: float = 0.5) -> Any:
+        """Await the shared call, giving up (and maybe cancelling it) if the client disconnects."""
+        while True:
+            flight, rejoined = self._join(key, fn)
+            try:
+                waiter = asyncio.wrap_future(flight.future)
+                while True:
+                    done, _ = await asyncio.wait({waiter}, timeout=poll_sec)
+                    if done:
+                        break
+                    if is_disconnected is not None and await is_disconnected():
+                        raise ClientDisconnected(str(key))
+                if waiter.exception() is None or not rejoined:
+                    return waiter.result()
+                # an abandoned run may have failed only because it was cancelled: run it again
+            finally:
+                self.leave(flight)
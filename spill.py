@@ -0,0 +1,157 @@
+# spill.py
+# Out-of-core episode assembly: synthesized lines are appended as 16-bit mono PCM to a
+# temp file, then read back through a memory map in fixed-size blocks, mixed with the
+# background track block by block and piped into ffmpeg. Per-job memory stays at one
+# line + one block + the decoded background track, however long the episode is.
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SPILL_BLOCK_SEC = float(os.environ.get("TTS_SPILL_BLOCK_SEC", "10"))
+
+
+class PCMSpill:
+    """Append-only int16 mono PCM file at one sample rate."""
+
+    def __init__(self, sample_rate: Optional[int] = None, dir: Optional[str] = None):
+        self.sample_rate = sample_rate
+        fd, self.path = tempfile.mkstemp(prefix="neurocache-pcm-", suffix=".s16", dir=dir)
+        self._fh = os.fdopen(fd, "wb")
+        self.samples = 0
+
+    def __len__(self) -> int:
+        return self.samples
+
+    def duration_sec(self) -> float:
+        return self.samples / self.sample_rate if self.sample_rate else 0.0
+
+    def append_pcm(self, data: bytes):
+        self._fh.write(data)
+        self.samples += len(data) // 2
+
+    def append_silence(self, n_samples: int):
+        chunk = bytes(2 * min(n_samples, 1 << 16))
+        while n_samples > 0:
+            n = min(n_samples, len(chunk) // 2)
+            self.append_pcm(chunk[: 2 * n])
+            n_samples -= n
+
+    def blocks(self, block_samples: int) -> Iterator[np.ndarray]:
+        """Read-only views over the file (page cache, not heap), block_samples at a time."""
+        self._fh.flush()
+        if self.samples == 0:
+            return
+        pcm = np.memmap(self.path, dtype=np.int16, mode="r", shape=(self.samples,))
+        try:
+            for start in range(0, self.samples, block_samples):
+                yield pcm[start:start + block_samples]
+        finally:
+            del pcm
+
+    def close(self):
+        try:
+            self._fh.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class StemWriter:
+    """
+    Per-line voice audio (speech and gestures; no pauses, no music) in one PCM file plus
+    an index of where each line starts, saved next to an episode so it can be remixed
+    without synthesizing again.
+    """
+
+    def __init__(self, dir: Optional[str] = None):
+        self.pcm = PCMSpill(dir=dir)
+        self.lines: List[Dict[str, Any]] = []
+
+    def add(self, data: bytes, sample_rate: int, **info):
+        if self.pcm.sample_rate is None:
+            self.pcm.sample_rate = sample_rate
+        start = self.pcm.samples
+        self.pcm.append_pcm(data)
+        self.lines.append(dict(info, start=start, samples=self.pcm.samples - start))
+
+    def save(self, stems_dir: str, **meta):
+        """Moves the PCM into stems_dir (voice.pcm + index.json), replacing older stems."""
+        self.pcm._fh.close()
+        tmp = f"{stems_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        shutil.move(self.pcm.path, os.path.join(tmp, "voice.pcm"))
+        with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(meta, sample_rate=self.pcm.sample_rate, lines=self.lines), f)
+        shutil.rmtree(stems_dir, ignore_errors=True)
+        os.replace(tmp, stems_dir)
+
+    def close(self):
+        self.pcm.close()
+
+
+def load_stems(stems_dir: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    """(index, read-only int16 memmap of every line back to back)."""
+    with open(os.path.join(stems_dir, "index.json"), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    total = sum(line["samples"] for line in index["lines"])
+    pcm = np.memmap(os.path.join(stems_dir, "voice.pcm"), dtype=np.int16, mode="r", shape=(total,)) \
+        if total else np.zeros(0, dtype=np.int16)
+    return index, pcm
+
+
+def mixed_blocks(spill: PCMSpill, bg: Optional[np.ndarray] = None, tail_samples: int = 0,
+                 block_samples: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    Episode blocks with `bg` (int16, already attenuated and resampled) looped underneath,
+    then `tail_samples` of bg on its own. Sums saturate like pydub's overlay.
+    """
+    block_samples = block_samples or max(1, int(SPILL_BLOCK_SEC * (spill.sample_rate or 24000)))
+    pos = 0
+    for block in spill.blocks(block_samples):
+        if bg is not None and len(bg):
+            idx = (np.arange(pos, pos + len(block)) % len(bg))
+            out = np.clip(block.astype(np.int32) + bg[idx], -32768, 32767).astype(np.int16)
+        else:
+            out = np.asarray(block)
+        pos += len(block)
+        yield out
+    if bg is not None and len(bg) and tail_samples > 0:
+        for start in range(0, min(tail_samples, len(bg)), block_samples):
+            yield bg[start:min(start + block_samples, tail_samples)]
+
+
+def encode_stream(blocks: Iterator[np.ndarray], sample_rate: int, out_path: str,
+                  converter: str = "ffmpeg", format: str = "mp3") -> int:
+    """Pipe raw s16le blocks into ffmpeg, writing out_path. Returns samples encoded."""
+    cmd = [converter, "-y", "-loglevel", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+           "-i", "pipe:0", "-f", format, out_path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    written = 0
+    try:
+        for block in blocks:
+            proc.stdin.write(np.ascontiguousarray(block, dtype="<i2").tobytes())
+            written += len(block)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its stderr says why
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        err = proc.stderr.read()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {err.decode('utf-8', 'replace')[-500:]}")
+    return written
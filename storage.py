@@ -0,0 +1,608 @@
+# storage.py
+# Where the API keeps projects: records (project/paper/meta JSON, cached PDF text), PDFs
+# and episodes, addressed by "/"-separated keys such as "{pid}/papers/{paper}/meta.json".
+# LocalStorage is the projects/ directory tree the API always used; S3Storage keeps the
+# same keys in an S3-compatible bucket so several API nodes behind a load balancer share
+# one set of projects. Work that needs a real file (PDF parsing, synthesis) goes through
+# local_path(), which for S3 is a download cache under STORAGE_CACHE_DIR.
+#
+#   STORAGE_BACKEND=s3 STORAGE_S3_BUCKET=neurocache STORAGE_S3_ENDPOINT=http://localhost:9000 \
+#       uvicorn server:app
+#   python storage.py serve --port 9000 --root .cache/s3   # stand-in S3 endpoint (no auth)
+#   python storage.py push projects                        # copy a local tree into the configured store
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import mimetypes
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+try:  # optional: only STORAGE_BACKEND=s3 needs it
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")  # local | s3
+STORAGE_S3_BUCKET = os.environ.get("STORAGE_S3_BUCKET", "")
+STORAGE_S3_PREFIX = os.environ.get("STORAGE_S3_PREFIX", "projects/")
+# e.g. http://localhost:9000 for MinIO or `python storage.py serve`; empty = AWS
+STORAGE_S3_ENDPOINT = os.environ.get("STORAGE_S3_ENDPOINT", "")
+STORAGE_S3_REGION = os.environ.get("STORAGE_S3_REGION", "us-east-1")
+STORAGE_CACHE_DIR = os.environ.get("STORAGE_CACHE_DIR", os.path.join(".cache", "storage"))
+# lifetime of the presigned URLs PDFs/episodes are redirected to; 0 = the API proxies the bytes
+STORAGE_PRESIGN_SEC = int(os.environ.get("STORAGE_PRESIGN_SEC", "3600"))
+CHUNK = 1 << 20
+
+
+class ObjectStat(NamedTuple):
+    size: int
+    mtime: float
+    etag: str
+
+
+class Storage(ABC):
+    """
+    Keys never start with "/" and never contain "..". Missing objects raise
+    FileNotFoundError (reads) or come back as None (stat).
+    """
+
+    shared = False  # True when other API nodes see the same objects
+    local_root = ""  # local_path() files live under here, mirroring the keys
+
+    @abstractmethod
+    def read_bytes(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_bytes(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_stream(self, key: str, fileobj: BinaryIO):
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_file(self, key: str, path: str):
+        """Store a local file (e.g. a finished episode) under key."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def listdir(self, prefix: str) -> List[str]:
+        """Names directly under prefix ("" or ending in "/"), objects and sub-prefixes alike."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def walk(self, prefix: str) -> List[str]:
+        """Every object key under prefix, relative to it: one listing, however deep."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes start..end (inclusive, like HTTP Range), streamed in chunks."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        raise NotImplementedError
+
+    def work_path(self, key: str) -> str:
+        """Where to write a file that put_file(key, ...) will store; its folder exists."""
+        path = os.path.join(self.local_root, *check_key(key).split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def presigned_url(self, key: str, expires_sec: int, content_type: str = "",
+                      disposition: str = "") -> Optional[str]:
+        """A URL clients can fetch (with Range) straight from the store, if it has one."""
+        return None
+
+    # ---------- JSON records ----------
+    def read_json(self, key: str, default):
+        try:
+            return json.loads(self.read_bytes(key).decode("utf-8"))
+        except Exception:
+            return default
+
+    def write_json(self, key: str, data):
+        self.write_bytes(key, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def check_key(key: str) -> str:
+    parts = key.split("/")
+    if key.startswith("/") or any(p in ("..", ".") for p in parts):
+        raise ValueError(f"bad storage key: {key!r}")
+    return key
+
+
+# ---------- local directory ----------
+class LocalStorage(Storage):
+    def __init__(self, root: str):
+        self.root = root
+        self.local_root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *check_key(key).split("/")) if key else self.root
+
+    def _replace_with(self, key: str, write):
+        # temp + rename so concurrent writers/readers never see a half-written file
+        fp = self.path(key)
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        tmp = f"{fp}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, fp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def read_bytes(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, key: str, data: bytes):
+        self._replace_with(key, lambda f: f.write(data))
+
+    def write_stream(self, key: str, fileobj: BinaryIO):
+        self._replace_with(key, lambda f: shutil.copyfileobj(fileobj, f, CHUNK))
+
+    def put_file(self, key: str, path: str):
+        if os.path.abspath(path) == os.path.abspath(self.path(key)):
+            return  # already written in place
+        with open(path, "rb") as src:
+            self.write_stream(key, src)
+
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        try:
+            st = os.stat(self.path(key))
+        except OSError:
+            return None
+        if not os.path.isfile(self.path(key)):
+            return None
+        return ObjectStat(st.st_size, st.st_mtime, f"{st.st_mtime_ns:x}-{st.st_size:x}")
+
+    def listdir(self, prefix: str) -> List[str]:
+        d = self.path(prefix.rstrip("/"))
+        if not os.path.isdir(d):
+            return []
+        return [fn for fn in os.listdir(d) if not fn.endswith(".tmp")]
+
+    def walk(self, prefix: str) -> List[str]:
+        base = self.path(prefix.rstrip("/"))
+        return [os.path.relpath(os.path.join(d, fn), base).replace(os.sep, "/")
+                for d, _, files in os.walk(base) for fn in files if not fn.endswith(".tmp")]
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self.path(prefix.rstrip("/")), ignore_errors=True)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            left = None if end is None else end - start + 1
+            while left is None or left > 0:
+                block = f.read(CHUNK if left is None else min(CHUNK, left))
+                if not block:
+                    return
+                if left is not None:
+                    left -= len(block)
+                yield block
+
+    def local_path(self, key: str) -> str:
+        fp = self.path(key)
+        if not os.path.isfile(fp):
+            raise FileNotFoundError(key)
+        return fp
+
+
+# ---------- S3-compatible object store ----------
+class S3Storage(Storage):
+    """
+    Objects at s3://bucket/{prefix}{key}. local_path() downloads into cache_dir and
+    reuses the copy while the object's size and mtime still match.
+    """
+
+    shared = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint: str = "", region: str = "",
+                 cache_dir: str = STORAGE_CACHE_DIR):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs STORAGE_S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.local_root = cache_dir
+        # path-style addressing: MinIO and most self-hosted endpoints have no bucket DNS
+        self.client = boto3.client(
+            "s3", endpoint_url=endpoint or None, region_name=region or None,
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"} if endpoint else {}),
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _k(self, key: str) -> str:
+        return self.prefix + check_key(key)
+
+    @staticmethod
+    def _missing(e: "ClientError") -> bool:
+        return e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def read_bytes(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._k(key))["Body"].read()
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def write_bytes(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._k(key), Body=data,
+                               ContentType=mimetypes.guess_type(key)[0] or "application/octet-stream")
+
+    def write_stream(self, key: str, fileobj: BinaryIO):
+        # multipart past 8 MB, so memory stays at a few parts whatever the size
+        self.client.upload_fileobj(fileobj, self.bucket, self._k(key), ExtraArgs={
+            "ContentType": mimetypes.guess_type(key)[0] or "application/octet-stream"})
+
+    def put_file(self, key: str, path: str):
+        with open(path, "rb") as f:
+            self.write_stream(key, f)
+        if os.path.abspath(path) == os.path.abspath(self.work_path(key)):
+            self._mark_cached(key, path)  # the work file doubles as the cached copy
+
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._k(key))
+        except ClientError as e:
+            if self._missing(e):
+                return None
+            raise
+        return ObjectStat(head["ContentLength"], head["LastModified"].timestamp(), head.get("ETag", "").strip('"'))
+
+    def listdir(self, prefix: str) -> List[str]:
+        base = self._k(prefix)
+        names = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(
+                Bucket=self.bucket, Prefix=base, Delimiter="/"):
+            names.extend(p["Prefix"][len(base):].rstrip("/") for p in page.get("CommonPrefixes", []))
+            names.extend(o["Key"][len(base):] for o in page.get("Contents", []))
+        return [n for n in names if n]
+
+    def walk(self, prefix: str) -> List[str]:
+        base = self._k(prefix)
+        return [o["Key"][len(base):]
+                for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=base)
+                for o in page.get("Contents", [])]
+
+    def delete_prefix(self, prefix: str):
+        keys = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(
+                Bucket=self.bucket, Prefix=self._k(prefix)):
+            keys.extend({"Key": o["Key"]} for o in page.get("Contents", []))
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys[i:i + 1000], "Quiet": True})
+        shutil.rmtree(os.path.join(self.local_root, *prefix.rstrip("/").split("/")), ignore_errors=True)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        rng = f"bytes={start}-{'' if end is None else end}"
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._k(key), Range=rng)["Body"]
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key)
+            raise
+        try:
+            yield from body.iter_chunks(CHUNK)
+        finally:
+            body.close()
+
+    def _mark_cached(self, key: str, path: str):
+        st = self.stat(key)
+        if st is not None:
+            os.utime(path, (st.mtime, st.mtime))
+
+    def local_path(self, key: str) -> str:
+        st = self.stat(key)
+        if st is None:
+            raise FileNotFoundError(key)
+        fp = self.work_path(key)
+        try:
+            cur = os.stat(fp)
+            if cur.st_size == st.size and abs(cur.st_mtime - st.mtime) < 1e-3:
+                return fp
+        except OSError:
+            pass
+        tmp = f"{fp}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            self.client.download_file(self.bucket, self._k(key), tmp)
+            os.utime(tmp, (st.mtime, st.mtime))
+            os.replace(tmp, fp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return fp
+
+    def presigned_url(self, key: str, expires_sec: int, content_type: str = "",
+                      disposition: str = "") -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._k(key)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        if disposition:
+            params["ResponseContentDisposition"] = disposition
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_sec)
+
+
+def open_storage(local_root: str) -> Storage:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(STORAGE_S3_BUCKET, STORAGE_S3_PREFIX, STORAGE_S3_ENDPOINT, STORAGE_S3_REGION)
+    if STORAGE_BACKEND != "local":
+        raise RuntimeError(f"unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (local or s3)")
+    return LocalStorage(local_root)
+
+
+# ---------- tools ----------
+def push(src_root: str, store: Storage) -> int:
+    """Copy a local projects/ tree into store, skipping objects that are already there."""
+    copied = 0
+    for dirpath, _, files in os.walk(src_root):
+        for fn in files:
+            if fn.endswith(".tmp"):
+                continue
+            fp = os.path.join(dirpath, fn)
+            key = os.path.relpath(fp, src_root).replace(os.sep, "/")
+            st = store.stat(key)
+            if st is not None and st.size == os.path.getsize(fp):
+                continue
+            store.put_file(key, fp)
+            copied += 1
+    return copied
+
+def serve(port: int, root: str):
+    """
+    Stand-in S3 endpoint over a directory, enough for S3Storage and boto3: buckets,
+    objects, ListObjectsV2, ranged GETs, batch delete and multipart uploads. Requests
+    aren't authenticated, so presigned URLs just work.
+    """
+    from urllib.parse import parse_qs, unquote, urlsplit
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from email.utils import formatdate
+    from xml.sax.saxutils import escape, unescape
+
+    os.makedirs(root, exist_ok=True)
+    uploads = os.path.join(root, ".uploads")
+
+    def obj_path(bucket: str, key: str) -> str:
+        return os.path.join(root, bucket, *check_key(key).split("/"))
+
+    def etag(fp: str) -> str:
+        st = os.stat(fp)
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _target(self):
+            url = urlsplit(self.path)
+            bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+            return bucket, key, {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+        def _send(self, code: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+            self.send_response(code)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _xml(self, code: int, xml: str):
+            self._send(code, ('<?xml version="1.0" encoding="UTF-8"?>' + xml).encode("utf-8"),
+                       {"Content-Type": "application/xml"})
+
+        def _error(self, code: int, s3code: str):
+            self._xml(code, f"<Error><Code>{s3code}</Code><Message>{s3code}</Message></Error>")
+
+        def _body(self) -> bytes:
+            data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if "aws-chunked" in self.headers.get("Content-Encoding", "") or \
+                    self.headers.get("x-amz-content-sha256", "").startswith("STREAMING-"):
+                # <hex size>[;chunk-signature=...]\r\n<data>\r\n ... 0\r\n[trailers]\r\n
+                out, pos = bytearray(), 0
+                while True:
+                    eol = data.index(b"\r\n", pos)
+                    size = int(data[pos:eol].split(b";")[0], 16)
+                    if size == 0:
+                        break
+                    out += data[eol + 2:eol + 2 + size]
+                    pos = eol + 2 + size + 2
+                data = bytes(out)
+            return data
+
+        def _write(self, fp: str, data: bytes):
+            os.makedirs(os.path.dirname(fp), exist_ok=True)
+            tmp = f"{fp}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, fp)
+
+        def do_PUT(self):
+            bucket, key, q = self._target()
+            data = self._body()
+            if not key:
+                os.makedirs(os.path.join(root, bucket), exist_ok=True)
+                return self._send(200)
+            if "uploadId" in q:
+                fp = os.path.join(uploads, q["uploadId"], f"{int(q['partNumber']):05d}")
+                self._write(fp, data)
+                return self._send(200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+            fp = obj_path(bucket, key)
+            self._write(fp, data)
+            self._send(200, headers={"ETag": etag(fp)})
+
+        def do_POST(self):
+            bucket, key, q = self._target()
+            data = self._body()
+            if "delete" in q:
+                keys = [unescape(k, {"&quot;": '"', "&apos;": "'"})
+                        for k in re.findall(r"<Key>(.*?)</Key>", data.decode("utf-8"))]
+                for k in keys:
+                    try:
+                        os.remove(obj_path(bucket, k))
+                    except OSError:
+                        pass
+                return self._xml(200, "<DeleteResult>" + "".join(
+                    f"<Deleted><Key>{escape(k)}</Key></Deleted>" for k in keys) + "</DeleteResult>")
+            if "uploads" in q:
+                upload_id = uuid.uuid4().hex
+                os.makedirs(os.path.join(uploads, upload_id))
+                return self._xml(200, f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket>"
+                                      f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>"
+                                      f"</InitiateMultipartUploadResult>")
+            if "uploadId" in q:
+                parts_dir = os.path.join(uploads, q["uploadId"])
+                fp = obj_path(bucket, key)
+                os.makedirs(os.path.dirname(fp), exist_ok=True)
+                tmp = f"{fp}.{uuid.uuid4().hex[:8]}.tmp"
+                with open(tmp, "wb") as out:
+                    for part in sorted(os.listdir(parts_dir)):
+                        with open(os.path.join(parts_dir, part), "rb") as f:
+                            shutil.copyfileobj(f, out, CHUNK)
+                os.replace(tmp, fp)
+                shutil.rmtree(parts_dir, ignore_errors=True)
+                return self._xml(200, f"<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket>"
+                                      f"<Key>{escape(key)}</Key><ETag>{escape(etag(fp))}</ETag>"
+                                      f"</CompleteMultipartUploadResult>")
+            self._error(400, "InvalidRequest")
+
+        def do_DELETE(self):
+            bucket, key, q = self._target()
+            if "uploadId" in q:
+                shutil.rmtree(os.path.join(uploads, q["uploadId"]), ignore_errors=True)
+            elif key:
+                try:
+                    os.remove(obj_path(bucket, key))
+                except OSError:
+                    pass
+            self._send(204)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            bucket, key, q = self._target()
+            if not os.path.isdir(os.path.join(root, bucket)):
+                return self._error(404, "NoSuchBucket")
+            if not key:
+                return self._list(bucket, q)
+            fp = obj_path(bucket, key)
+            if not os.path.isfile(fp):
+                return self._error(404, "NoSuchKey")
+            st = os.stat(fp)
+            start, end, code = 0, st.st_size - 1, 200
+            m = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+            if m and (m.group(1) or m.group(2)):
+                if m.group(1):
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)), end) if m.group(2) else end
+                else:
+                    start = max(0, st.st_size - int(m.group(2)))
+                if start > end:
+                    return self._error(416, "InvalidRange")
+                code = 206
+            headers = {
+                "Content-Type": q.get("response-content-type") or mimetypes.guess_type(key)[0] or "application/octet-stream",
+                "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+                "ETag": etag(fp),
+                "Accept-Ranges": "bytes",
+                "Content-Length": str(end - start + 1),
+            }
+            if q.get("response-content-disposition"):
+                headers["Content-Disposition"] = q["response-content-disposition"]
+            if code == 206:
+                headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            self.send_response(code)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            with open(fp, "rb") as f:
+                f.seek(start)
+                left = end - start + 1
+                while left > 0:
+                    block = f.read(min(CHUNK, left))
+                    if not block:
+                        break
+                    self.wfile.write(block)
+                    left -= len(block)
+
+        def _list(self, bucket: str, q: Dict[str, str]):
+            prefix, delim = q.get("prefix", ""), q.get("delimiter", "")
+            base = os.path.join(root, bucket)
+            keys = sorted(os.path.relpath(os.path.join(d, fn), base).replace(os.sep, "/")
+                          for d, _, files in os.walk(base) for fn in files if not fn.endswith(".tmp"))
+            contents, prefixes = [], []
+            for k in keys:
+                if not k.startswith(prefix):
+                    continue
+                rest = k[len(prefix):]
+                if delim and delim in rest:
+                    p = prefix + rest.split(delim, 1)[0] + delim
+                    if p not in prefixes:
+                        prefixes.append(p)
+                else:
+                    contents.append(k)
+            xml = [f"<ListBucketResult><Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>",
+                   f"<KeyCount>{len(contents) + len(prefixes)}</KeyCount><IsTruncated>false</IsTruncated>"]
+            for k in contents:
+                st = os.stat(os.path.join(base, *k.split("/")))
+                modified = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(st.st_mtime))
+                xml.append(f"<Contents><Key>{escape(k)}</Key><LastModified>{modified}</LastModified>"
+                           f"<Size>{st.st_size}</Size></Contents>")
+            xml.extend(f"<CommonPrefixes><Prefix>{escape(p)}</Prefix></CommonPrefixes>" for p in prefixes)
+            self._xml(200, "".join(xml) + "</ListBucketResult>")
+
+        def log_message(self, *args):
+            pass
+
+    print(f"[Storage stand-in] S3 endpoint on http://localhost:{port}, objects under {root}")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    srv = sub.add_parser("serve", help="run a stand-in S3 endpoint over a directory")
+    srv.add_argument("--port", type=int, default=9000)
+    srv.add_argument("--root", default=os.path.join(".cache", "s3"))
+    srv.add_argument("--bucket", default=STORAGE_S3_BUCKET, help="create this bucket up front")
+    p = sub.add_parser("push", help="copy a local projects tree into the configured store")
+    p.add_argument("src", nargs="?", default="projects")
+    args = ap.parse_args()
+    if args.cmd == "serve":
+        if args.bucket:
+            os.makedirs(os.path.join(args.root, args.bucket), exist_ok=True)
+        serve(args.port, args.root)
+    else:
+        if STORAGE_BACKEND == "local":
+            sys.exit("set STORAGE_BACKEND (and its settings) to the store to push into")
+        print(f"[Storage push] {push(args.src, open_storage(args.src))} object(s) copied")
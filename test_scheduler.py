@@ -0,0 +1,46 @@
+# test_scheduler.py
+#   python -m pytest -q test_scheduler.py
+import time
+import threading
+
+from scheduler import PriorityScheduler, INTERACTIVE, BULK
+
+
+def _active(sched: PriorityScheduler) -> int:
+    return sum(1 for r in sched.snapshot()["running"] if not r["paused"])
+
+def test_paused_bulk_job_resumes_when_a_slot_frees():
+    sched = PriorityScheduler(2, borrow=1)
+    b1 = sched.acquire(BULK, "a")
+    b2 = sched.acquire(BULK, "a")
+    i1 = sched.acquire(INTERACTIVE, "b")
+    assert b2.paused.is_set() and i1.victim is b2
+
+    sched.release(b1)
+    assert not b2.paused.is_set()
+    assert i1.victim is None
+    assert _active(sched) == 2
+
+    # the reserve slot is free again for the next interactive job
+    i2 = sched.acquire(INTERACTIVE, "c", cancel=threading.Event())
+    assert i2 is not None and i2.victim is b2
+
+def test_paused_job_resumes_before_queued_bulk_job_starts():
+    sched = PriorityScheduler(2, borrow=1)
+    b1 = sched.acquire(BULK, "a")
+    b2 = sched.acquire(BULK, "a")
+    i1 = sched.acquire(INTERACTIVE, "b")
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(sched.acquire(BULK, "a", poll_sec=0.05)))
+    waiter.start()
+    time.sleep(0.1)
+
+    sched.release(b1)
+    time.sleep(0.1)
+    assert not b2.paused.is_set()
+    assert not got  # B3 waits: B2 took the freed slot back
+
+    sched.release(i1)
+    sched.release(b2)
+    waiter.join(2)
+    assert got and got[0].admitted
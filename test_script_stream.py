@@ -0,0 +1,71 @@
+# test_script_stream.py
+#   python -m pytest -q test_script_stream.py
+# ScriptLineParser and the streamed _generate_metadata call, against fakes.FakeGeminiModel.
+import json
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("kokoro_onnx")
+
+import app
+from fakes import FAKE_METADATA, FakeGeminiModel
+
+# everything that is easy to get wrong at a chunk boundary
+TRICKY = dict(FAKE_METADATA, summary='Mentions "script": [ "not a line" ] and a \\ backslash.', script=[
+    'Male: He said "hi" and left.',
+    "Female: Arrays end with ] and objects with }, even in text.",
+    "Male: A backslash \\ then a quote \" then unicode: café, été, emoji \U0001F600.",
+    "Female: Tabs\tand\nnewlines survive too.",
+    "Male: Last line, with a trailing comma,",
+])
+
+def _expected(full: str):
+    return json.loads(full[full.index("{"):full.rindex("}") + 1])["script"]
+
+def _responses():
+    script_first = dict({"script": TRICKY["script"]}, **TRICKY)
+    return {
+        "script first": json.dumps(script_first, indent=2, ensure_ascii=False),
+        "script last": json.dumps(TRICKY, indent=2, ensure_ascii=False),
+        "compact, escaped": json.dumps(TRICKY, separators=(",", ":")),
+        "fenced": "```json\n" + json.dumps(TRICKY, indent=2) + "\n```",
+    }
+
+
+@pytest.mark.parametrize("name", sorted(_responses()))
+def test_every_two_way_split(name):
+    full = _responses()[name]
+    for k in range(len(full) + 1):
+        parser = app.ScriptLineParser()
+        emitted = parser.feed(full[:k]) + parser.feed(full[k:])
+        assert emitted == parser.lines == _expected(full), f"split at {k}: {full[k - 5:k + 5]!r}"
+
+@pytest.mark.parametrize("name", sorted(_responses()))
+def test_char_by_char(name):
+    full = _responses()[name]
+    parser = app.ScriptLineParser()
+    emitted = [line for ch in full for line in parser.feed(ch)]
+    assert emitted == parser.lines == _expected(full)
+
+def test_no_script_array():
+    parser = app.ScriptLineParser()
+    as_string = json.dumps(dict(FAKE_METADATA, script="Male: one\nFemale: two"))
+    assert parser.feed(as_string) == [] and parser.lines == []
+
+
+@pytest.mark.parametrize("script_first", [True, False])
+@pytest.mark.parametrize("chunk_chars", [1, 3, 7, 40])
+def test_generate_metadata_emits_every_line_once(script_first, chunk_chars):
+    model = FakeGeminiModel(payload=TRICKY, stream_chunk_chars=chunk_chars, follow_stream_hint=script_first)
+    lines = []
+    out = app._generate_metadata(model, ["prompt"], on_script_line=lines.append)
+    assert lines == out["script"] == TRICKY["script"]
+    assert out["summary"] == TRICKY["summary"]
+
+def test_generate_metadata_splits_a_script_string():
+    payload = dict(FAKE_METADATA, script="Male: one\nFemale: two\n")
+    lines = []
+    out = app._generate_metadata(FakeGeminiModel(payload=payload, stream_chunk_chars=5), ["prompt"],
+                                 on_script_line=lines.append)
+    assert lines == out["script"] == ["Male: one", "Female: two"]
@@ -0,0 +1,55 @@
+# test_singleflight.py
+#   python -m pytest -q test_singleflight.py
+import threading
+
+from singleflight import SingleFlight
+
+
+def test_abandoned_call_is_rejoined_not_run_twice():
+    flights = SingleFlight()
+    started = []
+    release = threading.Event()
+
+    def fn(cancel):
+        started.append(cancel)
+        release.wait(5)
+        return "done"
+
+    first = flights.join("k", fn)
+    flights.leave(first)  # every client went away; fn hasn't reached a checkpoint
+    assert first.cancel.is_set() and flights.in_flight("k")
+
+    second = flights.join("k", fn)
+    assert second is first and not first.cancel.is_set()
+    release.set()
+    assert second.future.result(5) == "done"
+    flights.leave(second)
+    assert len(started) == 1 and not flights.in_flight("k")
+
+def test_rejoiner_reruns_a_call_that_stopped_on_cancel():
+    flights = SingleFlight()
+    runs = []
+    first_running = threading.Event()
+    go = threading.Event()
+
+    def fn(cancel):
+        runs.append(1)
+        if len(runs) == 1:
+            first_running.set()
+            go.wait(5)
+            if cancel.is_set() or len(runs) == 1:
+                raise RuntimeError("stopped at a checkpoint")
+        return len(runs)
+
+    first = flights.join("k", fn)
+    first_running.wait(5)
+    flights.leave(first)
+
+    out = []
+    t = threading.Thread(target=lambda: out.append(flights.do_sync("k", fn)))
+    t.start()
+    while first.waiters == 0:
+        pass
+    go.set()
+    t.join(5)
+    assert out == [2]
@@ -0,0 +1,178 @@
+# test_storage.py
+#   python -m pytest -q test_storage.py
+# LocalStorage and S3Storage against the stand-in endpoint (python storage.py serve).
+import io
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+
+import pytest
+
+from storage import LocalStorage, S3Storage, boto3
+
+BUCKET = "nc-test"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def endpoint(tmp_path_factory):
+    if boto3 is None:
+        pytest.skip("S3Storage needs boto3")
+    port = _free_port()
+    root = str(tmp_path_factory.mktemp("s3"))
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "storage.py"), "serve", "--port", str(port),
+                             "--root", root, "--bucket", BUCKET], stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if time.time() > deadline:
+                proc.kill()
+                raise
+            time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    proc.terminate()
+    proc.wait()
+
+def _s3(endpoint: str, cache_dir: str, monkeypatch) -> S3Storage:
+    # the stand-in doesn't check signatures, but boto3 wants some credentials
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    return S3Storage(BUCKET, prefix="projects/", endpoint=endpoint, region="us-east-1", cache_dir=cache_dir)
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "local":
+        yield LocalStorage(str(tmp_path / "projects"))
+        return
+    s3 = _s3(request.getfixturevalue("endpoint"), str(tmp_path / "cache"), monkeypatch)
+    yield s3
+    s3.delete_prefix("")
+
+
+def test_put_get_walk_delete(store, tmp_path):
+    store.write_bytes("p1/project.json", b'{"id": "p1"}')
+    store.write_json("p1/papers/a/meta.json", {"title": "A"})
+    store.write_stream("p1/papers/a/paper.pdf", io.BytesIO(b"%PDF-" + b"x" * 100))
+    episode = tmp_path / "ep.mp3"
+    episode.write_bytes(b"ID3" + b"\0" * 50)
+    store.put_file("p1/papers/b/ep.mp3", str(episode))
+
+    assert store.read_bytes("p1/project.json") == b'{"id": "p1"}'
+    assert store.read_json("p1/papers/a/meta.json", None) == {"title": "A"}
+    assert store.read_json("p1/papers/zz/meta.json", "missing") == "missing"
+    with pytest.raises(FileNotFoundError):
+        store.read_bytes("p1/nope.json")
+    st = store.stat("p1/papers/a/paper.pdf")
+    assert st is not None and st.size == 105 and st.etag
+    assert store.stat("p1/nope.json") is None
+    assert store.exists("p1/papers/b/ep.mp3")
+
+    assert sorted(store.listdir("")) == ["p1"]
+    assert sorted(store.listdir("p1/")) == ["papers", "project.json"]
+    assert sorted(store.listdir("p1/papers/")) == ["a", "b"]
+    assert sorted(store.walk("p1/")) == ["papers/a/meta.json", "papers/a/paper.pdf", "papers/b/ep.mp3",
+                                         "project.json"]
+    with open(store.local_path("p1/papers/a/paper.pdf"), "rb") as f:
+        assert f.read() == b"%PDF-" + b"x" * 100
+
+    # a rewrite shows up through stat (which is what meta versions and caches key on)
+    store.write_json("p1/papers/a/meta.json", {"title": "A2"})
+    assert store.read_json("p1/papers/a/meta.json", None) == {"title": "A2"}
+
+    store.delete_prefix("p1/papers/a/")
+    assert sorted(store.walk("p1/")) == ["papers/b/ep.mp3", "project.json"]
+    assert store.stat("p1/papers/a/meta.json") is None
+    store.delete_prefix("p1/")
+    assert store.listdir("") == []
+
+def test_iter_range(store):
+    data = bytes(range(256)) * 40
+    store.write_bytes("p1/papers/a/ep.mp3", data)
+    assert b"".join(store.iter_range("p1/papers/a/ep.mp3")) == data
+    assert b"".join(store.iter_range("p1/papers/a/ep.mp3", 5, 14)) == data[5:15]
+    assert b"".join(store.iter_range("p1/papers/a/ep.mp3", len(data) - 3)) == data[-3:]
+
+def test_two_nodes_see_the_same_objects(endpoint, tmp_path, monkeypatch):
+    a = _s3(endpoint, str(tmp_path / "a"), monkeypatch)
+    b = _s3(endpoint, str(tmp_path / "b"), monkeypatch)
+    try:
+        a.write_bytes("p1/papers/a/text.txt", b"first")
+        assert b.read_bytes("p1/papers/a/text.txt") == b"first"
+        with open(b.local_path("p1/papers/a/text.txt"), "rb") as f:
+            assert f.read() == b"first"
+        time.sleep(1.1)  # object mtimes have one-second resolution
+        a.write_bytes("p1/papers/a/text.txt", b"second!")
+        with open(b.local_path("p1/papers/a/text.txt"), "rb") as f:
+            assert f.read() == b"second!"  # the cached download is refreshed
+    finally:
+        a.delete_prefix("")
+
+
+# ---------- through the API module (needs the app's dependencies) ----------
+@pytest.fixture
+def server_on_s3(endpoint, tmp_path, monkeypatch):
+    pytest.importorskip("google.generativeai")
+    pytest.importorskip("kokoro_onnx")
+    import server
+    s3 = _s3(endpoint, str(tmp_path / "cache"), monkeypatch)
+    monkeypatch.setattr(server, "STORE", s3)
+    yield server
+    s3.delete_prefix("")
+
+def _get(server, key: str, range_header: str = ""):
+    from starlette.requests import Request
+    headers = [(b"range", range_header.encode("latin-1"))] if range_header else []
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+    response = server.serve_stored(request, key, "audio/mpeg", {})
+
+    if not hasattr(response, "body_iterator"):
+        return response, response.body
+
+    async def body():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return response, asyncio.run(body())
+
+def test_proxied_range_read(server_on_s3, monkeypatch):
+    server = server_on_s3
+    monkeypatch.setattr(server, "STORAGE_PRESIGN_SEC", 0)
+    data = bytes(range(256)) * 10
+    server.STORE.write_bytes("p1/papers/a/ep.mp3", data)
+
+    response, body = _get(server, "p1/papers/a/ep.mp3", "bytes=5-14")
+    assert response.status_code == 206 and body == data[5:15]
+    assert response.headers["content-range"] == f"bytes 5-14/{len(data)}"
+    response, body = _get(server, "p1/papers/a/ep.mp3", "bytes=-4")
+    assert response.status_code == 206 and body == data[-4:]
+    response, body = _get(server, "p1/papers/a/ep.mp3")
+    assert response.status_code == 200 and body == data
+    response, _ = _get(server, "p1/papers/a/ep.mp3", f"bytes={len(data)}-")
+    assert response.status_code == 416
+
+def test_generation_tokens_live_in_the_store(server_on_s3, endpoint, tmp_path, monkeypatch):
+    server = server_on_s3
+    other = _s3(endpoint, str(tmp_path / "other"), monkeypatch)  # another API node
+    assert server.generation_token("p1") == "0"
+    tag0, all0 = server.generation_tag("p1"), server.generation_tag(server.ALL_PROJECTS)
+
+    server.bump_generation("p1")
+    token = server.generation_token("p1")
+    assert token != "0"
+    assert other.read_bytes(server.generation_key("p1")).decode("ascii") == token
+    assert server.generation_tag("p1") != tag0
+    assert server.generation_tag(server.ALL_PROJECTS) != all0
+    assert server.generation_token("p2") == "0"  # other projects keep their tags
+
+    # a bump on the other node changes this node's tag too
+    other.write_bytes(server.generation_key("p1"), b"from-other")
+    assert server.generation_token("p1") == "from-other"
@@ -0,0 +1,340 @@
+# tracing.py
+# Per-job trace spans. Spans follow OpenTelemetry's data model (trace/span ids, parent,
+# unix-nano start/end, typed attributes, status) and are exported as OTLP/JSON: one span
+# per line in TRACE_FILE, and optionally POSTed in batches to an OTLP/HTTP collector.
+#
+# Each process writes its own spans.<pid>.jsonl next to TRACE_FILE; read_spans merges them.
+#
+#   python tracing.py show [trace_id]     # span tree of the latest (or given) trace
+#   python tracing.py collect --port 4318 # stand-in collector that appends to a file
+import os
+import glob
+import json
+import time
+import queue
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from profiling import profiled
+
+# TRACE_FILE="" turns the file exporter off
+TRACE_FILE = os.environ.get("TRACE_FILE", os.path.join(".cache", "traces", "spans.jsonl"))
+TRACE_MAX_MB = float(os.environ.get("TRACE_MAX_MB", "50"))  # per process; rotated to <file>.1 past this
+TRACE_KEEP_HOURS = float(os.environ.get("TRACE_KEEP_HOURS", "72"))  # span files of gone processes
+# e.g. http://localhost:4318 (an OpenTelemetry Collector's OTLP/HTTP receiver)
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "neurocache")
+
+_current: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+
+def _attr_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        self.attributes.update({k: v for k, v in attrs.items() if v is not None})
+
+    def traceparent(self) -> str:
+        """W3C trace context, to continue this trace in another process."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": k, "value": _attr_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+# ---------- exporters ----------
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by someone else
+    return True
+
+def _process_files(path: str) -> List[str]:
+    """Every process's span files for path (spans.jsonl -> spans.*.jsonl and their .1)."""
+    stem, ext = os.path.splitext(path)
+    return glob.glob(glob.escape(stem) + ".*" + ext) + glob.glob(glob.escape(stem) + ".*" + ext + ".1")
+
+
+class _FileExporter:
+    """
+    Appends spans to `path`, or with per_process=True to path's spans.<pid>.jsonl
+    variant: only the writing process rotates a file, so nobody else's handle ends up
+    on a renamed or replaced file.
+    """
+
+    def __init__(self, path: str, max_bytes: int, per_process: bool = False):
+        self.base = path
+        self.path = path
+        self.max_bytes = max_bytes
+        self.per_process = per_process
+        self._lock = threading.Lock()
+        self._fh = None
+        self._pid = None
+
+    def _open(self):
+        if self.per_process:
+            stem, ext = os.path.splitext(self.base)
+            self.path = f"{stem}.{os.getpid()}{ext}"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.per_process:
+            self._prune()
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._pid = os.getpid()
+
+    def _prune(self):
+        # files of processes that are gone, once they haven't been written for a while
+        cutoff = time.time() - TRACE_KEEP_HOURS * 3600
+        for fp in _process_files(self.base):
+            pid = os.path.basename(fp).split(".")[-3 if fp.endswith(".1") else -2]
+            try:
+                if os.path.getmtime(fp) >= cutoff or (pid.isdigit() and _alive(int(pid))):
+                    continue
+                os.remove(fp)
+            except OSError:
+                pass
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is not None and self._pid != os.getpid():
+                self._fh = None  # a forked child: the handle (and file) are the parent's
+            if self._fh is None:
+                self._open()
+            self._fh.write(line)
+            self._fh.flush()
+            if self._fh.tell() > self.max_bytes:
+                self._fh.close()
+                self._fh = None
+                os.replace(self.path, self.path + ".1")
+
+
+class _OtlpExporter:
+    """Batches spans on a daemon thread and POSTs them as OTLP/JSON to {endpoint}/v1/traces."""
+
+    def __init__(self, endpoint: str, batch: int = 64, flush_sec: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.batch = batch
+        self.flush_sec = flush_sec
+        self._q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10_000)
+        threading.Thread(target=self._run, name="otlp-export", daemon=True).start()
+
+    def export(self, record: Dict[str, Any]):
+        try:
+            self._q.put_nowait(record)
+        except queue.Full:
+            pass  # never block a job on telemetry
+
+    def _run(self):
+        while True:
+            spans = [self._q.get()]
+            deadline = time.monotonic() + self.flush_sec
+            while len(spans) < self.batch and time.monotonic() < deadline:
+                try:
+                    spans.append(self._q.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            body = json.dumps(otlp_payload(spans)).encode("utf-8")
+            req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except Exception as e:
+                print("[Trace export warning]", e)
+
+
+def otlp_payload(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "neurocache"}, "spans": spans}],
+    }]}
+
+
+_exporters = []
+if TRACE_FILE:
+    _exporters.append(_FileExporter(TRACE_FILE, int(TRACE_MAX_MB * 1024 * 1024), per_process=True))
+if TRACE_OTLP_ENDPOINT:
+    _exporters.append(_OtlpExporter(TRACE_OTLP_ENDPOINT))
+
+
+def _export(s: Span):
+    if not _exporters:
+        return
+    record = s.to_otlp()
+    for exp in _exporters:
+        try:
+            exp.export(record)
+        except Exception as e:
+            print("[Trace export warning]", e)
+
+
+# ---------- API ----------
+@contextmanager
+def span(name: str, parent: Union[Span, str, None] = None, **attributes) -> Iterator[Span]:
+    """
+    Child of `parent` (a Span or a traceparent string from another process), else of
+    the current span, else the root of a new trace. Exceptions mark the span as an error.
+    """
+    if parent is None:
+        parent = _current.get()
+    if isinstance(parent, str):
+        try:
+            _, trace_id, parent_id, _ = parent.split("-")
+        except ValueError:
+            trace_id, parent_id = os.urandom(16).hex(), None
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+    s = Span(name, trace_id, parent_id, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current.reset(token)
+        _export(s)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def bind(fn: Callable) -> Callable:
+    """
+    fn with the caller's current span as parent, for thread pools (which don't copy
+    context). The thread also joins the caller's profile session, if any (see profiling.py).
+    """
+    parent = _current.get()
+
+    @profiled
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+# ---------- tools ----------
+def read_spans(path: str = TRACE_FILE) -> List[Dict[str, Any]]:
+    """Spans from path and every process's file next to it (see _FileExporter)."""
+    spans = []
+    for fp in [path + ".1", path] + sorted(_process_files(path)):
+        try:
+            with open(fp, "r", encoding="utf-8") as f:
+                # a line still being appended by another process may be cut short
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except OSError:
+            pass
+    return spans
+
+def format_trace(spans: List[Dict[str, Any]], trace_id: Optional[str] = None) -> str:
+    if not spans:
+        return "no spans"
+    if trace_id is None:
+        roots = [s for s in spans if not s.get("parentSpanId")]
+        trace_id = max(roots or spans, key=lambda s: int(s["startTimeUnixNano"]))["traceId"]
+    spans = sorted((s for s in spans if s["traceId"] == trace_id), key=lambda s: int(s["startTimeUnixNano"]))
+    ids = {s["spanId"] for s in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in spans:
+        parent = s.get("parentSpanId")
+        children.setdefault(parent if parent in ids else None, []).append(s)
+
+    lines = [f"trace {trace_id}"]
+    def walk(parent: Optional[str], depth: int):
+        for s in children.get(parent, []):
+            ms = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+            attrs = " ".join(f"{a['key']}={next(iter(a['value'].values()))}" for a in s.get("attributes", []))
+            err = "  !! " + s["status"].get("message", "") if s.get("status", {}).get("code") == 2 else ""
+            lines.append(f"{'  ' * depth}{s['name']:<{max(1, 40 - 2 * depth)}} {ms:>10.1f} ms  {attrs}{err}")
+            walk(s["spanId"], depth + 1)
+    walk(None, 1)
+    return "\n".join(lines)
+
+def collect(port: int, out_path: str):
+    """Minimal OTLP/HTTP JSON receiver: appends every received span to out_path."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    exporter = _FileExporter(out_path, int(TRACE_MAX_MB * 1024 * 1024))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+                for rs in payload.get("resourceSpans", []):
+                    for ss in rs.get("scopeSpans", []):
+                        for s in ss.get("spans", []):
+                            exporter.export(s)
+                self.send_response(200)
+            except Exception:
+                self.send_response(400)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    print(f"[Trace collector] listening on :{port}/v1/traces, writing {out_path}")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    show = sub.add_parser("show", help="print the span tree of one trace")
+    show.add_argument("trace_id", nargs="?")
+    show.add_argument("--file", default=TRACE_FILE)
+    col = sub.add_parser("collect", help="run a stand-in OTLP/HTTP collector")
+    col.add_argument("--port", type=int, default=4318)
+    col.add_argument("--out", default=os.path.join(".cache", "traces", "collected.jsonl"))
+    args = ap.parse_args()
+    if args.cmd == "show":
+        print(format_trace(read_spans(args.file), args.trace_id))
+    else:
+        collect(args.port, args.out)
@@ -0,0 +1,129 @@
+# tts_bench.py
+# Per-line vs batched Kokoro synthesis (TTS_BATCH_LINES) on real scripts: wall time,
+# Kokoro calls, real-time factor, how often a batch couldn't be split back into lines,
+# and how far batched line lengths drift from the per-line ones.
+#
+#   python tts_bench.py                          # every script under projects/
+#   python tts_bench.py script1.txt --batch 1,2,4,8 --model ./models/model_q8f16.onnx
+#   python tts_bench.py --fake --fake-latency 0.05 --fake-char-latency 0.001
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_scripts(paths: List[str]) -> Dict[str, str]:
+    scripts = {}
+    if paths:
+        for p in paths:
+            with open(p, "r", encoding="utf-8", errors="ignore") as f:
+                scripts[os.path.basename(p)] = f.read()
+        return scripts
+    # the API's per-paper meta.json and the Gradio app's per-project meta.json
+    for mp in glob.glob(os.path.join("projects", "*", "papers", "*", "meta.json")) + \
+            glob.glob(os.path.join("projects", "*", "meta.json")):
+        try:
+            with open(mp, "r", encoding="utf-8") as f:
+                script = json.load(f).get("script", [])
+        except Exception:
+            continue
+        if isinstance(script, list):
+            script = "\n".join(script)
+        if script.strip():
+            scripts[os.path.relpath(os.path.dirname(mp), "projects")] = script
+    return scripts
+
+def run(kokoro, scripts: Dict[str, List[Tuple[str, str]]], batch: int) -> Dict[str, object]:
+    from app import synthesize_lines
+    stats: Dict[str, int] = {}
+    lengths: Dict[str, List[float]] = {}
+    t0 = time.perf_counter()
+    for name, items in scripts.items():
+        lens = []
+        # same windows as synthesize_segments: 2x batch lines, so each voice fills a batch
+        step = 2 * batch if batch > 1 else len(items)
+        for start in range(0, len(items), step):
+            for samples, sr in synthesize_lines(kokoro, items[start:start + step], batch_lines=batch, stats=stats):
+                lens.append(len(samples) / sr)
+        lengths[name] = lens
+    wall = time.perf_counter() - t0
+    audio = sum(sum(v) for v in lengths.values())
+    return {
+        "batch": batch,
+        "lines": sum(len(v) for v in scripts.values()),
+        "calls": stats.get("calls", 0),
+        "batches": stats.get("batches", 0),
+        "fallbacks": stats.get("fallbacks", 0),
+        "wall_sec": round(wall, 3),
+        "audio_sec": round(audio, 2),
+        "rtf": round(wall / audio, 4) if audio else None,
+        "lengths": lengths,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark per-line vs batched Kokoro synthesis.")
+    ap.add_argument("scripts", nargs="*", help="'Speaker: text' script files (default: scripts under projects/)")
+    ap.add_argument("--batch", default="1,2,4,8", help="comma-separated lines per call; 1 is the per-line path")
+    ap.add_argument("--model", default="./models/kokoro-v1.0.onnx")
+    ap.add_argument("--voices", default="voices-v1.0.bin")
+    ap.add_argument("--male", default="am_adam")
+    ap.add_argument("--female", default="af_heart")
+    ap.add_argument("--repeat", type=int, default=1, help="runs per batch size; the fastest is reported")
+    ap.add_argument("--fake", action="store_true", help="use fakes.FakeKokoro instead of the model")
+    ap.add_argument("--fake-latency", type=float, default=0.05, help="fake Kokoro seconds per call")
+    ap.add_argument("--fake-char-latency", type=float, default=0.001, help="fake Kokoro seconds per character")
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    from app import Kokoro, parse_script
+    if args.fake:
+        from fakes import FakeKokoro
+        kokoro = FakeKokoro(latency=args.fake_latency, char_latency=args.fake_char_latency)
+    else:
+        kokoro = Kokoro(args.model, args.voices)
+
+    voices = {"male": args.male, "female": args.female}
+    scripts = {}
+    for name, text in load_scripts(args.scripts).items():
+        items = [(t, voices.get(s, args.male)) for s, t in parse_script(text)]
+        if items:
+            scripts[name] = items
+    if not scripts:
+        sys.exit("no scripts found (pass script files, or run from the folder holding projects/)")
+    print(f"[tts_bench] {len(scripts)} script(s), {sum(len(v) for v in scripts.values())} lines")
+
+    kokoro.create("Warm up.", voice=args.male, speed=1.0, lang="en-us")  # first call pays session setup
+    results = []
+    baseline = None
+    print(f"{'batch':>5} {'calls':>6} {'fallbk':>6} {'wall s':>8} {'audio s':>8} {'RTF':>7} {'speedup':>7} {'len drift':>9}")
+    for batch in [int(b) for b in args.batch.split(",") if b.strip()]:
+        res = min((run(kokoro, scripts, batch) for _ in range(max(1, args.repeat))), key=lambda r: r["wall_sec"])
+        if baseline is None and batch == 1:
+            baseline = res
+        drift = None
+        if baseline is not None:
+            # mean |line length - per-line length|: how much the cut points move speech around
+            pairs = [(a, b) for name in scripts for a, b in zip(res["lengths"][name], baseline["lengths"][name])]
+            drift = sum(abs(a - b) for a, b in pairs) / len(pairs) if pairs else 0.0
+        speedup = baseline["wall_sec"] / res["wall_sec"] if baseline is not None and res["wall_sec"] else None
+        res["line_drift_sec"] = round(drift, 4) if drift is not None else None
+        res["speedup"] = round(speedup, 3) if speedup is not None else None
+        print(f"{batch:>5} {res['calls']:>6} {res['fallbacks']:>6} {res['wall_sec']:>8.2f} {res['audio_sec']:>8.1f} "
+              f"{res['rtf']:>7.3f} {(f'{speedup:.2f}x' if speedup else '-'):>7} "
+              f"{(f'{drift * 1000:.0f} ms' if drift is not None else '-'):>9}")
+        results.append({k: v for k, v in res.items() if k != "lengths"})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"[tts_bench] wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
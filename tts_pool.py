@@ -0,0 +1,315 @@
+# tts_pool.py
+# Worker processes for podcast synthesis. Each worker keeps its own loaded Kokoro
+# instance(s), so whole episodes run off the API process and in parallel.
+import os
+import json
+import time
+import uuid
+import queue
+import tempfile
+import threading
+import multiprocessing as mp
+from contextlib import nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_CPUS = os.cpu_count() or 1
+
+# TTS_WORKERS=0 keeps synthesis in-process (the old behaviour).
+# Leave one core for the HTTP server by default.
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", str(max(1, _CPUS - 1))))
+# Extra worker processes kept for interactive episodes. When every regular worker is
+# busy with bulk work, an interactive episode starts on one of these while a bulk
+# episode pauses at its next line, so CPU use stays at TTS_WORKERS (see scheduler.py)
+TTS_INTERACTIVE_RESERVE = int(os.environ.get("TTS_INTERACTIVE_RESERVE", "1"))
+# ONNX intra-op threads per worker; default splits the cores evenly between workers
+TTS_ONNX_THREADS = int(os.environ.get("TTS_ONNX_THREADS", str(max(1, _CPUS // max(1, TTS_WORKERS)))))
+
+class ScriptFeed:
+    """
+    Script lines handed over while they are still being written (e.g. parsed from a
+    streaming Gemini response): put() each line, then close(), or close(error) if the
+    writer failed. Iterating blocks for the next line and re-raises the writer's error.
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue" = queue.Queue()
+
+    def put(self, line: str):
+        self._q.put((line, None))
+
+    def close(self, error: Optional[BaseException] = None):
+        self._q.put((None, error))
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            line, error = self._q.get()
+            if line is None:
+                if error is not None:
+                    raise error
+                return
+            yield line
+
+# ---------- worker side ----------
+_worker_threads = 1
+_worker_kokoros: Dict[Tuple[str, str], Any] = {}
+
+def _init_worker(onnx_threads: int, preload: Optional[Tuple[str, str]],
+                 gestures: Optional[Tuple[str, List[str]]] = None):
+    global _worker_threads
+    _worker_threads = onnx_threads
+    os.environ["OMP_NUM_THREADS"] = str(onnx_threads)
+    if preload:
+        try:
+            kokoro = _worker_kokoro(*preload)
+            if gestures:
+                # fill the interjection clip bank once so gesture overlays cost no synthesis
+                from app import warm_gesture_bank
+                warm_gesture_bank(kokoro, preload[0], *gestures)
+        except Exception as e:
+            # the model may not exist on this box; the first job will report it
+            print("[TTS worker preload warning]", e)
+
+def load_kokoro(model_path: str, voice_config_path: str, onnx_threads: int = 0):
+    """Kokoro with an explicit ONNX thread budget (falls back to library defaults)."""
+    from app import Kokoro, TTS_FAKE, make_kokoro
+    if TTS_FAKE:
+        return make_kokoro(model_path, voice_config_path)
+    if onnx_threads and hasattr(Kokoro, "from_session"):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = onnx_threads
+        opts.inter_op_num_threads = 1
+        sess = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        return Kokoro.from_session(sess, voice_config_path)
+    return Kokoro(model_path, voice_config_path)
+
+def _worker_kokoro(model_path: str, voice_config_path: str):
+    key = (model_path, voice_config_path)
+    if key not in _worker_kokoros:
+        from tracing import span, current_span
+        # only traced inside a job; a preload at worker start-up isn't part of any trace
+        traced = span("kokoro.load", model=model_path, onnx_threads=_worker_threads) if current_span() else nullcontext()
+        with traced:
+            _worker_kokoros[key] = load_kokoro(model_path, voice_config_path, onnx_threads=_worker_threads)
+    return _worker_kokoros[key]
+
+def _run_episode(kwargs: Dict[str, Any], cancel_event: Optional[threading.Event] = None,
+                 pause_event: Optional[threading.Event] = None, report: Optional[Callable] = None):
+    from tracing import span
+    kwargs = dict(kwargs)
+    # continues the caller's trace across the process boundary
+    with span("tts.episode", parent=kwargs.pop("trace_parent", None), worker_pid=os.getpid(),
+              output=kwargs.get("output_file")):
+        return _episode(kwargs, cancel_event, pause_event, report)
+
+def _write_progress(path: str, frac: float, desc: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"frac": frac, "desc": desc}, f)
+    os.replace(tmp, path)  # the API process never sees a half-written file
+
+def _tail_script(path: str, cancelled: Callable[[], bool], poll_sec: float = 0.05) -> Iterator[str]:
+    """Lines appended to `path` by _pump_feed, until its ".done" marker appears."""
+    from app import JobCancelled
+    done_path = path + ".done"
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        while True:
+            finished = os.path.exists(done_path)  # checked before reading, so nothing is missed
+            buf += f.read()
+            *lines, buf = buf.split("\n")
+            yield from lines
+            if finished:
+                with open(done_path, "r", encoding="utf-8") as fd:
+                    error = fd.read()
+                if error:
+                    raise JobCancelled(f"script feed failed: {error}")
+                return
+            if cancelled():
+                raise JobCancelled("cancelled while waiting for script lines")
+            time.sleep(poll_sec)
+
+def _episode(kwargs: Dict[str, Any], cancel_event: Optional[threading.Event],
+             pause_event: Optional[threading.Event] = None, report: Optional[Callable] = None):
+    from app import process_script, JobCancelled
+    from tracing import span
+    # Cancel/pause requests cross the process boundary as marker files, checked once per
+    # line; progress goes back the same way (the latest frac/desc in one small JSON file)
+    # and so do streamed script lines (appended to a file the worker tails)
+    cancel_path = kwargs.pop("cancel_path", None)
+    pause_path = kwargs.pop("pause_path", None)
+    progress_path = kwargs.pop("progress_path", None)
+    script_path = kwargs.pop("script_path", None)
+    if progress_path and report is None:
+        report = lambda frac, desc: _write_progress(progress_path, frac, desc)
+    profile = kwargs.pop("profile", None)  # (profiles root, profile id) from a profiled request
+    kwargs["kokoro"] = _worker_kokoro(kwargs["model_path"], kwargs["voice_config_path"])
+
+    def _cancelled() -> bool:
+        return (cancel_event is not None and cancel_event.is_set()) or bool(cancel_path and os.path.exists(cancel_path))
+
+    def _paused() -> bool:
+        return (pause_event is not None and pause_event.is_set()) or bool(pause_path and os.path.exists(pause_path))
+
+    def _checkpoint(frac, desc=""):
+        if report is not None:
+            report(frac, desc)
+        if _cancelled():
+            raise JobCancelled(f"cancelled at {desc or frac}")
+        if _paused():
+            # an interactive episode borrowed this slot; hold here until it's done
+            if report is not None:
+                report(frac, f"Paused for an interactive episode ({desc})")
+            with span("tts.paused", at=desc or str(frac)):
+                while _paused():
+                    time.sleep(0.1)
+                    if _cancelled():
+                        raise JobCancelled(f"cancelled while paused at {desc or frac}")
+
+    if script_path:
+        kwargs["script_text"] = _tail_script(script_path, _cancelled)
+    watched = cancel_path or pause_path or cancel_event is not None or pause_event is not None or report is not None
+    kwargs["progress"] = _checkpoint if watched else None
+    if profile:
+        from profiling import ProfileSession
+        with ProfileSession(profile[0], f"tts worker: {kwargs['output_file']}", profile_id=profile[1], prefix="worker-"):
+            return process_script(**kwargs)
+    return process_script(**kwargs)
+
+# ---------- API side ----------
+def _pump_feed(feed: Iterable[str], path: str):
+    """Appends each line of `feed` to `path` for _tail_script, then writes the .done marker."""
+    error = ""
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for line in feed:
+                f.write(" ".join(str(line).splitlines()) + "\n")
+                f.flush()
+    except BaseException as e:
+        error = str(e) or type(e).__name__
+    if os.path.exists(path):  # else run() has already given up on the episode and cleaned up
+        with open(path + ".done", "w", encoding="utf-8") as f:
+            f.write(error)
+
+def _relay_progress(path: str, last_mtime: Optional[int], progress: Callable) -> Optional[int]:
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if mtime == last_mtime:
+            return last_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            p = json.load(f)
+    except (OSError, ValueError):
+        return last_mtime
+    progress(p["frac"], desc=p["desc"])
+    return mtime
+
+class TTSPool:
+    """
+    Thin wrapper around a spawn-context ProcessPoolExecutor. `kwargs` are the
+    process_script keyword arguments minus kokoro/progress. With workers=0 jobs
+    run inline on the calling thread.
+    """
+
+    def __init__(self, workers: int = TTS_WORKERS, onnx_threads: int = TTS_ONNX_THREADS,
+                 preload: Optional[Tuple[str, str]] = None,
+                 gestures: Optional[Tuple[str, List[str]]] = None):
+        self.workers = workers
+        self.onnx_threads = onnx_threads
+        self.preload = preload
+        self.gestures = gestures  # (phrases_csv, voices) to pre-synthesize at start-up
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=mp.get_context("spawn"),  # onnxruntime threads don't survive fork
+                    initializer=_init_worker,
+                    initargs=(self.onnx_threads, self.preload, self.gestures),
+                )
+            return self._executor
+
+    def submit(self, kwargs: Dict[str, Any], cancel: Optional[threading.Event] = None,
+               pause: Optional[threading.Event] = None, progress: Optional[Callable] = None) -> Future:
+        if self.workers <= 0:
+            # inline: the request's own sampler already sees this thread
+            kwargs = {k: v for k, v in kwargs.items() if k != "profile"}
+            fut: Future = Future()
+            try:
+                fut.set_result(_run_episode(kwargs, cancel, pause, progress))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        try:
+            return self._get_executor().submit(_run_episode, kwargs)
+        except BrokenProcessPool:
+            # a worker died (OOM, segfault in onnxruntime); start a fresh pool once
+            self.reset()
+            return self._get_executor().submit(_run_episode, kwargs)
+
+    def run(self, kwargs: Dict[str, Any], cancel: Optional[threading.Event] = None,
+            pause: Optional[threading.Event] = None, progress: Optional[Callable] = None,
+            poll_sec: float = 0.25, script_feed: Optional[Iterable[str]] = None):
+        """
+        Blocking run. If `cancel` is set while the episode is queued it is dropped;
+        while running, the worker stops at its next line. While `pause` is set the
+        worker holds at its next line until it is cleared. `progress(frac, desc=...)`
+        gets the worker's latest report at most once per poll. `script_feed` (e.g. a
+        ScriptFeed) replaces kwargs["script_text"] with lines synthesized as they arrive.
+        """
+        if script_feed is not None and self.workers <= 0:
+            kwargs = dict(kwargs, script_text=script_feed)
+        if self.workers <= 0 or (cancel is None and pause is None and progress is None and script_feed is None):
+            return self.submit(kwargs, cancel, pause, progress).result()
+        from app import JobCancelled
+        marker = os.path.join(tempfile.gettempdir(), f"neurocache-{uuid.uuid4().hex}")
+        cancel_path, pause_path, progress_path = marker + ".cancel", marker + ".pause", marker + ".progress"
+        script_path = marker + ".script"
+        extra = dict(cancel_path=cancel_path, pause_path=pause_path)
+        if progress is not None:
+            extra["progress_path"] = progress_path
+        if script_feed is not None:
+            open(script_path, "w").close()
+            extra.update(script_path=script_path, script_text="")
+            threading.Thread(target=_pump_feed, args=(script_feed, script_path),
+                             name="tts-script-feed", daemon=True).start()
+        fut = self.submit(dict(kwargs, **extra))
+        last_mtime = None
+        try:
+            while True:
+                try:
+                    return fut.result(timeout=poll_sec)
+                except FutureTimeoutError:
+                    pass
+                if progress is not None:
+                    last_mtime = _relay_progress(progress_path, last_mtime, progress)
+                if cancel is not None and cancel.is_set():
+                    if not fut.cancel():
+                        open(cancel_path, "w").close()
+                        fut.exception()  # wait for the worker to reach a checkpoint
+                    raise JobCancelled("podcast cancelled: no clients waiting")
+                if pause is not None and pause.is_set() != os.path.exists(pause_path):
+                    if pause.is_set():
+                        open(pause_path, "w").close()
+                    else:
+                        os.remove(pause_path)
+        finally:
+            for fp in (cancel_path, pause_path, progress_path, script_path, script_path + ".done"):
+                if os.path.exists(fp):
+                    os.remove(fp)
+
+    def reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None